@@ -0,0 +1,42 @@
+"""
+In-process background jobs
+
+Periodic jobs run as asyncio tasks on the API event loop. They are started
+from the FastAPI startup hook and cancelled on shutdown.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+async def _run_periodically(name, interval_seconds, job):
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Background job '{name}' failed")
+        await asyncio.sleep(interval_seconds)
+
+
+def start_periodic_job(name: str, interval_seconds: float, job):
+    """Run the coroutine function `job` now and then every `interval_seconds`"""
+    if name in _tasks and not _tasks[name].done():
+        return _tasks[name]
+    task = asyncio.create_task(_run_periodically(name, interval_seconds, job))
+    _tasks[name] = task
+    logger.info(f"Started background job '{name}' (every {interval_seconds}s)")
+    return task
+
+
+async def stop_background_jobs():
+    """Cancel every running background job and wait for them to finish"""
+    tasks = list(_tasks.values())
+    _tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
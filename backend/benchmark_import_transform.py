@@ -0,0 +1,66 @@
+"""
+Benchmark the product import transform stage on synthetic spreadsheets
+
+Runs without MongoDB:
+    python benchmark_import_transform.py [rows]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from import_pipeline import detect_format, rename_columns, transform_products
+
+BRANDS = ['Bobcat', 'Kubota', 'Caterpillar', 'John Deere', 'Takeuchi', 'NoSuchBrand']
+
+
+def rubber_track_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    widths = rng.choice([180, 230, 300, 320, 400, 450], rows).astype(str)
+    links = rng.integers(37, 90, rows).astype(str)
+    prices = rng.uniform(300, 2500, rows).round(2)
+    return pd.DataFrame({
+        'comp_name': rng.choice(BRANDS, rows),
+        'machine_model': np.where(rng.random(rows) < 0.9, rng.choice(['T190', 'SVL95', '247B MTL'], rows), None),
+        'track_size': np.char.add(np.char.add(widths, 'x86x'), links),
+        'Price': np.char.add('$', prices.astype(str)),
+        'eng_description': 'Premium rubber track',
+        'title_h1': 'Rubber Track',
+        'sub_title_h2': 'Premium Quality',
+        'page_title': None,
+        'eng_metakeyword': 'rubber tracks, compact track loader',
+        'eng_meta_desc': 'Buy rubber tracks at wholesale prices.',
+        'shown_main_listin': rng.choice(['Yes', 'No'], rows),
+    })
+
+
+def roller_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    models = np.char.add(np.char.add(rng.choice(BRANDS, rows), ' '), rng.choice(['T190', 'SVL95', '247B'], rows))
+    return pd.DataFrame({
+        'Machine Model': models,
+        'Roller': 'Bottom Roller',
+        'Bottom / Front': rng.choice(['Bottom', 'Front', None], rows),
+        'Part Number': np.char.add('PN-', np.arange(rows).astype(str)),
+        'Alternate Part numbers': None,
+        'SKU': np.char.add('BR-', np.arange(rows).astype(str)),
+        'Fits following machine models': 'Bobcat T190, T200, T550',
+        'Description': None,
+    })
+
+
+def run(name: str, df: pd.DataFrame):
+    brand_names = set(BRANDS[:-1])
+    start = time.perf_counter()
+    category, mapping = detect_format(df.columns)
+    renamed = rename_columns(df, mapping)
+    documents, rows, errors = transform_products(renamed, category, brand_names)
+    elapsed = time.perf_counter() - start
+    print(f"   {name:<14} {len(df):>8,} rows -> {len(documents):>8,} documents, {len(errors)} errors "
+          f"in {elapsed:.2f}s ({len(df) / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"🚀 Import transform benchmark ({rows:,} rows)")
+    run("Rubber Tracks", rubber_track_frame(rows))
+    run("Rollers", roller_frame(rows))
@@ -2,6 +2,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import datetime
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -31,6 +32,32 @@ faqs_collection = db.faqs
 blog_categories_collection = db.blog_categories
 blogs_collection = db.blogs
 part_numbers_collection = db.part_numbers
+collection_versions_collection = db.collection_versions
+import_jobs_collection = db.import_jobs
+import_job_errors_collection = db.import_job_errors
+pricing_rules_collection = db.pricing_rules
+stats_summary_collection = db.stats_summary
+daily_stats_collection = db.daily_stats
+order_daily_rollups_collection = db.order_daily_rollups
+stock_reservations_collection = db.stock_reservations
+
+
+async def bump_collection_version(*names: str):
+    """Record that the named collections changed (drives sitemap/cache rebuilds)"""
+    for name in names:
+        await collection_versions_collection.update_one(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+async def get_collection_versions(names) -> dict:
+    """Current version counter for each named collection (0 if never changed)"""
+    versions = {name: 0 for name in names}
+    async for doc in collection_versions_collection.find({"_id": {"$in": list(names)}}):
+        versions[doc["_id"]] = doc.get("version", 0)
+    return versions
 
 
 async def init_db():
@@ -40,18 +67,27 @@ async def init_db():
     await products_collection.create_index("part_number")
     await products_collection.create_index("brand")
     await products_collection.create_index("category")
+    await products_collection.create_index("updated_at")  # Sitemap lastmod
     
     await brands_collection.create_index("slug", unique=True)
     # Allow same model_name for different equipment_types (e.g., Wacker Neuson 3503 for both Track Loader and Mini Excavator)
     await machine_models_collection.create_index([("brand", 1), ("model_name", 1), ("equipment_type", 1)], unique=True)
+    await machine_models_collection.create_index("updated_at")
     await track_sizes_collection.create_index("size", unique=True)
     await compatibility_collection.create_index([("make", 1), ("model", 1)], unique=True)
+    await compatibility_collection.create_index("updated_at")
     await categories_collection.create_index("slug", unique=True)
     await part_numbers_collection.create_index([("brand", 1), ("part_number", 1)], unique=True)
     await part_numbers_collection.create_index("part_type")
     
     await customers_collection.create_index("email", unique=True)
     await orders_collection.create_index("order_number", unique=True)
+    await orders_collection.create_index([("created_at", -1)])  # Date-range analytics, recent orders
+    await orders_collection.create_index([("status", 1), ("created_at", -1)])
+    await orders_collection.create_index([("customer_id", 1), ("created_at", -1), ("_id", -1)])  # Customer order history
+    await order_daily_rollups_collection.create_index([("date", 1), ("sku", 1)])
+    await stock_reservations_collection.create_index("order_id", unique=True)
+    await stock_reservations_collection.create_index([("status", 1), ("expires_at", 1)])  # Expiry sweep
     
     await admin_users_collection.create_index("username", unique=True)
     await admin_users_collection.create_index("email", unique=True)
@@ -64,5 +100,10 @@ async def init_db():
     await blog_categories_collection.create_index("slug", unique=True)
     await blogs_collection.create_index("slug", unique=True)
     await blogs_collection.create_index("category_id")
+    await blogs_collection.create_index("updated_at")
+    await import_jobs_collection.create_index([("created_at", -1)])
+    await import_job_errors_collection.create_index([("job_id", 1), ("row", 1)])
+    await import_job_errors_collection.create_index("created_at", expireAfterSeconds=30 * 24 * 3600)  # Reports kept 30 days
+    await pricing_rules_collection.create_index([("collection", 1), ("priority", -1)])
     
     print("✅ Database indexes created successfully")
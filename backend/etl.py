@@ -0,0 +1,362 @@
+"""
+Catalog ETL
+
+One command for loading catalog data (track sizes, compatibility, machine
+models, part numbers) from the bundled sources:
+
+    python etl.py list
+    python etl.py run camso kubota [--replace] [--batch-size N]
+    python etl.py rebuild
+
+Each source is an adapter: an async generator of (collection, label, (write, touch))
+records built with `upsert()`. All adapters share the pooled connection from
+database.py and write through one BulkWriter per collection (unordered
+bulk_write in batches), so loading is idempotent and a full catalog rebuild is
+a single command. `--replace` first clears what the source owns, which is what
+the original one-off scripts did.
+"""
+import argparse
+import asyncio
+import uuid
+from datetime import datetime
+from pymongo import UpdateOne
+from database import db, client, bump_collection_version
+from import_pipeline import BulkWriter, DEFAULT_BATCH_SIZE
+
+# Print a progress line every this many records
+PROGRESS_EVERY = 1000
+
+# Sources run by `rebuild`, in order (the manual track loader fixes are merged in after camso)
+REBUILD_ORDER = ["machine-models", "camso", "manual-track-loaders", "kubota", "caterpillar"]
+
+SOURCES = {}
+
+
+def source(name: str, description: str, reset: dict = None):
+    """Register an adapter; `reset` maps collection -> filter cleared by --replace"""
+    def register(adapter):
+        SOURCES[name] = {"adapter": adapter, "description": description, "reset": reset or {}}
+        return adapter
+    return register
+
+
+# ============= NORMALIZATION =============
+
+def clean_text(value) -> str:
+    """Stripped string with inner whitespace collapsed ('' for missing/NaN cells)"""
+    if value is None or value != value:
+        return ""
+    text = " ".join(str(value).split())
+    return "" if text.lower() == "nan" else text
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def parse_track_size(size_str):
+    """Parse a track size like '300x52.5x84' into {size, width, pitch, links} (None if invalid)"""
+    size_str = clean_text(size_str)
+    if not size_str or size_str in ['No Info', 'N/A']:
+        return None
+    parts = size_str.split('x')
+    if len(parts) != 3:
+        return None
+    try:
+        return {
+            'size': size_str,
+            'width': _number(parts[0]),
+            'pitch': _number(parts[1]),
+            'links': int(parts[2]),
+        }
+    except ValueError:
+        return None
+
+
+def upsert(key: dict, fields: dict = None, on_insert: dict = None, add_to_set: dict = None) -> tuple:
+    """Upsert keyed on `key`: `fields` are always set, `on_insert` only for new documents
+
+    Returns (write, touch) for BulkWriter.add. New documents get a uuid `id`,
+    created_at and updated_at. `touch` sets updated_at on an existing document
+    only if the write will change it (a field differs or an add_to_set value is
+    missing), so reloading unchanged data leaves it alone; it is None when the
+    write can only insert.
+    """
+    now = datetime.utcnow()
+    fields = fields or {}
+    add_to_set = {field: values for field, values in (add_to_set or {}).items() if values}
+    update = {"$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **(on_insert or {})}}
+    if fields:
+        update["$set"] = fields
+    if add_to_set:
+        update["$addToSet"] = {field: {"$each": values} for field, values in add_to_set.items()}
+
+    changes = [{field: {"$ne": value}} for field, value in fields.items()]
+    changes += [{field: {"$not": {"$all": values}}} for field, values in add_to_set.items()]
+    touch = UpdateOne({**key, "$or": changes}, {"$set": {"updated_at": now}}) if changes else None
+    return UpdateOne(key, update, upsert=True), touch
+
+
+# ============= SOURCE ADAPTERS =============
+
+@source("camso", "Track sizes and compatibility from camso_size_chart.xlsx (all sheets, merged)")
+async def camso_source():
+    import excel_parser
+
+    sizes = {}  # size string -> parsed size
+    machines = {}  # (make, model) -> track sizes, merged across sheets
+    async for sheet_name, df in excel_parser.iter_sheets('camso_size_chart.xlsx'):
+        print(f"   📄 Sheet: {sheet_name}")
+        df.columns = df.columns.str.strip()
+
+        for row in df.to_dict('records'):
+            make = clean_text(row.get('Make'))
+            model = clean_text(row.get('Model'))
+            if not make or not model:
+                continue
+
+            for column in ('Size 1', 'Size 2'):
+                parsed = parse_track_size(row.get(column))
+                if not parsed:
+                    continue
+                sizes.setdefault(parsed['size'], parsed)
+                machine_sizes = machines.setdefault((make, model), [])
+                if parsed['size'] not in machine_sizes:
+                    machine_sizes.append(parsed['size'])
+
+    # Compare with what is stored (two projected queries) so re-runs only write changes
+    stored_sizes = {}
+    async for doc in db.track_sizes.find({'size': {'$in': list(sizes)}}, {'_id': 0, 'size': 1, 'width': 1, 'pitch': 1, 'links': 1, 'is_active': 1}):
+        stored_sizes[doc['size']] = doc
+    stored_machines = {}
+    makes = list({make for make, _ in machines})
+    async for doc in db.compatibility.find({'make': {'$in': makes}}, {'_id': 0, 'make': 1, 'model': 1, 'track_sizes': 1, 'is_active': 1}):
+        stored_machines[(doc['make'], doc['model'])] = doc
+
+    unchanged = 0
+    for size_str, parsed in sizes.items():
+        stored = stored_sizes.get(size_str)
+        if stored and stored.get('is_active') and all(stored.get(f) == parsed[f] for f in ('width', 'pitch', 'links')):
+            unchanged += 1
+            continue
+        yield "track_sizes", size_str, upsert(
+            {'size': size_str},
+            {'width': parsed['width'], 'pitch': parsed['pitch'], 'links': parsed['links'], 'is_active': True},
+            on_insert={'price': None}  # To be set by admin
+        )
+
+    for (make, model), machine_sizes in machines.items():
+        stored = stored_machines.get((make, model))
+        if stored and stored.get('is_active') and set(machine_sizes) <= set(stored.get('track_sizes', [])):
+            unchanged += 1
+            continue
+        # Sizes from other sources (manual fixes, crawler) are kept
+        yield "compatibility", f"{make} {model}", upsert(
+            {'make': make, 'model': model}, {'is_active': True}, add_to_set={'track_sizes': machine_sizes}
+        )
+
+    print(f"   ⏭️  {unchanged} track sizes / machines already up to date")
+
+
+async def _part_numbers(brand: str, parts: list):
+    seen = set()
+    for part in parts:
+        part_number = clean_text(part["part_number"])
+        # The supplier lists repeat some part numbers; the first listing wins
+        if part_number in seen:
+            continue
+        seen.add(part_number)
+        yield "part_numbers", part_number, upsert(
+            {"brand": brand, "part_number": part_number},
+            {
+                "part_type": part["part_type"],
+                "part_subtype": part.get("part_subtype"),
+                "product_name": clean_text(part["product_name"]),
+                "compatible_models": [clean_text(m) for m in part["compatible_models"]],
+                "is_active": True,
+            },
+            on_insert={"price": None, "description": None, "image_url": None}  # To be set by admin
+        )
+
+
+@source("kubota", "Kubota rollers, sprockets and idlers (Rubbertrax part numbers)",
+        reset={"part_numbers": {"brand": "Kubota"}})
+async def kubota_source():
+    from import_kubota_parts import KUBOTA_PARTS
+    async for record in _part_numbers("Kubota", KUBOTA_PARTS):
+        yield record
+
+
+@source("caterpillar", "Caterpillar rollers, sprockets and idlers (Rubbertrax part numbers)",
+        reset={"part_numbers": {"brand": "Caterpillar"}})
+async def caterpillar_source():
+    from import_caterpillar_parts import CATERPILLAR_PARTS
+    async for record in _part_numbers("Caterpillar", CATERPILLAR_PARTS):
+        yield record
+
+
+async def _machine_models(models_by_brand: dict, equipment_type: str):
+    for brand, models in models_by_brand.items():
+        brand = clean_text(brand)
+        for model_name in models:
+            model_name = clean_text(model_name)
+            yield "machine_models", f"{brand} {model_name}", upsert(
+                {"brand": brand, "model_name": model_name, "equipment_type": equipment_type},
+                {"full_name": f"{brand} {model_name}"},
+                on_insert={"description": "", "product_image": ""}
+            )
+
+
+@source("machine-models", "Track loader and mini excavator models (unitedskidtracks.com, full list)",
+        reset={"machine_models": {}})
+async def machine_models_source():
+    from seed_machine_models import TRACK_LOADER_MODELS, MINI_EXCAVATOR_MODELS
+    async for record in _machine_models(TRACK_LOADER_MODELS, "Track Loader"):
+        yield record
+    async for record in _machine_models(MINI_EXCAVATOR_MODELS, "Mini Excavator"):
+        yield record
+
+
+@source("machine-models-complete", "Track loader and mini excavator models (import_all_models_complete list)",
+        reset={"machine_models": {}})
+async def machine_models_complete_source():
+    from import_all_models_complete import track_loaders, mini_excavators
+    async for record in _machine_models(track_loaders, "Track Loader"):
+        yield record
+    async for record in _machine_models(mini_excavators, "Mini Excavator"):
+        yield record
+
+
+@source("machine-models-legacy", "Models from the old machineModels.js list (adds missing models only)")
+async def machine_models_legacy_source():
+    from import_machine_models import machine_models_data
+    for brand, models in machine_models_data.items():
+        for model_name in models:
+            brand_, model_name_ = clean_text(brand), clean_text(model_name)
+            # Matches on brand + model only, so models already loaded under any equipment type are left alone
+            yield "machine_models", f"{brand_} {model_name_}", upsert(
+                {"brand": brand_, "model_name": model_name_},
+                on_insert={"full_name": f"{brand_} {model_name_}", "description": "", "product_image": ""}
+            )
+
+
+@source("manual-track-loaders", "Curated track loader compatibility missing from the Camso chart (merged)")
+async def manual_track_loaders_source():
+    from import_manual_track_loaders import TRACK_LOADER_DATA
+    loaded_sizes = set()
+    for brand, model, track_sizes in TRACK_LOADER_DATA:
+        sizes = []
+        for size_str in track_sizes:
+            parsed = parse_track_size(size_str)
+            if not parsed:
+                print(f"   ⚠️  Invalid track size format: {size_str}")
+                continue
+            sizes.append(parsed['size'])
+            if parsed['size'] in loaded_sizes:
+                continue
+            loaded_sizes.add(parsed['size'])
+            yield "track_sizes", parsed['size'], upsert(
+                {'size': parsed['size']},
+                {'is_active': True},
+                on_insert={
+                    'width': parsed['width'], 'pitch': parsed['pitch'], 'links': parsed['links'],
+                    'price': None,  # Price not available
+                    'is_in_stock': False,  # Admin must manually enable
+                }
+            )
+        if sizes:
+            yield "compatibility", f"{brand} {model}", upsert(
+                {'make': clean_text(brand), 'model': clean_text(model)},
+                {'is_active': True},
+                add_to_set={'track_sizes': sizes}
+            )
+
+
+# ============= RUNNER =============
+
+async def run_source(name: str, replace: bool = False, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Load one source; returns {collection: BulkWriter} with its counts"""
+    spec = SOURCES[name]
+    print(f"\n🚀 {name}: {spec['description']}")
+
+    if replace:
+        for collection, query in spec["reset"].items():
+            result = await db[collection].delete_many(query)
+            print(f"   🗑️  Cleared {result.deleted_count} documents from {collection}")
+
+    writers = {}
+    count = 0
+    async for collection, label, (op, touch) in spec["adapter"]():
+        if collection not in writers:
+            writers[collection] = BulkWriter(db[collection], batch_size, key_column="key")
+        count += 1
+        await writers[collection].add(op, count, label, touch)
+        if count % PROGRESS_EVERY == 0:
+            print(f"   … {count:,} records")
+
+    for collection, writer in writers.items():
+        await writer.flush()
+        print(f"   ✅ {collection}: {writer.inserted} inserted, {writer.updated} updated "
+              f"({writer.changed} changed), {len(writer.errors)} errors")
+        for error in writer.errors[:10]:
+            print(f"      ⚠️  {error['value']}: {error['reason']}")
+
+    await bump_collection_version(*(set(writers) | set(spec["reset"] if replace else [])))
+    return writers
+
+
+async def run(names: list, replace: bool = False, batch_size: int = DEFAULT_BATCH_SIZE):
+    started = datetime.utcnow()
+    totals = {}
+    for name in names:
+        writers = await run_source(name, replace, batch_size)
+        for collection, writer in writers.items():
+            total = totals.setdefault(collection, {"inserted": 0, "updated": 0, "errors": 0})
+            total["inserted"] += writer.inserted
+            total["updated"] += writer.updated
+            total["errors"] += len(writer.errors)
+
+    print("\n" + "=" * 80)
+    print(f"✅ ETL complete in {(datetime.utcnow() - started).total_seconds():.1f}s")
+    for collection, total in totals.items():
+        print(f"   📊 {collection}: {total['inserted']} inserted, {total['updated']} updated, {total['errors']} errors")
+    print("=" * 80)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load catalog data into MongoDB")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List available sources")
+
+    run_parser = commands.add_parser("run", help="Load one or more sources")
+    run_parser.add_argument("sources", nargs="+", choices=sorted(SOURCES))
+    run_parser.add_argument("--replace", action="store_true", help="Clear each source's data before loading")
+    run_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    rebuild_parser = commands.add_parser("rebuild", help="Replace the whole catalog: " + ", ".join(REBUILD_ORDER))
+    rebuild_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, spec in SOURCES.items():
+            print(f"{name:<24} {spec['description']}")
+        return
+
+    if args.command == "rebuild":
+        names, replace = REBUILD_ORDER, True
+    else:
+        names, replace = args.sources, args.replace
+
+    try:
+        asyncio.run(run(names, replace, args.batch_size))
+    finally:
+        client.close()
+        if "camso" in names:
+            import excel_parser
+            excel_parser.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Excel parsing in a process pool
+
+pd.read_excel (openpyxl) is pure Python and single-threaded, so large
+workbooks are parsed in worker processes: one task per sheet, with the
+parsed frames sent back as each sheet is read. The API event loop only
+awaits the results and never parses a spreadsheet itself.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+
+# Worker processes used for spreadsheet parsing
+EXCEL_PARSE_WORKERS = int(os.environ.get("EXCEL_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Shared pool, created on first use
+
+    Workers are spawned rather than forked so they do not inherit the
+    event loop and the MongoDB client threads of the parent.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=EXCEL_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _open(source):
+    # Paths are opened by the worker; uploaded bytes are pickled across
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _sheet_names(source) -> list:
+    with pd.ExcelFile(_open(source)) as excel_file:
+        return list(excel_file.sheet_names)
+
+
+def _parse_sheet(source, sheet_name) -> pd.DataFrame:
+    return pd.read_excel(_open(source), sheet_name=sheet_name)
+
+
+async def _run(future):
+    try:
+        return await future
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); start a fresh pool for the next file
+        shutdown_executor()
+        raise
+
+
+async def sheet_names(source) -> list:
+    """Sheet names of a workbook (path or bytes)"""
+    loop = asyncio.get_running_loop()
+    return await _run(loop.run_in_executor(get_executor(), _sheet_names, source))
+
+
+async def read_excel(source, sheet_name=0) -> pd.DataFrame:
+    """Parse one sheet of a workbook (path or bytes) in the process pool"""
+    loop = asyncio.get_running_loop()
+    return await _run(loop.run_in_executor(get_executor(), _parse_sheet, source, sheet_name))
+
+
+async def iter_sheets(source, names: list = None):
+    """Yield (sheet_name, DataFrame) for every sheet, parsing all sheets in parallel
+
+    Sheets are yielded in workbook order as soon as each one (and those
+    before it) is parsed.
+    """
+    if names is None:
+        names = await sheet_names(source)
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    tasks = [loop.run_in_executor(executor, _parse_sheet, source, name) for name in names]
+    try:
+        for name, task in zip(names, tasks):
+            yield name, await _run(task)
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,188 @@
+"""
+Catalog export
+
+Products are exported in the column layout of the import templates (see
+download_import_template and the column maps in import_pipeline), so an
+exported file can be edited and imported again. Rubber track exports add a SKU
+column, since the import otherwise derives the SKU from the row position. Part numbers and
+compatibility are exported with their stored fields.
+
+Rows are read from a MongoDB cursor in batches: CSV is streamed to the client
+as it is produced, and XLSX is written with openpyxl's write-only mode to a
+temporary file, so memory use does not grow with the number of rows.
+"""
+import csv
+import io
+import os
+import tempfile
+from openpyxl import Workbook
+from starlette.concurrency import run_in_threadpool
+from import_pipeline import RUBBER_TRACK_COLUMNS, UNDERCARRIAGE_COLUMNS
+
+# Documents fetched from MongoDB per round trip
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = ["csv", "xlsx"]
+
+# Product template -> (category, template columns)
+PRODUCT_TEMPLATES = {
+    "rubber-tracks": ("Rubber Tracks", [
+        'comp_name', 'machine_model', 'track_size', 'Price', 'eng_description', 'title_h1', 'sub_title_h2',
+        'page_title', 'eng_metakeyword', 'eng_meta_desc', 'shown_main_listin', 'SKU'
+    ]),
+    "bottom-rollers": ("Rollers", [
+        'Machine Model', 'Roller', 'Bottom / Front', 'Part Number', 'Alternate Part numbers', 'SKU',
+        'Fits following machine models', 'Description'
+    ]),
+    "sprockets": ("Sprockets", [
+        'Machine Model', 'ITEM', 'Part Number', 'Alternate Part numbers', 'SKU',
+        'Fits following machine models', 'Description'
+    ]),
+    "idlers": ("Idlers", [
+        'Machine Model', 'Roller', 'Front / Rear Idler', 'Part Number', 'Alternate Part numbers', 'SKU',
+        'Fits following machine models', 'Description'
+    ]),
+}
+
+PART_NUMBER_COLUMNS = [
+    "brand", "part_number", "part_type", "part_subtype", "product_name", "compatible_models",
+    "price", "cost", "is_in_stock", "description", "image_url", "is_active"
+]
+
+# Same fields as the compatibility bulk import
+COMPATIBILITY_COLUMNS = ["make", "model", "track_sizes", "is_active"]
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return value
+
+
+def _rubber_track_fields(doc: dict) -> dict:
+    title = doc.get("title") or ""
+    model = doc.get("specifications", {}).get("machine_model") or ""
+    brand = doc.get("brand")
+    # Brands unknown at import time are stored as "Universal"; the title keeps the one from the file
+    suffix = f" {model} Rubber Track {doc.get('size')}"
+    if model and title.endswith(suffix):
+        brand = title[:-len(suffix)]
+    return {
+        "brand": brand,
+        "title_suffix": model,
+        "size": doc.get("size"),
+        "price": doc.get("price"),
+        "description": doc.get("description"),
+        "seo_title": doc.get("seo_title"),
+        "title": doc.get("title"),
+        "seo_keywords": doc.get("seo_keywords"),
+        "seo_description": doc.get("seo_description"),
+        "in_stock": "Yes" if doc.get("in_stock") else "No",
+        "sku": doc.get("sku"),
+    }
+
+
+def _undercarriage_fields(doc: dict) -> dict:
+    specifications = doc.get("specifications", {})
+    title = doc.get("title") or ""
+    model = specifications.get("machine_model") or ""
+    # The import builds the title as "<brand> <model> <position> <item>" with
+    # the brand taken from the first word of the machine model (the brand
+    # stored on the product may have been replaced by "Universal"), and the
+    # first SEO keyword as "<brand> <item>" in lower case
+    title_brand = title.split(" ", 1)[0]
+    machine_model = f"{title_brand} {model}".strip()
+    rest = title[len(machine_model):].strip() if title.startswith(machine_model) else title
+    keywords = doc.get("seo_keywords") or [""]
+    item_lower = keywords[0][len(title_brand) + 1:] if keywords[0].startswith(title_brand.lower() + " ") else ""
+    if item_lower and rest.lower().endswith(item_lower):
+        item, position = rest[len(rest) - len(item_lower):], rest[:len(rest) - len(item_lower)].strip()
+    else:
+        item, position = rest, ""
+    return {
+        "machine_model": machine_model,
+        "item_type": item,
+        "position": position,
+        "part_number": doc.get("part_number"),
+        "alternate_parts": specifications.get("alternate_parts"),
+        "sku": doc.get("sku"),
+        "fits_models": specifications.get("fits_models"),
+        "description": doc.get("description"),
+    }
+
+
+def product_row(template: str, doc: dict) -> list:
+    """A product as a row of its import template"""
+    if template == "rubber-tracks":
+        fields, column_map = _rubber_track_fields(doc), RUBBER_TRACK_COLUMNS
+    else:
+        fields, column_map = _undercarriage_fields(doc), UNDERCARRIAGE_COLUMNS
+    return [_cell(fields.get(column_map[column])) for column in PRODUCT_TEMPLATES[template][1]]
+
+
+def export_spec(collection: str, template: str = None, brand: str = None) -> tuple:
+    """(collection name, query, columns, row function, filename) for an export; ValueError if unknown"""
+    query = {}
+    if collection == "products":
+        if template not in PRODUCT_TEMPLATES:
+            raise ValueError(f"Product exports need a template: {', '.join(PRODUCT_TEMPLATES)}")
+        category, columns = PRODUCT_TEMPLATES[template]
+        query["category"] = category
+        if brand:
+            query["brand"] = brand
+        return "products", query, columns, lambda doc: product_row(template, doc), f"{template}_export"
+
+    if collection == "part-numbers":
+        if brand:
+            query["brand"] = brand
+        return ("part_numbers", query, PART_NUMBER_COLUMNS,
+                lambda doc: [_cell(doc.get(column)) for column in PART_NUMBER_COLUMNS], "part_numbers_export")
+
+    if collection == "compatibility":
+        if brand:
+            query["make"] = brand
+        return ("compatibility", query, COMPATIBILITY_COLUMNS,
+                lambda doc: [_cell(doc.get(column)) for column in COMPATIBILITY_COLUMNS], "compatibility_export")
+
+    raise ValueError("Collection must be one of: products, part-numbers, compatibility")
+
+
+def _cursor(collection, query: dict):
+    return collection.find(query, {"_id": 0}).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+
+
+async def iter_csv(collection, query: dict, columns: list, row):
+    """Yield the export as CSV text, a batch of rows at a time"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+
+    count = 0
+    async for doc in _cursor(collection, query):
+        writer.writerow(row(doc))
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+async def write_xlsx(collection, query: dict, columns: list, row) -> str:
+    """Write the export to a temporary .xlsx file and return its path (the caller deletes it)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Export")
+    sheet.append(columns)
+    async for doc in _cursor(collection, query):
+        sheet.append(row(doc))
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await run_in_threadpool(workbook.save, path)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
@@ -1,11 +1,11 @@
 """
 Complete import of ALL machine models from unitedskidtracks.com
 Includes Track Loaders AND Mini Excavators
+
+Loaded by the catalog ETL (`python etl.py run machine-models-complete`);
+running this script replaces all machine models as before.
 """
-import asyncio
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
+import etl
 
 # Complete machine models data - Track Loaders
 track_loaders = {
@@ -57,82 +57,6 @@ mini_excavators = {
     'Wacker Neuson': ['28Z3', '3503', '38Z3'],
 }
 
-async def import_all_models():
-    """Import ALL machine models - Track Loaders + Mini Excavators"""
-    
-    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-    db_name = os.environ.get('DB_NAME', 'test_database')
-    
-    print(f"🔗 Connecting to MongoDB...")
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[db_name]
-    machine_models_collection = db.machine_models
-    
-    # Clear existing models
-    print(f"🗑️  Clearing existing models...")
-    await machine_models_collection.delete_many({})
-    
-    imported = 0
-    
-    print(f"\n{'='*70}")
-    print(f"🚀 IMPORTING TRACK LOADERS")
-    print(f"{'='*70}\n")
-    
-    for brand, models in track_loaders.items():
-        print(f"📦 {brand}: {len(models)} track loader models")
-        
-        for model_name in models:
-            model_doc = {
-                "brand": brand,
-                "model_name": model_name,
-                "full_name": f"{brand} {model_name}",
-                "equipment_type": "Track Loader",
-                "description": "",
-                "product_image": "",
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-            await machine_models_collection.insert_one(model_doc)
-            imported += 1
-    
-    print(f"\n{'='*70}")
-    print(f"🚀 IMPORTING MINI EXCAVATORS")
-    print(f"{'='*70}\n")
-    
-    for brand, models in mini_excavators.items():
-        print(f"🏗️  {brand}: {len(models)} mini excavator models")
-        
-        for model_name in models:
-            model_doc = {
-                "brand": brand,
-                "model_name": model_name,
-                "full_name": f"{brand} {model_name}",
-                "equipment_type": "Mini Excavator",
-                "description": "",
-                "product_image": "",
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            
-            await machine_models_collection.insert_one(model_doc)
-            imported += 1
-    
-    final_count = await machine_models_collection.count_documents({})
-    track_loader_count = await machine_models_collection.count_documents({"equipment_type": "Track Loader"})
-    mini_ex_count = await machine_models_collection.count_documents({"equipment_type": "Mini Excavator"})
-    
-    print(f"\n{'='*70}")
-    print(f"✅ IMPORT COMPLETE!")
-    print(f"{'='*70}")
-    print(f"📊 Statistics:")
-    print(f"   • Track Loaders: {track_loader_count}")
-    print(f"   • Mini Excavators: {mini_ex_count}")
-    print(f"   • Total Models: {final_count}")
-    print(f"   • Brands Covered: {len(set(list(track_loaders.keys()) + list(mini_excavators.keys())))}")
-    print(f"{'='*70}\n")
-    
-    client.close()
 
 if __name__ == "__main__":
-    asyncio.run(import_all_models())
+    etl.main(["run", "machine-models-complete", "--replace"])
@@ -0,0 +1,241 @@
+"""
+Product import jobs
+
+Every product import is recorded in the import_jobs collection with its
+progress (rows parsed, written, failed). Large files can be submitted as
+background jobs: the upload is saved to IMPORT_UPLOAD_DIR, the request returns
+the job id immediately and the parse/transform/write pipeline runs in an
+asyncio task on the API process. Admins poll the job and may request
+cancellation, which takes effect between chunks. Every row-level error is
+stored in import_job_errors as it occurs and can be downloaded as a CSV report.
+
+Each job records the worker process that runs it and a heartbeat_at timestamp
+the worker refreshes while the job is active. With several API workers
+sharing the database, a job is only failed as interrupted once its heartbeat
+is older than JOB_STALE_SECONDS, so jobs of live workers are left alone.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from bson import ObjectId
+from starlette.concurrency import run_in_threadpool
+from database import (
+    import_jobs_collection, import_job_errors_collection, products_collection, brands_collection,
+    bump_collection_version
+)
+import import_pipeline
+import pricing
+
+logger = logging.getLogger(__name__)
+
+# Uploads for background jobs are kept here until the job finishes
+IMPORT_UPLOAD_DIR = Path(os.environ.get("IMPORT_UPLOAD_DIR", Path(tempfile.gettempdir()) / "product_imports"))
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+# Identifies the worker process that runs a job
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# How often active jobs refresh heartbeat_at, and after how long without one a job counts as interrupted
+JOB_HEARTBEAT_SECONDS = int(os.environ.get("IMPORT_JOB_HEARTBEAT_SECONDS", "30"))
+JOB_STALE_SECONDS = int(os.environ.get("IMPORT_JOB_STALE_SECONDS", "300"))
+
+_tasks = {}
+
+
+async def create_job(filename: str, username: str = None, background: bool = False) -> str:
+    """Insert a queued job document and return its id"""
+    now = datetime.utcnow()
+    job = {
+        "filename": filename,
+        "status": "queued",
+        "background": background,
+        "created_by": username,
+        "worker_id": WORKER_ID,
+        "heartbeat_at": now,
+        "category": None,
+        "rows_parsed": 0,
+        "rows_written": 0,
+        "rows_skipped": 0,
+        "rows_failed": 0,
+        "inserted_count": 0,
+        "updated_count": 0,
+        "errors": [],
+        "cancel_requested": False,
+        "message": None,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+    }
+    result = await import_jobs_collection.insert_one(job)
+    return str(result.inserted_id)
+
+
+async def _heartbeat(job_filter: dict):
+    """Refresh a running job's heartbeat_at until cancelled"""
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            await import_jobs_collection.update_one(job_filter, {"$set": {"heartbeat_at": datetime.utcnow()}})
+        except Exception:
+            logger.exception("Could not refresh import job heartbeat")
+
+
+async def run_job(job_id: str, frames, batch_size: int = import_pipeline.DEFAULT_BATCH_SIZE) -> dict:
+    """Run the import pipeline for a job, persisting progress after every chunk
+
+    Returns the finished job document; failures are recorded on the job
+    rather than raised.
+    """
+    job_filter = {"_id": ObjectId(job_id)}
+    now = datetime.utcnow()
+    await import_jobs_collection.update_one(
+        job_filter, {"$set": {"status": "running", "started_at": now, "worker_id": WORKER_ID, "heartbeat_at": now}}
+    )
+    heartbeat = asyncio.create_task(_heartbeat(job_filter))
+
+    async def store_errors(errors):
+        now = datetime.utcnow()
+        await import_job_errors_collection.insert_many(
+            [{"job_id": job_id, **error, "created_at": now} for error in errors], ordered=False
+        )
+
+    async def progress(counts):
+        job = await import_jobs_collection.find_one_and_update(
+            job_filter, {"$set": counts}, projection={"cancel_requested": 1}
+        )
+        if job and job.get("cancel_requested"):
+            raise import_pipeline.ImportCancelled()
+
+    status = "completed"
+    message = None
+    result = None
+    try:
+        brand_names = await import_pipeline.load_brand_names(brands_collection)
+        pricing_rules = await pricing.load_rules("products", include_import_only=True)
+        result = await import_pipeline.import_frames(
+            frames, products_collection, brand_names, batch_size, progress=progress, on_errors=store_errors,
+            pricing_rules=pricing_rules
+        )
+        message = (
+            f"Import completed. {result['success_count']} products imported/updated, "
+            f"{result['skipped_count']} unchanged, {result['error_count']} errors"
+        )
+    except import_pipeline.ImportCancelled:
+        status = "cancelled"
+        message = "Import cancelled"
+    except ValueError as e:
+        # Unrecognized file format and similar problems with the upload itself
+        status = "failed"
+        message = str(e)
+    except Exception as e:
+        status = "failed"
+        message = str(e)
+        logger.exception(f"Import job {job_id} failed")
+    finally:
+        heartbeat.cancel()
+
+    update = {"status": status, "message": message, "finished_at": datetime.utcnow()}
+    if result:
+        update.update({
+            "category": result["category"],
+            "rows_parsed": result["rows"],
+            "rows_written": result["success_count"],
+            "rows_skipped": result["skipped_count"],
+            "rows_failed": result["error_count"],
+            "inserted_count": result["inserted_count"],
+            "updated_count": result["updated_count"],
+            "errors": result["errors"],
+        })
+    await import_jobs_collection.update_one(job_filter, {"$set": update})
+
+    job = await import_jobs_collection.find_one(job_filter)
+    # Cancelled and failed jobs may still have written some chunks
+    if job["rows_written"]:
+        await bump_collection_version("products")
+    return job
+
+
+async def _run_saved_upload(job_id: str, path: Path, filename: str, batch_size: int, chunk_size: int):
+    try:
+        with open(path, "rb") as f:
+            frames = import_pipeline.iter_file_frames(f, filename, chunk_size)
+            await run_job(job_id, frames, batch_size)
+    finally:
+        _tasks.pop(job_id, None)
+        path.unlink(missing_ok=True)
+
+
+async def submit_background_job(upload, username: str = None,
+                                batch_size: int = import_pipeline.DEFAULT_BATCH_SIZE,
+                                chunk_size: int = import_pipeline.DEFAULT_CHUNK_SIZE) -> str:
+    """Save the upload to disk and start importing it in the background"""
+    job_id = await create_job(upload.filename, username, background=True)
+
+    IMPORT_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    path = IMPORT_UPLOAD_DIR / f"{job_id}{Path(upload.filename).suffix.lower()}"
+    upload.file.seek(0)
+    with open(path, "wb") as f:
+        await run_in_threadpool(shutil.copyfileobj, upload.file, f)
+
+    _tasks[job_id] = asyncio.create_task(
+        _run_saved_upload(job_id, path, upload.filename, batch_size, chunk_size)
+    )
+    return job_id
+
+
+async def request_cancel(job_id: str):
+    """Flag a job for cancellation; returns the updated job or None if not found"""
+    job_filter = {"_id": ObjectId(job_id)}
+    job = await import_jobs_collection.find_one(job_filter)
+    if not job:
+        return None
+    if job["status"] in ACTIVE_STATUSES:
+        await import_jobs_collection.update_one(job_filter, {"$set": {"cancel_requested": True}})
+    return await import_jobs_collection.find_one(job_filter)
+
+
+async def fail_interrupted_jobs() -> int:
+    """Mark active jobs whose worker stopped sending heartbeats as failed"""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=JOB_STALE_SECONDS)
+    result = await import_jobs_collection.update_many(
+        {"status": {"$in": ACTIVE_STATUSES}, "$or": [
+            {"heartbeat_at": {"$lt": cutoff}},
+            # Jobs created before heartbeats were recorded
+            {"heartbeat_at": {"$exists": False}, "created_at": {"$lt": cutoff}},
+        ]},
+        {"$set": {"status": "failed", "message": "Interrupted: the server running the import stopped",
+                  "finished_at": now}}
+    )
+    if result.modified_count:
+        logger.info(f"Marked {result.modified_count} interrupted import jobs as failed")
+    return result.modified_count
+
+
+async def iter_error_report(job_id: str, batch_size: int = 1000):
+    """Yield a job's row errors as CSV text, a batch of rows at a time"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(import_pipeline.ERROR_COLUMNS)
+    cursor = import_job_errors_collection.find(
+        {"job_id": job_id}, {"_id": 0, "row": 1, "column": 1, "value": 1, "reason": 1}
+    ).sort("row", 1).batch_size(batch_size)
+
+    count = 0
+    async for error in cursor:
+        writer.writerow([error.get(column, "") for column in import_pipeline.ERROR_COLUMNS])
+        count += 1
+        if count % batch_size == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
@@ -1,23 +1,10 @@
 """
 Import Kubota part numbers from Rubbertrax data
-"""
-import asyncio
-import uuid
-import re
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-from datetime import datetime
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-db_name = os.environ['DB_NAME']
-
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+The data is loaded by the catalog ETL (`python etl.py run kubota`); running this
+script replaces the Kubota part numbers as before.
+"""
+import etl
 
 # Kubota parts data extracted from Rubbertrax
 KUBOTA_PARTS = [
@@ -66,62 +53,5 @@ KUBOTA_PARTS = [
 ]
 
 
-async def import_kubota_parts():
-    print("🚀 Importing Kubota Part Numbers from Rubbertrax...")
-    print("=" * 80)
-    
-    # Clear existing Kubota parts
-    result = await db.part_numbers.delete_many({"brand": "Kubota"})
-    print(f"🗑️  Cleared {result.deleted_count} existing Kubota parts\n")
-    
-    # Import new parts
-    imported_count = 0
-    for part_data in KUBOTA_PARTS:
-        part_doc = {
-            "id": str(uuid.uuid4()),
-            "brand": "Kubota",
-            "part_number": part_data["part_number"],
-            "part_type": part_data["part_type"],
-            "part_subtype": part_data.get("part_subtype"),
-            "product_name": part_data["product_name"],
-            "compatible_models": part_data["compatible_models"],
-            "price": None,  # To be set by admin
-            "description": None,
-            "image_url": None,
-            "is_active": True,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        try:
-            await db.part_numbers.insert_one(part_doc)
-            imported_count += 1
-        except Exception as e:
-            print(f"⚠️  Skipped duplicate: {part_data['part_number']} - {e}")
-    
-    print("=" * 80)
-    print(f"✅ Import Complete!")
-    print(f"   Total parts imported: {imported_count}")
-    print("=" * 80)
-    
-    # Summary by part type
-    rollers = await db.part_numbers.count_documents({"brand": "Kubota", "part_type": "roller"})
-    sprockets = await db.part_numbers.count_documents({"brand": "Kubota", "part_type": "sprocket"})
-    idlers = await db.part_numbers.count_documents({"brand": "Kubota", "part_type": "idler"})
-    
-    print(f"\n📊 Kubota Parts Summary:")
-    print(f"   Rollers: {rollers}")
-    print(f"   Sprockets: {sprockets}")
-    print(f"   Idlers: {idlers}")
-    print(f"   Total: {rollers + sprockets + idlers}")
-    
-    # Show sample parts
-    print(f"\n📋 Sample Parts (first 5):")
-    async for part in db.part_numbers.find({"brand": "Kubota"}).limit(5):
-        print(f"   {part['part_number']} - {part['product_name']} ({part['part_type']})")
-    
-    print("\n✨ Kubota parts ready for admin pricing!")
-
-
 if __name__ == "__main__":
-    asyncio.run(import_kubota_parts())
+    etl.main(["run", "kubota", "--replace"])
@@ -1,10 +1,10 @@
 """
 Script to import all machine models from machineModels.js into MongoDB
+
+Loaded by the catalog ETL (`python etl.py run machine-models-legacy`); only
+models that are not in the database yet are added.
 """
-import asyncio
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from datetime import datetime
+import etl
 
 # Machine models data extracted from machineModels.js
 machine_models_data = {
@@ -40,79 +40,6 @@ machine_models_data = {
     'Wacker Neuson': ['701s', '803', '1404', '1501', '1701', '2503', 'ST31'],
 }
 
-async def import_models():
-    """Import all machine models into MongoDB"""
-    
-    # Get database connection details from environment
-    mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-    db_name = os.environ.get('DB_NAME', 'test_database')
-    
-    print(f"🔗 Connecting to MongoDB at {mongo_url}")
-    print(f"📊 Database: {db_name}")
-    
-    # Connect to MongoDB
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[db_name]
-    machine_models_collection = db.machine_models
-    
-    # Check if models already exist
-    existing_count = await machine_models_collection.count_documents({})
-    if existing_count > 0:
-        print(f"ℹ️  Found {existing_count} existing models")
-        confirm = input("Do you want to continue and add missing models? (y/n): ")
-        if confirm.lower() != 'y':
-            print("❌ Import cancelled")
-            return
-    
-    imported = 0
-    skipped = 0
-    total = sum(len(models) for models in machine_models_data.values())
-    
-    print(f"\n🚀 Starting import of {total} machine models...")
-    
-    for brand, models in machine_models_data.items():
-        print(f"\n📦 Processing {brand} ({len(models)} models)...")
-        
-        for model_name in models:
-            # Check if model already exists
-            existing = await machine_models_collection.find_one({
-                "brand": brand,
-                "model_name": model_name
-            })
-            
-            if existing:
-                skipped += 1
-                print(f"  ⏭️  Skipped: {brand} {model_name} (already exists)")
-            else:
-                # Create new model
-                model_doc = {
-                    "brand": brand,
-                    "model_name": model_name,
-                    "full_name": f"{brand} {model_name}",
-                    "description": "",
-                    "product_image": "",
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-                
-                await machine_models_collection.insert_one(model_doc)
-                imported += 1
-                print(f"  ✅ Imported: {brand} {model_name}")
-    
-    # Final count
-    final_count = await machine_models_collection.count_documents({})
-    
-    print(f"\n{'='*60}")
-    print(f"✅ Import Complete!")
-    print(f"{'='*60}")
-    print(f"📊 Statistics:")
-    print(f"   • Total models in file: {total}")
-    print(f"   • Newly imported: {imported}")
-    print(f"   • Already existed: {skipped}")
-    print(f"   • Total in database: {final_count}")
-    print(f"{'='*60}\n")
-    
-    client.close()
 
 if __name__ == "__main__":
-    asyncio.run(import_models())
+    etl.main(["run", "machine-models-legacy"])
@@ -0,0 +1,641 @@
+"""
+Product import pipeline
+
+Parse -> transform -> write. The transform stage turns a whole spreadsheet
+frame into ready product documents with vectorized pandas column operations
+and has no database dependency, so it can be run and benchmarked on its own.
+The write stage sends unordered bulk upserts keyed on SKU, flushed in batches,
+instead of one find_one plus insert/update round trip per row. Rows whose
+content hash matches the stored product are skipped, so re-importing the same
+sheet does not touch updated_at (and the caches and sitemaps keyed on it).
+Stock (in_stock, stock_quantity and the offer availability) is only set when
+a product is created; after that orders and the admin own it, so
+re-importing a sheet never overwrites it.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+import excel_parser
+import pricing
+
+# Number of upserts sent to MongoDB per bulk_write call
+DEFAULT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+
+# Number of CSV rows parsed and transformed at a time (bounds peak memory)
+DEFAULT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", "5000"))
+
+# Rubber Tracks template columns -> product fields
+RUBBER_TRACK_COLUMNS = {
+    'comp_name': 'brand',
+    'machine_model': 'title_suffix',
+    'track_size': 'size',
+    'Price': 'price',
+    'eng_description': 'description',
+    'title_h1': 'seo_title',
+    'sub_title_h2': 'title',
+    'page_title': 'seo_title',
+    'eng_metakeyword': 'seo_keywords',
+    'eng_meta_desc': 'seo_description',
+    'shown_main_listin': 'in_stock',
+    'SKU': 'sku',
+    'sku': 'sku'
+}
+
+# Rollers / Sprockets / Idlers template columns -> product fields
+UNDERCARRIAGE_COLUMNS = {
+    'Machine Model': 'machine_model',
+    'machine_model': 'machine_model',
+    'Roller': 'item_type',
+    'ITEM': 'item_type',
+    'item': 'item_type',
+    'Bottom / Front': 'position',
+    'Front / Rear Idler': 'position',
+    'Part Number': 'part_number',
+    'part_number': 'part_number',
+    'Alternate Part numbers': 'alternate_parts',
+    'alternate_part_numbers': 'alternate_parts',
+    'SKU': 'sku',
+    'sku': 'sku',
+    'Fits following machine models': 'fits_models',
+    'fits_following_machine_models': 'fits_models',
+    'Description': 'description',
+    'description': 'description'
+}
+
+IN_STOCK_VALUES = ['yes', 'true', '1', 'y']
+
+# Fields generated from the others (or timestamps); not compared in dry-run diffs
+# and not part of the content hash
+DERIVED_FIELDS = {"created_at", "updated_at", "schema_markup", "alt_tags", "source_hash"}
+
+# Fields only written when a product is created (also left out of diffs and the content hash)
+INSERT_ONLY_FIELDS = {"in_stock", "stock_quantity"}
+
+DIFF_COLUMNS = ["row", "sku", "status", "field", "old_value", "new_value", "message"]
+
+ERROR_COLUMNS = ["row", "column", "value", "reason"]
+
+# Number of row errors returned inline when the full list goes to an error report
+ERROR_PREVIEW = 10
+
+
+def detect_format(columns) -> tuple:
+    """Work out (category, column mapping) from a file's header row"""
+    lowered = [str(col).lower().strip() for col in columns]
+    names = set(lowered)
+
+    # Rubber Tracks format
+    if 'comp_name' in names or 'track_size' in names:
+        return "Rubber Tracks", RUBBER_TRACK_COLUMNS
+
+    # Rollers, Sprockets, Idlers format (unified handling)
+    if 'part number' in names or 'part_number' in names:
+        if any('roller' in col for col in lowered):
+            category = "Idlers" if any('idler' in col for col in lowered) else "Rollers"
+        elif any('sprocket' in col for col in lowered):
+            category = "Sprockets"
+        else:
+            category = "Undercarriage Parts"
+        return category, UNDERCARRIAGE_COLUMNS
+
+    raise ValueError("Unrecognized file format. Please use the provided templates.")
+
+
+def rename_columns(df: pd.DataFrame, column_mapping: dict) -> pd.DataFrame:
+    """Rename template columns (case-insensitive) to product fields
+
+    Several template columns can map to the same field (title_h1 and page_title
+    both feed seo_title); the first non-empty value wins.
+    """
+    lookup = {template_col.lower(): target for template_col, target in column_mapping.items()}
+    renamed = {}
+    for col in df.columns:
+        target = lookup.get(str(col).lower().strip())
+        if target is None:
+            continue
+        if target in renamed:
+            renamed[target] = renamed[target].where(renamed[target].notna(), df[col])
+        else:
+            renamed[target] = df[col]
+    return pd.DataFrame(renamed, index=df.index)
+
+
+def _text(df: pd.DataFrame, column: str) -> pd.Series:
+    """Column as stripped strings, with missing cells and missing columns as ''"""
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[column]
+    return values.astype(str).str.strip().where(values.notna(), "")
+
+
+def _or(values: pd.Series, default) -> pd.Series:
+    """Replace empty strings with a default (scalar or aligned Series)"""
+    return values.where(values != "", default)
+
+
+def _keyword_lists(values: pd.Series) -> list:
+    return [[k.strip() for k in v.split(',') if k.strip()] for v in values.tolist()]
+
+
+def _product_document(sku, title, description, price, brand, category, size, part_number,
+                      in_stock, machine_model, seo_title, seo_description, seo_keywords, now) -> dict:
+    return {
+        "sku": sku,
+        "title": title,
+        "description": description,
+        "price": price,
+        "brand": brand,
+        "category": category,
+        "size": size,
+        "part_number": part_number,
+        "images": [],
+        "in_stock": in_stock,
+        "stock_quantity": 10 if in_stock else 0,
+        "specifications": {
+            "machine_model": machine_model,
+            "warranty": "1 Year" if category == "Rubber Tracks" else "6 Months"
+        },
+        "seo_title": seo_title,
+        "seo_description": seo_description,
+        "seo_keywords": seo_keywords,
+        "alt_tags": [title],
+        "schema_markup": {
+            "@context": "https://schema.org/",
+            "@type": "Product",
+            "name": title,
+            "description": description,
+            "sku": sku,
+            "brand": {
+                "@type": "Brand",
+                "name": brand
+            },
+            "offers": {
+                "@type": "Offer",
+                "url": f"https://rubbertrackwholesale.com/product/{sku}",
+                "priceCurrency": "USD",
+                "price": str(price),
+                "availability": "https://schema.org/InStock" if in_stock else "https://schema.org/OutOfStock"
+            }
+        },
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def row_error(row: int, column: str, value, reason: str) -> dict:
+    """A row-level import error as reported to the admin and in the error CSV"""
+    return {"row": row, "column": column, "value": "" if value is None else str(value), "reason": reason}
+
+
+def source_fields(doc: dict) -> list:
+    """Top-level fields of an import document that come from the file"""
+    return [key for key in doc if key not in DERIVED_FIELDS and key not in INSERT_ONLY_FIELDS]
+
+
+def content_hash(doc: dict) -> str:
+    """SHA-1 of a product's source fields, used to skip unchanged rows on re-import"""
+    source = {key: doc[key] for key in source_fields(doc)}
+    return hashlib.sha1(json.dumps(source, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def transform_products(df: pd.DataFrame, category: str, brand_names: set, pricing_rules: list = None) -> tuple:
+    """Turn a renamed spreadsheet frame into product documents in one columnar pass
+
+    Returns (documents, row_numbers, errors). Row numbers are spreadsheet rows
+    (header is row 1), taken from the frame index so chunked frames keep their
+    position in the file. Brands not in `brand_names` are imported as "Universal".
+    Rows without a price are priced by `pricing_rules` (see pricing.py).
+    """
+    now = datetime.utcnow()
+    index = pd.Series(df.index, index=df.index).astype(str)
+    row_numbers = (df.index + 2).tolist()
+    errors = []
+
+    if category == "Rubber Tracks":
+        size = _text(df, 'size')
+        valid = size != ""
+        errors = [
+            row_error(row, 'track_size', '', "Missing track size")
+            for row in (df.index[~valid.values] + 2).tolist()
+        ]
+
+        # Exports carry the stored SKU; new rows get one from the size and row
+        sku = _or(_text(df, 'sku'), "RT-" + size.str.replace('x', '-', regex=False) + "-" + index)
+        prices = _text(df, 'price').str.replace(r'[$,]', '', regex=True)
+        price = pd.to_numeric(prices, errors='coerce')
+        if 'in_stock' in df:
+            in_stock = df['in_stock'].astype(str).str.strip().str.lower().isin(IN_STOCK_VALUES)
+        else:
+            in_stock = pd.Series(True, index=df.index)
+
+        brand = _or(_text(df, 'brand'), "Universal")
+        machine_model = _text(df, 'title_suffix')
+        title = (brand + " " + machine_model + " Rubber Track " + size).where(
+            machine_model != "", _or(_text(df, 'title'), brand + " Rubber Track " + size)
+        )
+        part_number = sku
+        brand = brand.where(brand.isin(brand_names), "Universal")
+        if price.isna().any():
+            rule_price = pricing.rule_prices(pd.DataFrame(
+                {"brand": brand, "category": category, "width": pricing.width_from_size(size)}, index=df.index
+            ), pricing_rules)
+            price = price.fillna(rule_price)
+        price = price.fillna(0.0)
+        description = _or(_text(df, 'description'), "Premium " + category + " for " + brand)
+        seo_keywords = _keyword_lists(_text(df, 'seo_keywords'))
+    else:
+        sku = _or(_text(df, 'sku'), f"{category[:3].upper()}-" + index)
+        part_number = _or(_text(df, 'part_number'), sku)
+
+        # Brand is the first word of the machine model, the rest is the model
+        machine_model_full = _text(df, 'machine_model')
+        parts = machine_model_full.str.split(n=1, expand=True).reindex(columns=[0, 1])
+        brand = _or(parts[0].fillna(""), "Universal")
+        machine_model = _or(parts[1].fillna("").str.strip(), machine_model_full)
+
+        item_type = _or(_text(df, 'item_type'), category)
+        position = _text(df, 'position')
+        title = (brand + " " + machine_model + " " + position + " " + item_type)
+        title = title.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+        valid = pd.Series(True, index=df.index)
+        size = pd.Series("N/A", index=df.index)
+        in_stock = pd.Series(True, index=df.index)
+        description = _or(_text(df, 'description'), "Premium " + item_type + " for " + brand + " " + machine_model)
+        seo_keywords = [
+            [f"{b.lower()} {t.lower()}", p.lower(), category.lower()]
+            for b, t, p in zip(brand.tolist(), item_type.tolist(), part_number.tolist())
+        ]
+        brand = brand.where(brand.isin(brand_names), "Universal")
+        price = pricing.rule_prices(
+            pd.DataFrame({"brand": brand, "category": category}, index=df.index), pricing_rules
+        ).fillna(pricing.DEFAULT_PART_PRICES.get(category, pricing.DEFAULT_PART_PRICE))
+
+    seo_title = _or(_text(df, 'seo_title'), title + " | Rubber Track Wholesale")
+    seo_description = _or(_text(df, 'seo_description'), "Buy " + title + " at wholesale prices. Free shipping available.")
+    alternate_parts = _text(df, 'alternate_parts')
+    fits_models = _text(df, 'fits_models')
+
+    documents = []
+    document_rows = []
+    columns = zip(
+        row_numbers, valid.tolist(), sku.tolist(), title.tolist(), description.tolist(), price.tolist(),
+        brand.tolist(), size.tolist(), part_number.tolist(), in_stock.tolist(), machine_model.tolist(),
+        seo_title.tolist(), seo_description.tolist(), seo_keywords, alternate_parts.tolist(), fits_models.tolist()
+    )
+    for (row, ok, sku_, title_, description_, price_, brand_, size_, part_number_, in_stock_, model_,
+         seo_title_, seo_description_, keywords_, alternate_, fits_) in columns:
+        if not ok:
+            continue
+        doc = _product_document(
+            sku_, title_, description_, float(price_), brand_, category, size_, part_number_,
+            bool(in_stock_), model_, seo_title_, seo_description_, keywords_, now
+        )
+        if alternate_:
+            doc["specifications"]["alternate_parts"] = alternate_
+        if fits_:
+            doc["specifications"]["fits_models"] = fits_
+        doc["source_hash"] = content_hash(doc)
+        documents.append(doc)
+        document_rows.append(row)
+
+    return documents, document_rows, errors
+
+
+async def iter_csv_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield DataFrames of at most `chunk_size` rows, parsed incrementally from a file object
+
+    Parsing runs in the threadpool so the event loop is not blocked, and only
+    one chunk is held in memory at a time.
+    """
+    fileobj.seek(0)
+    reader = pd.read_csv(fileobj, chunksize=chunk_size)
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, reader, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        reader.close()
+
+
+async def iter_file_frames(fileobj, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield raw frames of at most `chunk_size` rows for an uploaded spreadsheet (CSV or Excel)"""
+    if filename.lower().endswith('.csv'):
+        chunks = iter_csv_chunks(fileobj, chunk_size)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+    else:
+        # openpyxl is slow and holds the GIL, so the first sheet is parsed in a worker process
+        fileobj.seek(0)
+        contents = await run_in_threadpool(fileobj.read)
+        df = await excel_parser.read_excel(contents)
+        # Sliced like CSV chunks so each transform and write stays bounded (an empty sheet is still yielded once)
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+async def load_stored_products(products_collection, documents: list) -> dict:
+    """source_hash and brand of the stored products with the documents' SKUs, in one $in query
+
+    The hash is written by imports and dropped by admin edits, bulk edits and
+    repricing, so an edited product never matches and is written again. The
+    brand keeps the dashboard's per-brand product counts in step.
+    """
+    if not documents:
+        return {}
+    cursor = products_collection.find(
+        {"sku": {"$in": [doc["sku"] for doc in documents]}}, {"_id": 0, "sku": 1, "source_hash": 1, "brand": 1}
+    )
+    return {product["sku"]: product async for product in cursor}
+
+
+async def load_brand_names(brands_collection) -> set:
+    """Load every brand name once so rows can be checked in memory"""
+    return set(await brands_collection.distinct("name"))
+
+
+def product_upsert(product_data: dict) -> UpdateOne:
+    """Upsert operation for a product keyed on SKU (created_at and stock are only set on insert)"""
+    fields = dict(product_data)
+    on_insert = {"created_at": fields.pop("created_at", None) or datetime.utcnow()}
+    on_insert.update({field: fields.pop(field) for field in INSERT_ONLY_FIELDS if field in fields})
+    # The schema.org offer is set field by field so its availability can follow the stock
+    schema_markup = fields.pop("schema_markup", None)
+    if schema_markup:
+        offers = dict(schema_markup.get("offers", {}))
+        if "availability" in offers:
+            on_insert["schema_markup.offers.availability"] = offers.pop("availability")
+        fields.update({f"schema_markup.{key}": value for key, value in schema_markup.items() if key != "offers"})
+        fields.update({f"schema_markup.offers.{key}": value for key, value in offers.items()})
+    return UpdateOne({"sku": fields["sku"]}, {"$set": fields, "$setOnInsert": on_insert}, upsert=True)
+
+
+class BulkWriter:
+    """Collects write operations and flushes them with unordered bulk_write in batches
+
+    Each operation is tagged with the spreadsheet row and key value it came
+    from, so per-row errors can be reported from the BulkWriteError details.
+    Errors are appended to `errors` (a new list unless one is passed in). An
+    operation may come with a `touch` operation that is written before the
+    batch (see etl.upsert); `changed` counts the documents touches modified.
+    """
+
+    def __init__(self, collection, batch_size: int = DEFAULT_BATCH_SIZE, key_column: str = "sku", errors: list = None):
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.key_column = key_column
+        self.ops = []
+        self.rows = []
+        self.keys = []
+        self.touches = []
+        self.inserted = 0
+        self.updated = 0
+        self.written = 0
+        self.changed = 0
+        self.errors = [] if errors is None else errors
+
+    async def add(self, op, row_number: int, key=None, touch=None):
+        self.ops.append(op)
+        self.rows.append(row_number)
+        self.keys.append(key)
+        self.touches.append(touch)
+        if len(self.ops) >= self.batch_size:
+            await self.flush()
+
+    async def _bulk_write(self, ops: list, rows: list, keys: list) -> dict:
+        try:
+            result = await self.collection.bulk_write(ops, ordered=False)
+            return result.bulk_api_result
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                index = error['index']
+                self.errors.append(row_error(
+                    rows[index], self.key_column, keys[index], error.get('errmsg', 'Write failed')
+                ))
+            return e.details
+
+    async def flush(self):
+        if not self.ops:
+            return
+        ops, rows, keys, touches = self.ops, self.rows, self.keys, self.touches
+        self.ops, self.rows, self.keys, self.touches = [], [], [], []
+
+        touched = [i for i, touch in enumerate(touches) if touch is not None]
+        if touched:
+            # Touches compare the stored values, so they run before the operations change them
+            details = await self._bulk_write(
+                [touches[i] for i in touched], [rows[i] for i in touched], [keys[i] for i in touched]
+            )
+            self.changed += details.get("nModified", 0)
+
+        details = await self._bulk_write(ops, rows, keys)
+        failed = len(details.get("writeErrors", []))
+        self.inserted += details.get("nUpserted", 0) + details.get("nInserted", 0)
+        self.updated += details.get("nMatched", 0)
+        self.written += len(ops) - failed
+
+
+class ImportCancelled(Exception):
+    """Raised by a progress callback to stop an import between chunks"""
+
+
+async def import_frames(frames, products_collection, brand_names: set, batch_size: int = DEFAULT_BATCH_SIZE,
+                        progress=None, on_errors=None, pricing_rules: list = None) -> dict:
+    """Run transform and bulk write over an async iterable of raw spreadsheet frames
+
+    The file format is detected from the first frame. Each frame is transformed
+    in the threadpool (keeping the event loop free) and written as soon as it is
+    done, so memory is bounded by the frame size. Rows whose content hash
+    matches the stored product are counted as skipped. If given, `progress` is
+    awaited after every frame with the running counts and may raise
+    ImportCancelled.
+
+    Row errors are returned in full, unless `on_errors` is given: then each
+    batch of new errors is handed to it as it occurs and only the first
+    ERROR_PREVIEW are kept for the result.
+    """
+    import stats
+    errors = []
+    preview = []
+    error_count = 0
+    writer = BulkWriter(products_collection, batch_size, errors=errors)
+    category = None
+    column_mapping = None
+    rows = 0
+    skipped = 0
+
+    async def report_errors():
+        nonlocal error_count
+        error_count += len(errors)
+        if on_errors and errors:
+            preview.extend(errors[:ERROR_PREVIEW - len(preview)])
+            await on_errors(list(errors))
+            errors.clear()
+
+    try:
+        async for frame in frames:
+            if category is None:
+                category, column_mapping = detect_format(frame.columns)
+            documents, document_rows, frame_errors = await run_in_threadpool(
+                transform_products, rename_columns(frame, column_mapping), category, brand_names, pricing_rules
+            )
+            rows += len(frame)
+            errors.extend(frame_errors)
+            stored = await load_stored_products(products_collection, documents)
+            brand_deltas = {}
+            for product_data, row in zip(documents, document_rows):
+                sku, brand = product_data["sku"], product_data["brand"]
+                current = stored.get(sku)
+                if current and current.get("source_hash") == product_data["source_hash"]:
+                    skipped += 1
+                    continue
+                if current is None or current.get("brand") != brand:
+                    if current is not None:
+                        brand_deltas[current.get("brand")] = brand_deltas.get(current.get("brand"), 0) - 1
+                    brand_deltas[brand] = brand_deltas.get(brand, 0) + 1
+                # A SKU repeated later in the frame is compared with this row
+                stored[sku] = product_data
+                await writer.add(product_upsert(product_data), row, sku)
+            # Flushed per frame so the next frame and the product counts see these writes
+            await writer.flush()
+            await stats.adjust_product_counts(brand_deltas)
+            if on_errors:
+                await report_errors()
+            if progress:
+                await progress({
+                    "category": category,
+                    "rows_parsed": rows,
+                    "rows_written": writer.written,
+                    "rows_skipped": skipped,
+                    "rows_failed": error_count + len(errors),
+                })
+    finally:
+        # Release the parser while the upload is still open
+        if hasattr(frames, "aclose"):
+            await frames.aclose()
+
+    await writer.flush()
+    if on_errors:
+        await report_errors()
+    else:
+        error_count = len(errors)
+
+    return {
+        "category": category,
+        "rows": rows,
+        "success_count": writer.written,
+        "inserted_count": writer.inserted,
+        "updated_count": writer.updated,
+        "skipped_count": skipped,
+        "error_count": error_count,
+        "errors": preview if on_errors else errors,
+    }
+
+
+def _flatten(doc: dict, prefix: str = "") -> dict:
+    """Nested dicts as dotted keys ({"specifications": {"warranty": x}} -> {"specifications.warranty": x})"""
+    flat = {}
+    for key, value in doc.items():
+        if not prefix and (key in DERIVED_FIELDS or key in INSERT_ONLY_FIELDS):
+            continue
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def diff_fields(existing: dict, incoming: dict) -> list:
+    """Field-level differences as (field, old, new) for fields the import would set"""
+    return [
+        (field, existing.get(field), value)
+        for field, value in incoming.items()
+        if existing.get(field) != value
+    ]
+
+
+async def diff_frames(frames, products_collection, brand_names: set, pricing_rules: list = None) -> dict:
+    """Dry run: classify every row as new, changed, unchanged or invalid without writing
+
+    Frames are transformed in the threadpool. Existing products are fetched
+    with one $in query on SKU per frame and compared in memory. Returns counts, per-field change counts, transform
+    errors and the diff as CSV text (unchanged rows are omitted).
+    """
+    category = None
+    column_mapping = None
+    rows = 0
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    field_counts = {}
+    errors = []
+    seen = {}
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(DIFF_COLUMNS)
+
+    try:
+        async for frame in frames:
+            if category is None:
+                category, column_mapping = detect_format(frame.columns)
+            documents, document_rows, frame_errors = await run_in_threadpool(
+                transform_products, rename_columns(frame, column_mapping), category, brand_names, pricing_rules
+            )
+            rows += len(frame)
+            errors.extend(frame_errors)
+
+            skus = [doc["sku"] for doc in documents]
+            projection = {"_id": 0, **{field: 0 for field in DERIVED_FIELDS - {"source_hash"}}}
+            existing = {}
+            async for product in products_collection.find({"sku": {"$in": skus}}, projection):
+                existing[product["sku"]] = product
+
+            for doc, row in zip(documents, document_rows):
+                sku = doc["sku"]
+                # A SKU repeated in the file is compared with its earlier row
+                current = seen.get(sku, existing.get(sku))
+                seen[sku] = doc
+                if current is None:
+                    counts["new"] += 1
+                    writer.writerow([row, sku, "new", "", "", "", ""])
+                    continue
+                if current.get("source_hash") == doc["source_hash"]:
+                    counts["unchanged"] += 1
+                    continue
+                changes = diff_fields(_flatten(current), _flatten(doc))
+                if not changes:
+                    counts["unchanged"] += 1
+                    continue
+                counts["changed"] += 1
+                for field, old, new in changes:
+                    field_counts[field] = field_counts.get(field, 0) + 1
+                    writer.writerow([row, sku, "changed", field, old, new, ""])
+    finally:
+        if hasattr(frames, "aclose"):
+            await frames.aclose()
+
+    for error in errors:
+        writer.writerow([error["row"], "", "invalid", error["column"], "", error["value"], error["reason"]])
+
+    return {
+        "category": category,
+        "rows": rows,
+        "new_count": counts["new"],
+        "changed_count": counts["changed"],
+        "unchanged_count": counts["unchanged"],
+        "invalid_count": len(errors),
+        "field_counts": field_counts,
+        "errors": errors,
+        "diff_csv": output.getvalue(),
+    }
@@ -1,21 +1,61 @@
 """
 Crawl unitedskidtracks.com to import comprehensive track compatibility data
 Focuses on track loaders to fill data gaps from Camso spreadsheet
-"""
 
-import requests
-from bs4 import BeautifulSoup
+Model pages are fetched concurrently (bounded by --concurrency) through a
+per-host token bucket, with retries and exponential backoff on network errors,
+429 and 5xx responses. Track sizes and compatibility are written with batched
+upserts. The crawler can run against a local copy of the site, e.g. saved
+pages laid out as track-loaders/index.html and
+track-loaders/{brand}/{model}/tracks/index.html served with
+`python -m http.server 8001` and `--base-url http://localhost:8001`.
+
+Responses are cached on disk (CRAWL_CACHE_DIR) with their ETag and
+Last-Modified headers. Recrawls send conditional requests and model pages that
+come back 304 Not Modified are not parsed again; `--reparse` parses them
+anyway and `--offline` serves everything from the cache without the network.
+Fetched pages are only written to the cache once the upserts parsed from them
+have been flushed, so a page whose writes failed (or a crawl that crashed
+before flushing) is fetched and parsed again on the next run.
+
+    python import_united_skid_tracks.py --brands CAT --limit-per-brand 5
+    python import_united_skid_tracks.py --all
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
 import re
 import time
-import logging
-from database import track_sizes_collection, compatibility_collection
-import uuid
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+import httpx
+from bs4 import BeautifulSoup
+from database import track_sizes_collection, compatibility_collection, bump_collection_version
+from etl import upsert
+from import_pipeline import BulkWriter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Base URL
-BASE_URL = "https://unitedskidtracks.com"
+# Base URL (override with --base-url to crawl a local fixture server)
+BASE_URL = os.environ.get("UNITED_SKID_TRACKS_URL", "https://unitedskidtracks.com")
+
+# Politeness and robustness settings
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 2.0  # Requests per second per host
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+REQUEST_TIMEOUT = 30
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "RubberTrackWholesale-catalog-crawler/1.0"
+
+# On-disk response cache (one .json metadata + .html body per URL)
+CRAWL_CACHE_DIR = Path(os.environ.get("CRAWL_CACHE_DIR", Path(__file__).parent / "generated" / "crawl_cache"))
 
 # Brand mapping to normalize brand names
 BRAND_MAPPING = {
@@ -46,6 +86,8 @@ BRAND_MAPPING = {
     "JCB": "JCB",
 }
 
+SIZE_PATTERN = re.compile(r'(\d+[\s]*x[\s]*\d+[\s]*x[\s]*\d+)')
+
 
 def normalize_brand_name(brand):
     """Normalize brand name using mapping"""
@@ -65,7 +107,7 @@ def parse_track_size(size_text):
     """
     # Remove common noise words
     size_text = size_text.replace("inch", "").replace("mm", "").replace("links", "").strip()
-    
+
     # Try to match pattern like 18x4x56 or 450x86x60
     match = re.search(r'(\d+)[\s]*x[\s]*(\d+)[\s]*x[\s]*(\d+)', size_text)
     if match:
@@ -78,27 +120,14 @@ def parse_track_size(size_text):
     return None
 
 
-def get_track_loaders_page():
-    """Get the main track loaders page to extract brands and models"""
-    try:
-        logger.info("Fetching track loaders main page...")
-        response = requests.get(f"{BASE_URL}/track-loaders/", timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        return soup
-    except Exception as e:
-        logger.error(f"Error fetching track loaders page: {e}")
-        return None
-
-
-def extract_brands_and_models(soup):
+def extract_brands_and_models(soup, base_url=BASE_URL):
     """Extract brand and model URLs from the navigation"""
     brands_models = {}
-    
+
     # Find all brand links in the navigation
     # The structure shows links like /track-loaders/{brand}/{model}/tracks/
     all_links = soup.find_all('a', href=re.compile(r'/track-loaders/.+/.+/tracks/?'))
-    
+
     for link in all_links:
         href = link.get('href', '')
         # Extract brand and model from URL pattern /track-loaders/{brand}/{model}/tracks/
@@ -108,196 +137,353 @@ def extract_brands_and_models(soup):
             # Convert slug to readable name
             brand = brand_slug.replace('-', ' ').title()
             model = model_slug.replace('-', ' ').upper()
-            
+
             brand = normalize_brand_name(brand)
-            
+
             if brand not in brands_models:
                 brands_models[brand] = []
-            
-            brands_models[brand].append({
-                'model': model,
-                'url': f"{BASE_URL}{href}" if not href.startswith('http') else href
-            })
-    
+
+            url = urljoin(base_url + "/", href)
+            if not any(entry['url'] == url for entry in brands_models[brand]):
+                brands_models[brand].append({'model': model, 'url': url})
+
     return brands_models
 
 
-def fetch_track_sizes_for_model(url, brand, model):
-    """Fetch track sizes available for a specific model"""
-    try:
-        logger.info(f"Fetching tracks for {brand} {model} from {url}")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        track_sizes = []
-        
-        # Look for product listings on the page
-        # Products are typically in divs or cards with class containing "product"
-        products = soup.find_all(['div', 'article'], class_=re.compile(r'product', re.I))
-        
-        for product in products:
-            # Look for product title or name that might contain track size
-            title_elem = product.find(['h3', 'h4', 'a'], class_=re.compile(r'(title|name|product)', re.I))
-            if title_elem:
-                title_text = title_elem.get_text(strip=True)
-                logger.info(f"Found product: {title_text}")
-                
-                # Try to extract track size from title
-                # Patterns like "Caterpillar 277B Track - Bar" or "18x4x56"
-                size_match = re.search(r'(\d+[\s]*x[\s]*\d+[\s]*x[\s]*\d+)', title_text)
-                if size_match:
-                    size_text = size_match.group(1)
-                    parsed_size = parse_track_size(size_text)
-                    if parsed_size and parsed_size not in track_sizes:
-                        track_sizes.append(parsed_size)
-        
-        # If no track sizes found in product listings, try to find in page text
-        if not track_sizes:
-            # Look for text patterns like "18x4x56" in the entire page content
-            page_text = soup.get_text()
-            size_matches = re.findall(r'(\d+[\s]*x[\s]*\d+[\s]*x[\s]*\d+)', page_text)
-            for size_text in size_matches:
-                parsed_size = parse_track_size(size_text)
+def parse_track_sizes(html):
+    """Track sizes listed on a model page (product titles first, then page text)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    track_sizes = []
+
+    # Look for product listings on the page
+    # Products are typically in divs or cards with class containing "product"
+    products = soup.find_all(['div', 'article'], class_=re.compile(r'product', re.I))
+
+    for product in products:
+        # Look for product title or name that might contain track size
+        title_elem = product.find(['h3', 'h4', 'a'], class_=re.compile(r'(title|name|product)', re.I))
+        if title_elem:
+            title_text = title_elem.get_text(strip=True)
+
+            # Try to extract track size from title
+            # Patterns like "Caterpillar 277B Track - Bar" or "18x4x56"
+            size_match = SIZE_PATTERN.search(title_text)
+            if size_match:
+                parsed_size = parse_track_size(size_match.group(1))
                 if parsed_size and parsed_size not in track_sizes:
                     track_sizes.append(parsed_size)
-        
-        return track_sizes
+
+    # If no track sizes found in product listings, try to find in page text
+    if not track_sizes:
+        # Look for text patterns like "18x4x56" in the entire page content
+        for size_text in SIZE_PATTERN.findall(soup.get_text()):
+            parsed_size = parse_track_size(size_text)
+            if parsed_size and parsed_size not in track_sizes:
+                track_sizes.append(parsed_size)
+
+    return track_sizes
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ResponseCache:
+    """Response bodies and validators on disk, keyed by a hash of the URL"""
+
+    def __init__(self, directory: Path = CRAWL_CACHE_DIR):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html"
+
+    def load(self, url):
+        """(metadata, body) for a cached URL, or None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            return json.loads(meta_path.read_text()), body_path.read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url, response: httpx.Response):
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": datetime.utcnow().isoformat(),
+        }
+        # Body first, so metadata never points at a missing or partial body
+        for path, content in ((body_path, response.text), (meta_path, json.dumps(meta))):
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            os.replace(tmp_path, path)
+
+
+class Crawler:
+    """Rate-limited, cached HTTP fetcher shared by all crawl tasks"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE,
+                 retries: int = MAX_RETRIES, backoff: float = BACKOFF_SECONDS,
+                 cache: ResponseCache = None, offline: bool = False):
+        self.cache = cache
+        self.pending = {}  # url -> response, stored in the cache by commit_cache()
+        self.offline = offline
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.buckets = {}
+        self.client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=concurrency),
+        )
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate)
+        return self.buckets[host]
+
+    async def fetch(self, url) -> tuple:
+        """Page body and whether it changed since it was cached: (text, changed)
+
+        Cached pages are revalidated with If-None-Match / If-Modified-Since; a
+        304 returns the cached body with changed=False. In offline mode only
+        the cache is used. New responses are held until commit_cache().
+        """
+        cached = self.cache.load(url) if self.cache else None
+        if self.offline:
+            if not cached:
+                raise RuntimeError(f"{url}: not in the crawl cache (offline)")
+            self.cache_hits += 1
+            return cached[1], True
+
+        headers = {}
+        if cached:
+            meta = cached[0]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = await self.get(url, headers)
+        if response.status_code == 304 and cached:
+            self.not_modified += 1
+            return cached[1], False
+        if self.cache:
+            self.pending[url] = response
+        return response.text, True
+
+    async def commit_cache(self, skip: set = None):
+        """Store the responses fetched since the last commit, except for the URLs in `skip`"""
+        pending, self.pending = self.pending, {}
+        for url, response in pending.items():
+            if not skip or url not in skip:
+                await asyncio.to_thread(self.cache.store, url, response)
+
+    async def get(self, url, headers: dict = None) -> httpx.Response:
+        """GET with retries and exponential backoff (raises after the last attempt)"""
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                await self.bucket(url).acquire()
+                self.requests += 1
+                try:
+                    response = await self.client.get(url, headers=headers)
+                    if response.status_code == 304:
+                        return response
+                    if response.status_code not in RETRY_STATUSES:
+                        if response.is_error:
+                            self.failures += 1
+                        response.raise_for_status()
+                        return response
+                    error = f"HTTP {response.status_code}"
+                    retry_after = response.headers.get("Retry-After")
+                except httpx.TransportError as e:
+                    error = repr(e)
+                    retry_after = None
+
+                if attempt == self.retries:
+                    self.failures += 1
+                    raise RuntimeError(f"{url}: {error} after {attempt + 1} attempts")
+
+                delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+                logger.warning(f"{url}: {error}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+async def crawl_model(crawler, writers, brand, model, url, reparse=False, row=0):
+    """Fetch one model page and queue its track sizes and compatibility upserts
+
+    The upserts are tagged with `row` so write errors can be traced back to
+    the page. Returns True if compatibility was written, None if the page was unchanged
+    since the last crawl (and not parsed), False otherwise.
+    """
+    try:
+        html, changed = await crawler.fetch(url)
     except Exception as e:
         logger.error(f"Error fetching track sizes for {brand} {model}: {e}")
-        return []
-
-
-def ensure_track_size_exists(size_data):
-    """Ensure track size exists in database, return size string"""
-    width = size_data['width']
-    pitch = size_data['pitch']
-    links = size_data['links']
-    size_str = f"{width}x{pitch}x{links}"
-    
-    # Check if track size already exists
-    existing = track_sizes_collection.find_one({'size': size_str})
-    if not existing:
-        track_size_doc = {
-            'id': str(uuid.uuid4()),
-            'size': size_str,
-            'width': width,
-            'pitch': pitch,
-            'links': links,
-            'price': None,  # Price not available from crawl
-            'is_in_stock': True  # Default to in stock
-        }
-        track_sizes_collection.insert_one(track_size_doc)
-        logger.info(f"Created new track size: {size_str}")
-    
-    return size_str
+        return False
 
+    if not changed and not reparse:
+        return None
 
-def create_or_update_compatibility(brand, model, track_sizes):
-    """Create or update compatibility entry for a machine"""
+    # BeautifulSoup is CPU-bound; keep it off the event loop
+    track_sizes = await asyncio.to_thread(parse_track_sizes, html)
     if not track_sizes:
-        return
-    
-    # Normalize brand and model
-    brand = normalize_brand_name(brand)
-    model = model.strip()
-    
-    # Check if compatibility already exists
-    existing = compatibility_collection.find_one({'make': brand, 'model': model})
-    
-    if existing:
-        # Update existing - add new track sizes if not already present
-        existing_sizes = set(existing.get('track_sizes', []))
-        new_sizes = set(track_sizes)
-        combined_sizes = list(existing_sizes | new_sizes)
-        
-        compatibility_collection.update_one(
-            {'make': brand, 'model': model},
-            {'$set': {'track_sizes': combined_sizes}}
+        logger.warning(f"No track sizes found for {brand} {model}")
+        return False
+
+    size_strings = []
+    for size_data in track_sizes:
+        size_str = f"{size_data['width']}x{size_data['pitch']}x{size_data['links']}"
+        size_strings.append(size_str)
+        op, touch = upsert(
+            {'size': size_str},
+            on_insert={
+                'width': size_data['width'],
+                'pitch': size_data['pitch'],
+                'links': size_data['links'],
+                'price': None,  # Price not available from crawl
+                'is_in_stock': True  # Default to in stock
+            }
         )
-        logger.info(f"Updated compatibility for {brand} {model}: {combined_sizes}")
-    else:
-        # Create new compatibility entry
-        compatibility_doc = {
-            'id': str(uuid.uuid4()),
-            'make': brand,
-            'model': model,
-            'track_sizes': track_sizes
-        }
-        compatibility_collection.insert_one(compatibility_doc)
-        logger.info(f"Created compatibility for {brand} {model}: {track_sizes}")
+        await writers["track_sizes"].add(op, row, size_str, touch)
+
+    op, touch = upsert(
+        {'make': normalize_brand_name(brand), 'model': model.strip()},
+        add_to_set={'track_sizes': size_strings}
+    )
+    await writers["compatibility"].add(op, row, f"{brand} {model}", touch)
+    logger.info(f"Found {brand} {model}: {size_strings}")
+    return True
 
 
-def import_track_loaders_data(limit_brands=None, limit_per_brand=None):
+async def import_track_loaders_data(limit_brands=None, limit_per_brand=None, base_url=BASE_URL,
+                                    concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                                    cache_dir=CRAWL_CACHE_DIR, offline=False, reparse=False):
     """
     Main function to import track loader data
     limit_brands: List of brands to import (e.g., ["CAT", "Bobcat"]), None for all
     limit_per_brand: Number of models to import per brand, None for all
+    cache_dir: Response cache directory, None to disable caching
+    offline: Serve every page from the cache
+    reparse: Parse model pages even if they have not changed since the last crawl
     """
-    # Get main page
-    soup = get_track_loaders_page()
-    if not soup:
-        logger.error("Failed to fetch main page")
-        return
-    
-    # Extract brands and models
-    brands_models = extract_brands_and_models(soup)
-    logger.info(f"Found {len(brands_models)} brands")
-    
-    total_models_processed = 0
-    total_compatibilities_created = 0
-    
-    for brand, models in brands_models.items():
-        # Skip if not in limit_brands
-        if limit_brands and brand not in limit_brands:
-            continue
-        
-        logger.info(f"\n{'='*60}")
-        logger.info(f"Processing brand: {brand} ({len(models)} models)")
-        logger.info(f"{'='*60}")
-        
-        models_to_process = models[:limit_per_brand] if limit_per_brand else models
-        
-        for model_info in models_to_process:
-            model = model_info['model']
-            url = model_info['url']
-            
-            # Fetch track sizes for this model
-            track_size_data = fetch_track_sizes_for_model(url, brand, model)
-            
-            if track_size_data:
-                # Ensure track sizes exist in database
-                track_size_strings = []
-                for size_data in track_size_data:
-                    size_str = ensure_track_size_exists(size_data)
-                    track_size_strings.append(size_str)
-                
-                # Create or update compatibility
-                create_or_update_compatibility(brand, model, track_size_strings)
-                total_compatibilities_created += 1
-            else:
-                logger.warning(f"No track sizes found for {brand} {model}")
-            
-            total_models_processed += 1
-            
-            # Be polite to the server
-            time.sleep(1)
-    
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    crawler = Crawler(concurrency=concurrency, rate=rate, cache=cache, offline=offline)
+    writers = {
+        "track_sizes": BulkWriter(track_sizes_collection, key_column="size"),
+        "compatibility": BulkWriter(compatibility_collection, key_column="machine"),
+    }
+    started = time.monotonic()
+
+    try:
+        # Get main page
+        logger.info("Fetching track loaders main page...")
+        try:
+            html, _ = await crawler.fetch(f"{base_url}/track-loaders/")
+        except Exception as e:
+            logger.error(f"Failed to fetch main page: {e}")
+            return
+
+        # Extract brands and models
+        soup = BeautifulSoup(html, 'html.parser')
+        brands_models = extract_brands_and_models(soup, base_url)
+        logger.info(f"Found {len(brands_models)} brands")
+
+        tasks = []
+        urls = []
+        for brand, models in brands_models.items():
+            # Skip if not in limit_brands
+            if limit_brands and brand not in limit_brands:
+                continue
+            models_to_process = models[:limit_per_brand] if limit_per_brand else models
+            logger.info(f"Queued brand: {brand} ({len(models_to_process)} of {len(models)} models)")
+            for model_info in models_to_process:
+                tasks.append(crawl_model(crawler, writers, brand, model_info['model'], model_info['url'], reparse, len(urls)))
+                urls.append(model_info['url'])
+
+        results = await asyncio.gather(*tasks)
+
+        for writer in writers.values():
+            await writer.flush()
+        if any(writer.written for writer in writers.values()):
+            await bump_collection_version("track_sizes", "compatibility")
+
+        # Pages whose upserts failed stay out of the cache and are parsed again next time
+        if cache:
+            failed = {urls[error["row"]] for writer in writers.values() for error in writer.errors}
+            await crawler.commit_cache(skip=failed)
+    finally:
+        await crawler.close()
+
     logger.info(f"\n{'='*60}")
-    logger.info(f"Import completed!")
-    logger.info(f"Total models processed: {total_models_processed}")
-    logger.info(f"Total compatibilities created/updated: {total_compatibilities_created}")
+    logger.info(f"Import completed in {time.monotonic() - started:.1f}s!")
+    logger.info(f"Total models processed: {len(results)}")
+    logger.info(f"Total compatibilities created/updated: {results.count(True)}")
+    logger.info(f"Unchanged since last crawl (not parsed): {results.count(None)}")
+    logger.info(f"Requests: {crawler.requests} ({crawler.failures} failed, {crawler.not_modified} not modified), "
+                f"served offline from cache: {crawler.cache_hits}")
+    for name, writer in writers.items():
+        logger.info(f"{name}: {writer.inserted} inserted, {writer.updated} updated, {len(writer.errors)} errors")
     logger.info(f"{'='*60}")
 
 
 if __name__ == "__main__":
-    # Start with CAT models only for testing
-    # Then expand to all brands
-    
-    # Test with just CAT brand, limit to 5 models
-    logger.info("Starting import with CAT brand (testing)...")
-    import_track_loaders_data(limit_brands=["CAT"], limit_per_brand=5)
-    
-    # Uncomment below to import all brands
-    # logger.info("Starting full import...")
-    # import_track_loaders_data()
+    parser = argparse.ArgumentParser(description="Crawl unitedskidtracks.com track loader compatibility")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--brands", nargs="*", default=["CAT"], help="Brands to import (default: CAT, for testing)")
+    parser.add_argument("--all", action="store_true", help="Import all brands")
+    parser.add_argument("--limit-per-brand", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Requests per second per host")
+    parser.add_argument("--cache-dir", default=str(CRAWL_CACHE_DIR))
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    parser.add_argument("--offline", action="store_true", help="Serve every page from the cache")
+    parser.add_argument("--reparse", action="store_true", help="Parse unchanged pages too")
+    args = parser.parse_args()
+
+    if args.all:
+        logger.info("Starting full import...")
+        brands, limit = None, None
+    else:
+        logger.info(f"Starting import with {', '.join(args.brands)} (testing)...")
+        brands, limit = args.brands, args.limit_per_brand
+
+    asyncio.run(import_track_loaders_data(
+        limit_brands=brands, limit_per_brand=limit, base_url=args.base_url.rstrip("/"),
+        concurrency=args.concurrency, rate=args.rate,
+        cache_dir=None if args.no_cache else args.cache_dir, offline=args.offline, reparse=args.reparse
+    ))
@@ -0,0 +1,214 @@
+"""
+Stock reservations
+
+Placing an order reserves stock for every line item with a conditional
+decrement (stock_quantity >= quantity, then $inc by -quantity), so
+concurrent checkouts can never sell more than is in stock and none of them
+needs a lock. When the deployment supports transactions (replica set or
+sharded cluster) the decrements, the reservation and the order are written in
+one transaction; otherwise the decrements already made are undone when a
+later line item cannot be reserved.
+
+Each order has one document in stock_reservations:
+- held: stock is taken; the reservation expires at expires_at unless the
+  order is confirmed first
+- confirmed: the order moved on (processing/shipped/delivered); stock stays taken
+- released / expired: stock was returned (order cancelled / not confirmed in time)
+
+Status changes claim the reservation with a conditional update on its status
+before touching stock, so a reservation is returned at most once even when a
+cancellation and the expiry job race.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from database import (
+    client, products_collection, orders_collection, stock_reservations_collection, bump_collection_version
+)
+import stats
+
+logger = logging.getLogger(__name__)
+
+# How long unconfirmed reservations hold stock, and how often expired ones are returned
+RESERVATION_TTL_SECONDS = int(os.environ.get("RESERVATION_TTL_SECONDS", str(30 * 60)))
+RESERVATION_SWEEP_SECONDS = int(os.environ.get("RESERVATION_SWEEP_SECONDS", "60"))
+
+# Order statuses that confirm the reservation
+CONFIRMING_STATUSES = ["processing", "shipped", "delivered"]
+
+_transactions_supported = None
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product_id: str, requested: int, available: int):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Only {available} in stock for product {product_id} ({requested} requested)")
+
+
+async def transactions_supported() -> bool:
+    """Whether the server is a replica set member or mongos (checked once)"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await client.admin.command("hello")
+            _transactions_supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        except Exception:
+            _transactions_supported = False
+        logger.info(f"Stock reservations {'use' if _transactions_supported else 'do not use'} transactions")
+    return _transactions_supported
+
+
+async def run_in_transaction(callback):
+    """Await callback(session) in a transaction (retried on transient errors), or callback(None) without transactions"""
+    if not await transactions_supported():
+        return await callback(None)
+    async with await client.start_session() as session:
+        return await session.with_transaction(callback)
+
+
+async def _set_in_stock(product_ids: list, session=None) -> bool:
+    """Keep the in_stock flag in line with stock_quantity for the given products; True if a flag changed"""
+    sold_out = await products_collection.update_many(
+        {"_id": {"$in": product_ids}, "stock_quantity": {"$lte": 0}, "in_stock": True},
+        {"$set": {"in_stock": False}}, session=session
+    )
+    restocked = await products_collection.update_many(
+        {"_id": {"$in": product_ids}, "stock_quantity": {"$gt": 0}, "in_stock": {"$ne": True}},
+        {"$set": {"in_stock": True}}, session=session
+    )
+    return bool(sold_out.modified_count or restocked.modified_count)
+
+
+async def _return_stock(lines: list, session=None) -> bool:
+    for line in lines:
+        await products_collection.update_one(
+            {"_id": line["product_id"]}, {"$inc": {"stock_quantity": line["quantity"]}}, session=session
+        )
+    return await _set_in_stock([line["product_id"] for line in lines], session)
+
+
+async def _take_stock(lines: list, session=None) -> bool:
+    """Decrement stock for every line, or raise InsufficientStockError having taken nothing; True if a flag changed"""
+    taken = []
+    for line in lines:
+        result = await products_collection.update_one(
+            {"_id": line["product_id"], "stock_quantity": {"$gte": line["quantity"]}},
+            {"$inc": {"stock_quantity": -line["quantity"]}},
+            session=session
+        )
+        if result.modified_count == 0:
+            product = await products_collection.find_one({"_id": line["product_id"]}, {"stock_quantity": 1}, session=session)
+            # Inside a transaction the abort undoes the decrements
+            if session is None and taken:
+                await _return_stock(taken)
+            raise InsufficientStockError(str(line["product_id"]), line["quantity"], (product or {}).get("stock_quantity", 0))
+        taken.append(line)
+    return await _set_in_stock([line["product_id"] for line in lines], session)
+
+
+def merge_lines(items: list) -> list:
+    """One reservation line per product: [{"product_id": ObjectId, "quantity": int}]"""
+    quantities = {}
+    for item in items:
+        product_id = ObjectId(item["product_id"])
+        quantities[product_id] = quantities.get(product_id, 0) + item["quantity"]
+    return [{"product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()]
+
+
+async def place_order(order: dict) -> dict:
+    """Reserve stock for the order's items and insert the order (with its _id set); InsufficientStockError if out of stock"""
+    now = datetime.utcnow()
+    lines = merge_lines(order["items"])
+    reservation = {
+        "_id": ObjectId(),
+        "order_id": order["_id"],
+        "items": lines,
+        "status": "held",
+        "expires_at": now + timedelta(seconds=RESERVATION_TTL_SECONDS),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+    async def write(session):
+        flags_changed = await _take_stock(lines, session)
+        try:
+            await stock_reservations_collection.insert_one(reservation, session=session)
+            await orders_collection.insert_one(order, session=session)
+        except Exception:
+            if session is None:
+                await stock_reservations_collection.delete_one({"_id": reservation["_id"]})
+                await _return_stock(lines)
+            raise
+        return flags_changed
+
+    # Bumped after the commit: listings and caches show the flag, and a version
+    # write inside the transaction would make concurrent orders conflict
+    if await run_in_transaction(write):
+        await bump_collection_version("products")
+    return reservation
+
+
+async def _claim(order_id: ObjectId, from_statuses: list, to_status: str, extra_query: dict = None, session=None):
+    now = datetime.utcnow()
+    return await stock_reservations_collection.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": from_statuses}, **(extra_query or {})},
+        {"$set": {"status": to_status, "updated_at": now}},
+        session=session
+    )
+
+
+async def confirm_reservation(order_id: ObjectId) -> bool:
+    """Stop a held reservation from expiring; False if its stock was already returned"""
+    if await _claim(order_id, ["held"], "confirmed"):
+        return True
+    reservation = await stock_reservations_collection.find_one({"order_id": order_id}, {"status": 1})
+    return reservation is None or reservation["status"] == "confirmed"
+
+
+async def release_reservation(order_id: ObjectId, status: str = "released") -> bool:
+    """Return the stock of an order's reservation (held or confirmed); False if there was nothing to return"""
+    async def release(session):
+        reservation = await _claim(order_id, ["held", "confirmed"], status, session=session)
+        if not reservation:
+            return False, False
+        return True, await _return_stock(reservation["items"], session)
+
+    released, flags_changed = await run_in_transaction(release)
+    if flags_changed:
+        await bump_collection_version("products")
+    return released
+
+
+async def expire_reservations() -> int:
+    """Return the stock of held reservations past expires_at and cancel their (still pending) orders"""
+    expired = 0
+    cursor = stock_reservations_collection.find(
+        {"status": "held", "expires_at": {"$lt": datetime.utcnow()}}, {"order_id": 1}
+    )
+    async for reservation in cursor:
+        order_id = reservation["order_id"]
+
+        async def expire(session):
+            claimed = await _claim(order_id, ["held"], "expired", {"expires_at": {"$lt": datetime.utcnow()}}, session)
+            if not claimed:
+                return None, False
+            flags_changed = await _return_stock(claimed["items"], session)
+            order = await orders_collection.find_one_and_update(
+                {"_id": order_id, "status": "pending"},
+                {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}},
+                session=session
+            )
+            return order, flags_changed
+
+        order, flags_changed = await run_in_transaction(expire)
+        if flags_changed:
+            await bump_collection_version("products")
+        if order:
+            await stats.record_order_status({**order, "status": "cancelled"}, order["status"])
+            expired += 1
+    if expired:
+        logger.info(f"Cancelled {expired} orders whose stock reservations expired")
+    return expired
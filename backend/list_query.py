@@ -0,0 +1,144 @@
+"""
+Paginated list queries for the admin tables
+
+`list_documents` returns the requested page together with the total number
+of matching documents: the page is a find() with the filter, sort and limit
+(so an index on the sort keys serves it) and the total a count_documents() of
+the filter, run concurrently. Pages are addressed by number (skip/limit) or,
+for deep paging, by the opaque `next_cursor` of the previous page, which
+continues after the last document using the sort keys instead of skipping.
+
+`find_page` serves histories that only page forward by cursor (no total);
+it is the page query of `list_documents` on its own.
+
+Routes take the common parameters with `Depends(ListParams)` and declare
+their own per-column filters.
+"""
+import asyncio
+import base64
+import re
+from typing import Optional
+from bson import json_util
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class ListParams:
+    """Common query parameters of admin list routes"""
+
+    def __init__(
+        self,
+        page: int = Query(default=1, ge=1),
+        page_size: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        sort: Optional[str] = Query(default=None, description="Comma-separated fields, '-' prefix for descending"),
+        q: Optional[str] = Query(default=None, description="Case-insensitive text search"),
+    ):
+        self.page = page
+        self.page_size = page_size
+        self.cursor = cursor
+        self.sort = sort
+        self.q = q
+
+
+def parse_sort(sort: Optional[str], allowed: list, default: str) -> list:
+    """'-created_at,name' -> [("created_at", -1), ("name", 1), ("_id", ...)]"""
+    keys = []
+    for part in (sort or default).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        field, direction = (part[1:], -1) if part.startswith("-") else (part, 1)
+        if field not in allowed:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {field}. Options: {', '.join(allowed)}")
+        keys.append((field, direction))
+    # _id makes the order total, so cursors never skip or repeat documents
+    keys.append(("_id", keys[-1][1] if keys else -1))
+    return keys
+
+
+def encode_cursor(doc: dict, sort_keys: list) -> str:
+    values = [doc.get(field) for field, _ in sort_keys]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_keys: list) -> list:
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise HTTPException(status_code=400, detail="Cursor does not match the sort order")
+    return values
+
+
+def after_cursor(sort_keys: list, values: list) -> dict:
+    """Match documents that come after `values` in the sort order
+
+    Null and missing values sort before every other value, but a $gt/$lt
+    comparison never matches them (nor anything when comparing with null),
+    so they get explicit conditions.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort_keys):
+        value = values[i]
+        if direction == 1:
+            after = {field: {"$ne": None}} if value is None else {field: {"$gt": value}}
+        elif value is None:
+            # Nothing sorts after null in descending order
+            continue
+        else:
+            after = {"$or": [{field: {"$lt": value}}, {field: None}]}
+        branches.append({**{sort_keys[j][0]: values[j] for j in range(i)}, **after})
+    return {"$or": branches}
+
+
+def text_filter(q: Optional[str], fields: list) -> dict:
+    if not q or not q.strip() or not fields:
+        return {}
+    pattern = {"$regex": re.escape(q.strip()), "$options": "i"}
+    return {"$or": [{field: pattern} for field in fields]}
+
+
+async def list_documents(collection, params: ListParams, filters: dict = None, search_fields: list = None,
+                         sort_fields: list = None, default_sort: str = "-created_at", serialize=None) -> dict:
+    """One page of `collection` with the total count of matching documents
+
+    `filters` maps fields to required values (None values are ignored).
+    Returns {items, total, page, page_size, next_cursor}.
+    """
+    query = {field: value for field, value in (filters or {}).items() if value is not None}
+    search = text_filter(params.q, search_fields or [])
+    if search:
+        query = {"$and": [query, search]} if query else search
+
+    page, total = await asyncio.gather(
+        find_page(collection, query, params, sort_fields, default_sort, serialize),
+        collection.count_documents(query),
+    )
+    return {**page, "total": total}
+
+
+async def find_page(collection, query: dict, params: ListParams, sort_fields: list = None,
+                    default_sort: str = "-created_at", serialize=None) -> dict:
+    """One page of `collection` matching `query` by cursor (or page number), without a total
+
+    Returns {items, page, page_size, next_cursor}.
+    """
+    sort_keys = parse_sort(params.sort, sort_fields or [default_sort.lstrip("-")], default_sort)
+    if params.cursor:
+        query = {"$and": [query, after_cursor(sort_keys, decode_cursor(params.cursor, sort_keys))]}
+    cursor = collection.find(query).sort(sort_keys).limit(params.page_size)
+    if not params.cursor and params.page > 1:
+        cursor = cursor.skip((params.page - 1) * params.page_size)
+    items = await cursor.to_list(length=params.page_size)
+
+    next_cursor = encode_cursor(items[-1], sort_keys) if len(items) == params.page_size else None
+    return {
+        "items": [serialize(item) for item in items] if serialize else items,
+        "page": None if params.cursor else params.page,
+        "page_size": params.page_size,
+        "next_cursor": next_cursor,
+    }
@@ -53,6 +53,7 @@ class TrackSize(BaseModel):
     pitch: Optional[float] = None  # Pitch in mm
     links: Optional[int] = None  # Number of links
     price: Optional[float] = None  # Selling price in USD
+    cost: Optional[float] = None  # Purchase cost, used by margin pricing rules
     is_in_stock: bool = False  # In stock toggle - determines if price shows on frontend
     description: Optional[str] = None
     is_active: bool = True
@@ -106,6 +107,7 @@ class Product(BaseModel):
     title: str
     description: str
     price: float
+    cost: Optional[float] = None  # Purchase cost, used by margin pricing rules
     brand: str
     category: str
     size: Optional[str] = None
@@ -142,6 +144,9 @@ class Customer(BaseModel):
     phone: Optional[str] = None
     company: Optional[str] = None
     address: Optional[Dict[str, str]] = {}
+    order_count: int = 0  # Lifetime aggregates, maintained on order writes (see stats.py)
+    total_spent: float = 0.0
+    last_order_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -326,6 +331,22 @@ class Order(BaseModel):
         json_encoders = {ObjectId: str}
 
 
+class OrderLineRequest(BaseModel):
+    product_id: str
+    quantity: int = Field(gt=0)
+
+
+# Order placed from the storefront; prices are taken from the products
+class OrderRequest(BaseModel):
+    customer_name: str
+    customer_email: EmailStr
+    phone: Optional[str] = None
+    company: Optional[str] = None
+    items: List[OrderLineRequest] = Field(min_length=1)
+    shipping_address: Dict[str, str]
+    notes: Optional[str] = None
+
+
 # Admin User Model
 class AdminUser(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
@@ -371,6 +392,7 @@ class PartNumber(BaseModel):
     product_name: str  # Full product name
     compatible_models: List[str] = []  # List of compatible machine models
     price: Optional[float] = None  # Selling price
+    cost: Optional[float] = None  # Purchase cost, used by margin pricing rules
     is_in_stock: bool = False  # In stock toggle - determines if price shows on frontend
     description: Optional[str] = None
     image_url: Optional[str] = None
@@ -383,3 +405,27 @@ class PartNumber(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+
+# Pricing Rule Model (see pricing.py)
+class PricingRule(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: str
+    collection: str  # "track_sizes", "part_numbers" or "products"
+    brand: Optional[str] = None  # Conditions; unset ones match everything
+    part_type: Optional[str] = None
+    category: Optional[str] = None
+    width_min: Optional[float] = None  # Track width range in mm
+    width_max: Optional[float] = None
+    margin: Optional[float] = None  # price = cost x margin (e.g. 1.35)
+    fixed_price: Optional[float] = None  # Used when no margin is set
+    rounding: str = "cents"  # "cents", "dollar" or "99" (x.99)
+    priority: int = 0  # Higher priority rules are tried first
+    import_only: bool = False  # Only fills in prices for imported products without one
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Config:
+        populate_by_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
@@ -0,0 +1,218 @@
+"""
+Order analytics
+
+Revenue, quantity and order lines by day, brand, category or SKU, computed
+with aggregation pipelines over the line items of the orders (`$unwind` of
+orders.items, with a `$lookup` of the product for brand and category).
+
+Reports over long date ranges read the pre-aggregated order_daily_rollups
+collection instead: one document per (day, SKU) with the brand, category and
+totals of that day's order lines. A nightly job rolls up every finished day;
+it recomputes the last ROLLUP_LOOKBACK_DAYS days each time so status changes
+on recent orders (e.g. cancellations) reach the rollups. The rolled-up days
+are tracked as one contiguous range (from..through); days outside it, such as
+today or days before a partial rebuild, are computed from the orders, so
+reports are complete and current.
+"""
+import os
+from datetime import datetime, timedelta
+from pymongo import ReplaceOne
+import import_pipeline
+from database import orders_collection, order_daily_rollups_collection, stats_summary_collection
+from stats import EXCLUDED_REVENUE_STATUSES, day_key
+
+GROUP_BY = ["day", "brand", "category", "sku"]
+
+SOURCES = ["auto", "live", "rollup"]
+
+# Rollup field each report grouping reads
+ROLLUP_KEYS = {"day": "$date", "brand": "$brand", "category": "$category", "sku": "$sku"}
+
+# How often the rollup job runs (once a day) and how many finished days it recomputes
+ROLLUP_INTERVAL_SECONDS = int(os.environ.get("ORDER_ROLLUP_INTERVAL_SECONDS", str(24 * 3600)))
+ROLLUP_LOOKBACK_DAYS = int(os.environ.get("ORDER_ROLLUP_LOOKBACK_DAYS", "7"))
+
+# stats_summary document that records the range of rolled-up days
+ROLLUP_STATE_ID = "order_rollups"
+
+
+def _day_start(day: str) -> datetime:
+    return datetime.strptime(day, "%Y-%m-%d")
+
+
+def _order_lines(start: datetime, end: datetime, with_product: bool) -> list:
+    """Pipeline stages producing one document per line item of the orders in [start, end)"""
+    stages = [
+        {"$match": {"created_at": {"$gte": start, "$lt": end}, "status": {"$nin": EXCLUDED_REVENUE_STATUSES}}},
+        {"$unwind": "$items"},
+    ]
+    if with_product:
+        stages += [
+            {"$addFields": {"product_oid": {"$convert": {"input": "$items.product_id", "to": "objectId", "onError": None}}}},
+            {"$lookup": {"from": "products", "localField": "product_oid", "foreignField": "_id", "as": "product"}},
+            {"$unwind": {"path": "$product", "preserveNullAndEmptyArrays": True}},
+        ]
+    return stages
+
+
+def _line_key(group_by: str):
+    if group_by == "day":
+        return {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+    if group_by == "sku":
+        return "$items.sku"
+    return f"$product.{group_by}"
+
+
+LINE_TOTALS = {
+    "order_lines": {"$sum": 1},
+    "quantity": {"$sum": "$items.quantity"},
+    "revenue": {"$sum": "$items.total"},
+}
+
+
+async def _live_rows(group_by: str, start: datetime, end: datetime) -> list:
+    pipeline = _order_lines(start, end, with_product=group_by in ("brand", "category"))
+    pipeline.append({"$group": {"_id": _line_key(group_by), **LINE_TOTALS}})
+    return await orders_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+async def _rollup_rows(group_by: str, first_day: str, last_day: str) -> list:
+    pipeline = [
+        {"$match": {"date": {"$gte": first_day, "$lte": last_day}}},
+        {"$group": {
+            "_id": ROLLUP_KEYS[group_by],
+            "order_lines": {"$sum": "$order_lines"},
+            "quantity": {"$sum": "$quantity"},
+            "revenue": {"$sum": "$revenue"},
+        }},
+    ]
+    return await order_daily_rollups_collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+async def rolled_up_range():
+    """The first and last day (YYYY-MM-DD) of the contiguous rolled-up range, or None"""
+    state = await stats_summary_collection.find_one({"_id": ROLLUP_STATE_ID})
+    if not state or not state.get("from") or not state.get("through"):
+        return None
+    return state["from"], state["through"]
+
+
+async def build_rollups(days: int = None) -> dict:
+    """Roll up finished days: the last `days` days, or everything since before the last run"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    rolled_up = await rolled_up_range()
+    if days is not None:
+        start = today - timedelta(days=days)
+    elif rolled_up:
+        start = _day_start(rolled_up[1]) - timedelta(days=ROLLUP_LOOKBACK_DAYS - 1)
+    else:
+        first = await orders_collection.find_one({}, {"created_at": 1}, sort=[("created_at", 1)])
+        if not first:
+            return {"days": 0, "written": 0}
+        start = first["created_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+    if start >= today:
+        return {"days": 0, "written": 0}
+
+    pipeline = _order_lines(start, today, with_product=True)
+    pipeline.append({"$group": {
+        "_id": {"date": _line_key("day"), "sku": "$items.sku"},
+        "brand": {"$first": "$product.brand"},
+        "category": {"$first": "$product.category"},
+        **LINE_TOTALS,
+    }})
+
+    writer = import_pipeline.BulkWriter(order_daily_rollups_collection, import_pipeline.DEFAULT_BATCH_SIZE, key_column="_id")
+    first_day, last_day = day_key(start), day_key(today - timedelta(days=1))
+    rolled = set()
+    row = 0
+    async for doc in orders_collection.aggregate(pipeline, allowDiskUse=True):
+        rollup = {**doc["_id"], "brand": doc["brand"], "category": doc["category"],
+                  "order_lines": doc["order_lines"], "quantity": doc["quantity"], "revenue": round(doc["revenue"], 2)}
+        rolled.add((doc["_id"]["date"], doc["_id"]["sku"]))
+        await writer.add(ReplaceOne({"_id": doc["_id"]}, rollup, upsert=True), row, f"{rollup['date']} {rollup['sku']}")
+        row += 1
+    await writer.flush()
+
+    # Day/SKU pairs whose order lines were all cancelled or deleted since the last run
+    stale = [
+        doc["_id"] async for doc in order_daily_rollups_collection.find(
+            {"date": {"$gte": first_day, "$lte": last_day}}, {"_id": 1}
+        )
+        if (doc["_id"]["date"], doc["_id"]["sku"]) not in rolled
+    ]
+    if stale:
+        await order_daily_rollups_collection.delete_many({"_id": {"$in": stale}})
+
+    # The new days extend the previous range if they overlap or adjoin it; after a gap
+    # only the new days are known to be complete
+    first = first_day
+    if rolled_up and first_day <= day_key(_day_start(rolled_up[1]) + timedelta(days=1)):
+        first = min(first_day, rolled_up[0])
+    await stats_summary_collection.update_one(
+        {"_id": ROLLUP_STATE_ID},
+        {"$set": {"from": first, "through": last_day, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return {"days": (today - start).days, "written": writer.written, "removed": len(stale), "errors": writer.errors}
+
+
+async def order_report(group_by: str, start_day: str, end_day: str, source: str = "auto", limit: int = None) -> dict:
+    """Order lines, quantity and revenue per `group_by` for the days start_day..end_day (inclusive)
+
+    Raises ValueError for unknown groupings, sources or dates.
+    """
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of: {', '.join(GROUP_BY)}")
+    if source not in SOURCES:
+        raise ValueError(f"source must be one of: {', '.join(SOURCES)}")
+    start, end = _day_start(start_day), _day_start(end_day) + timedelta(days=1)
+    if end <= start:
+        raise ValueError("end must not be before start")
+
+    # Split the range into rolled-up days and the days before and after them,
+    # which are computed from the orders
+    rolled_up = await rolled_up_range() if source != "live" else None
+    if source == "rollup" and not rolled_up:
+        raise ValueError("No order rollups have been built yet")
+    parts = []
+    live_ranges = [(start, end)]
+    if rolled_up:
+        rollup_start, rollup_end = max(rolled_up[0], start_day), min(rolled_up[1], end_day)
+        if rollup_start <= rollup_end:
+            parts += await _rollup_rows(group_by, rollup_start, rollup_end)
+            live_ranges = [(start, _day_start(rollup_start)), (_day_start(rollup_end) + timedelta(days=1), end)]
+    if source != "rollup":
+        for live_start, live_end in live_ranges:
+            if live_start < live_end:
+                parts += await _live_rows(group_by, live_start, live_end)
+
+    rows = {}
+    for part in parts:
+        row = rows.setdefault(part["_id"], {"key": part["_id"], "order_lines": 0, "quantity": 0, "revenue": 0.0})
+        row["order_lines"] += part["order_lines"]
+        row["quantity"] += part["quantity"]
+        row["revenue"] += part["revenue"]
+
+    rows = list(rows.values())
+    for row in rows:
+        row["revenue"] = round(row["revenue"], 2)
+    if group_by == "day":
+        rows.sort(key=lambda row: row["key"])
+    else:
+        rows.sort(key=lambda row: row["revenue"], reverse=True)
+
+    totals = {
+        "order_lines": sum(row["order_lines"] for row in rows),
+        "quantity": sum(row["quantity"] for row in rows),
+        "revenue": round(sum(row["revenue"] for row in rows), 2),
+    }
+    return {
+        "group_by": group_by,
+        "start": start_day,
+        "end": end_day,
+        "rolled_up_from": rolled_up[0] if rolled_up else None,
+        "rolled_up_through": rolled_up[1] if rolled_up else None,
+        "rows": rows[:limit] if limit else rows,
+        "row_count": len(rows),
+        "totals": totals,
+    }
@@ -0,0 +1,213 @@
+"""
+Rule-based pricing
+
+Prices for track sizes, part numbers and products are derived from the rules
+in the pricing_rules collection. A rule selects documents of one collection
+(by brand, part type, category and/or a width range) and prices them either
+as cost x margin or at a fixed price, then rounds the result. Rules are tried
+in priority order (highest first) and the first applicable rule wins; a
+margin rule only applies to documents that have a cost. Documents that no
+rule applies to keep their current price. Rules marked import_only only fill
+in prices for imported products that come without one. The default rules are
+seeded once; rules the admin deletes afterwards stay deleted.
+
+Repricing loads a whole collection into a DataFrame, computes every price in
+one vectorized pass and writes back only the prices that changed. The rule
+evaluation itself needs no database, so the import transform can use it.
+"""
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+
+PRICED_COLLECTIONS = ["track_sizes", "part_numbers", "products"]
+
+# Rule fields matched against document fields of the same name
+MATCH_FIELDS = ["brand", "part_type", "category"]
+
+ROUNDING_MODES = ["cents", "dollar", "99"]
+
+# Prices for imported undercarriage parts (the templates carry no price column);
+# seeded as import-only rules and used as the fallback when no rule applies
+DEFAULT_PART_PRICES = {
+    "Rollers": 189.99,
+    "Sprockets": 429.99,
+}
+DEFAULT_PART_PRICE = 349.99
+
+DEFAULT_RULES = [
+    {"name": f"Default {category} price", "collection": "products", "category": category, "fixed_price": price}
+    for category, price in {**DEFAULT_PART_PRICES, "Idlers": DEFAULT_PART_PRICE,
+                            "Undercarriage Parts": DEFAULT_PART_PRICE}.items()
+]
+
+# stats_summary document recording that DEFAULT_RULES were seeded
+SEED_STATE_ID = "pricing_rules_seed"
+
+# Pipeline update stage copying a product's price into its schema.org offer
+# (run after the stage that sets the price; products without an offer are left alone)
+OFFER_PRICE_STAGE = {"$set": {"schema_markup": {"$cond": [
+    {"$eq": [{"$type": "$schema_markup.offers"}, "object"]},
+    {"$mergeObjects": ["$schema_markup", {"offers": {"$mergeObjects": [
+        "$schema_markup.offers", {"price": {"$toString": "$price"}}
+    ]}}]},
+    "$schema_markup",
+]}}}
+
+# Pipeline update stages run after a product's price is set: the offer takes the
+# new price and the import content hash is dropped, so the next re-import of the
+# product is compared with the file again
+PRODUCT_PRICE_STAGES = [OFFER_PRICE_STAGE, {"$unset": "source_hash"}]
+
+
+async def seed_default_rules():
+    """Insert DEFAULT_RULES the first time this runs against a database with no pricing rules"""
+    from database import pricing_rules_collection, stats_summary_collection
+    now = datetime.utcnow()
+    flag = await stats_summary_collection.update_one(
+        {"_id": SEED_STATE_ID}, {"$setOnInsert": {"seeded_at": now}}, upsert=True
+    )
+    if flag.upserted_id is None:
+        return
+    # Databases whose rules predate the flag were seeded already
+    if await pricing_rules_collection.count_documents({}, limit=1):
+        return
+    await pricing_rules_collection.insert_many([
+        {**rule, "rounding": "cents", "priority": 0, "import_only": True, "is_active": True,
+         "created_at": now, "updated_at": now}
+        for rule in DEFAULT_RULES
+    ])
+
+
+async def load_rules(collection: str, include_import_only: bool = False) -> list:
+    """Active rules for a collection, highest priority first"""
+    from database import pricing_rules_collection
+    query = {"collection": collection, "is_active": True}
+    if not include_import_only:
+        query["import_only"] = {"$ne": True}
+    cursor = pricing_rules_collection.find(query).sort("priority", -1)
+    return await cursor.to_list(length=None)
+
+
+def round_prices(prices: pd.Series, rounding: str) -> pd.Series:
+    if rounding == "dollar":
+        return prices.round(0)
+    if rounding == "99":
+        # Charm pricing: 187.20 -> 187.99
+        return np.floor(prices) + 0.99
+    return prices.round(2)
+
+
+def _text_column(df: pd.DataFrame, field: str) -> pd.Series:
+    if field not in df:
+        return pd.Series("", index=df.index)
+    return df[field].fillna("").astype(str).str.strip().str.lower()
+
+
+def _number_column(df: pd.DataFrame, field: str) -> pd.Series:
+    if field not in df:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[field], errors="coerce")
+
+
+def width_from_size(size: pd.Series) -> pd.Series:
+    """Track width (mm) from size strings like '450x86x56' (NaN for other sizes)"""
+    return pd.to_numeric(size.fillna("").astype(str).str.split("x").str[0], errors="coerce")
+
+
+def rule_prices(df: pd.DataFrame, rules: list) -> pd.Series:
+    """Price every row of `df` by the first applicable rule (NaN where none applies)
+
+    `df` holds the fields rules match on (brand, part_type, category, width)
+    and optionally cost.
+    """
+    prices = pd.Series(np.nan, index=df.index)
+    if df.empty or not rules:
+        return prices
+
+    text = {field: _text_column(df, field) for field in MATCH_FIELDS}
+    width = _number_column(df, "width")
+    cost = _number_column(df, "cost")
+
+    unpriced = pd.Series(True, index=df.index)
+    for rule in rules:
+        mask = unpriced.copy()
+        for field in MATCH_FIELDS:
+            if rule.get(field):
+                mask &= text[field] == str(rule[field]).strip().lower()
+        if rule.get("width_min") is not None:
+            mask &= width >= rule["width_min"]
+        if rule.get("width_max") is not None:
+            mask &= width <= rule["width_max"]
+
+        if rule.get("margin") is not None:
+            mask &= cost.notna()
+            values = cost[mask] * rule["margin"]
+        elif rule.get("fixed_price") is not None:
+            values = pd.Series(float(rule["fixed_price"]), index=df.index[mask.values])
+        else:
+            continue
+
+        if mask.any():
+            prices[mask] = round_prices(values, rule.get("rounding", "cents"))
+            unpriced &= ~mask
+            if not unpriced.any():
+                break
+    return prices
+
+
+async def load_frame(collection: str) -> pd.DataFrame:
+    """The fields pricing needs for every document of a collection"""
+    from database import db
+    projection = {"_id": 1, "price": 1, "cost": 1, "width": 1, "size": 1, **{field: 1 for field in MATCH_FIELDS}}
+    documents = await db[collection].find({}, projection).to_list(length=None)
+    df = pd.DataFrame(documents, columns=["_id", "price", "cost", "width", "size", *MATCH_FIELDS])
+    if collection == "products":
+        df["width"] = width_from_size(df["size"])
+    return df
+
+
+async def reprice(collection: str, dry_run: bool = False, batch_size: int = None) -> dict:
+    """Recompute all prices of a collection and write back the ones that changed"""
+    from database import db, bump_collection_version
+    from import_pipeline import BulkWriter, DEFAULT_BATCH_SIZE
+    timings = {}
+    start = time.perf_counter()
+    rules = await load_rules(collection)
+    df = await load_frame(collection)
+    timings["load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    new_prices = rule_prices(df, rules)
+    old_prices = _number_column(df, "price")
+    changed = new_prices.notna() & ~np.isclose(new_prices.fillna(0), old_prices.fillna(-1))
+    changed_df = pd.DataFrame({"_id": df["_id"][changed], "price": new_prices[changed]})
+    timings["compute_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    result = {
+        "collection": collection,
+        "documents": len(df),
+        "priced": int(new_prices.notna().sum()),
+        "changed": len(changed_df),
+        "written": 0,
+        "errors": [],
+    }
+
+    start = time.perf_counter()
+    if not dry_run and len(changed_df):
+        writer = BulkWriter(db[collection], batch_size or DEFAULT_BATCH_SIZE, key_column="_id")
+        now = datetime.utcnow()
+        product_stages = PRODUCT_PRICE_STAGES if collection == "products" else []
+        for row, (doc_id, price) in enumerate(zip(changed_df["_id"].tolist(), changed_df["price"].tolist())):
+            update = [{"$set": {"price": float(price), "updated_at": now}}, *product_stages]
+            await writer.add(UpdateOne({"_id": doc_id}, update), row, str(doc_id))
+        await writer.flush()
+        result["written"] = writer.written
+        result["errors"] = writer.errors
+        if writer.written:
+            await bump_collection_version(collection)
+    timings["write_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    result["timings"] = timings
+    return result
@@ -2,19 +2,7 @@
 Remove excluded brands from compatibility data
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-mongo_url = os.environ['MONGO_URL']
-db_name = os.environ['DB_NAME']
-
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+from database import compatibility_collection, bump_collection_version
 
 # Brands to EXCLUDE (as requested by user)
 EXCLUDED_BRANDS = [
@@ -36,7 +24,7 @@ async def remove_excluded_brands():
     print("=" * 80)
     
     # Get all distinct brands
-    all_brands = await db.compatibilities.distinct('make')
+    all_brands = await compatibility_collection.distinct('make')
     
     # Normalize excluded brands to lowercase for comparison
     excluded_lower = [b.lower() for b in EXCLUDED_BRANDS]
@@ -51,14 +39,16 @@ async def remove_excluded_brands():
     
     total_removed = 0
     for brand in sorted(brands_to_remove):
-        count = await db.compatibilities.count_documents({'make': brand})
-        result = await db.compatibilities.delete_many({'make': brand})
+        result = await compatibility_collection.delete_many({'make': brand})
         total_removed += result.deleted_count
         print(f"  ✅ Removed {brand}: {result.deleted_count} machines")
     
+    if total_removed:
+        await bump_collection_version("compatibility")
+    
     # Check remaining brands
-    remaining_brands = await db.compatibilities.distinct('make')
-    remaining_count = await db.compatibilities.count_documents({})
+    remaining_brands = await compatibility_collection.distinct('make')
+    remaining_count = await compatibility_collection.count_documents({})
     
     print("\n" + "=" * 80)
     print(f"✅ Removal Complete!")
@@ -70,7 +60,7 @@ async def remove_excluded_brands():
     # Show some of the remaining brands
     print(f"\nSample of remaining brands (first 20):")
     for i, brand in enumerate(sorted(remaining_brands)[:20], 1):
-        count = await db.compatibilities.count_documents({'make': brand})
+        count = await compatibility_collection.count_documents({'make': brand})
         print(f"  {i}. {brand} ({count} machines)")
     
     if len(remaining_brands) > 20:
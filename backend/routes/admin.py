@@ -1,24 +1,40 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query
 from fastapi.security import HTTPBasicCredentials, HTTPBasic
-from typing import List, Optional, Dict
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from typing import Any, List, Optional, Dict
 from datetime import datetime, timedelta
 import pandas as pd
 import io
+import json
+import os
+import time
+import import_pipeline
+import import_jobs
+import pricing
+import export
+import stats
+import order_analytics
+import inventory
+from list_query import ListParams, list_documents, find_page
 from models import (
     Product, Brand, Category, Order, Customer, 
     AdminUser, ContactMessage, Page, Section, Redirect, Review, FAQ,
-    BlogCategory, Blog, MachineModel, TrackSize, Compatibility, PartNumber
+    BlogCategory, Blog, MachineModel, TrackSize, Compatibility, PartNumber, PricingRule
 )
 from database import (
     products_collection, brands_collection, machine_models_collection, track_sizes_collection, compatibility_collection, categories_collection,
     orders_collection, customers_collection, admin_users_collection,
-    contact_messages_collection, sections_collection
+    contact_messages_collection, sections_collection, import_jobs_collection, pricing_rules_collection,
+    bump_collection_version
 )
 from auth import (
     verify_password, get_password_hash, create_access_token,
     get_current_user, Token
 )
 from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
 import re
 
@@ -76,10 +92,21 @@ async def admin_login(credentials: LoginRequest):
 
 # Products Management
 @router.get("/products")
-async def get_all_products(current_user = Depends(get_current_user)):
-    """Get all products for admin"""
-    products = await products_collection.find().sort("created_at", -1).to_list(1000)
-    return [serialize_doc(p) for p in products]
+async def get_all_products(
+    params: ListParams = Depends(),
+    brand: Optional[str] = None,
+    category: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    current_user = Depends(get_current_user)
+):
+    """List products for admin (paginated, searchable by title, SKU and part number)"""
+    return await list_documents(
+        products_collection, params,
+        filters={"brand": brand, "category": category, "in_stock": in_stock},
+        search_fields=["title", "sku", "part_number"],
+        sort_fields=["created_at", "updated_at", "title", "sku", "price", "brand", "category"],
+        serialize=serialize_doc
+    )
 
 
 @router.post("/products")
@@ -120,6 +147,8 @@ async def create_product(product: Product, current_user = Depends(get_current_us
     
     product_dict = product.dict(by_alias=True, exclude={"id"})
     result = await products_collection.insert_one(product_dict)
+    await bump_collection_version("products")
+    await stats.adjust_product_counts({product.brand: 1})
     
     return {"success": True, "id": str(result.inserted_id), "message": "Product created successfully"}
 
@@ -154,14 +183,19 @@ async def update_product(product_id: str, product: Product, current_user = Depen
     }
     
     product_dict = product.dict(by_alias=True, exclude={"id"})
-    result = await products_collection.update_one(
+    # Dropping the import content hash makes the next re-import compare this product with the file again
+    previous = await products_collection.find_one_and_update(
         {"_id": ObjectId(product_id)},
-        {"$set": product_dict}
+        {"$set": product_dict, "$unset": {"source_hash": ""}},
+        projection={"brand": 1}
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_collection_version("products")
+    if previous.get("brand") != product.brand:
+        await stats.adjust_product_counts({previous.get("brand"): -1, product.brand: 1})
     return {"success": True, "message": "Product updated successfully"}
 
 
@@ -171,11 +205,13 @@ async def delete_product(product_id: str, current_user = Depends(get_current_use
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
     
-    result = await products_collection.delete_one({"_id": ObjectId(product_id)})
+    deleted = await products_collection.find_one_and_delete({"_id": ObjectId(product_id)}, projection={"brand": 1})
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    await bump_collection_version("products")
+    await stats.adjust_product_counts({deleted.get("brand"): -1})
     return {"success": True, "message": "Product deleted successfully"}
 
 
@@ -202,6 +238,7 @@ async def create_brand(brand: Brand, current_user = Depends(get_current_user)):
     
     brand_dict = brand.dict(by_alias=True, exclude={"id"})
     result = await brands_collection.insert_one(brand_dict)
+    await bump_collection_version("brands")
     
     return {"success": True, "id": str(result.inserted_id), "message": "Brand created successfully"}
 
@@ -224,6 +261,7 @@ async def update_brand(brand_id: str, brand: Brand, current_user = Depends(get_c
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Brand not found")
     
+    await bump_collection_version("brands")
     return {"success": True, "message": "Brand updated successfully"}
 
 
@@ -238,6 +276,7 @@ async def delete_brand(brand_id: str, current_user = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Brand not found")
     
+    await bump_collection_version("brands")
     return {"success": True, "message": "Brand deleted successfully"}
 
 
@@ -282,250 +321,127 @@ async def update_category(category_id: str, category: Category, current_user = D
 
 # Bulk Import Products
 @router.post("/products/import")
-async def import_products(file: UploadFile = File(...), current_user = Depends(get_current_user)):
+async def import_products(
+    file: UploadFile = File(...),
+    batch_size: int = Query(default=import_pipeline.DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    chunk_size: int = Query(default=import_pipeline.DEFAULT_CHUNK_SIZE, ge=100, le=100000),
+    background: bool = False,
+    dry_run: bool = False,
+    current_user = Depends(get_current_user)
+):
     """Bulk import products from CSV or Excel file"""
     
     # Validate file type
     if not (file.filename.endswith('.csv') or file.filename.endswith('.xlsx') or file.filename.endswith('.xls')):
         raise HTTPException(status_code=400, detail="File must be CSV or Excel format")
     
-    try:
-        # Read file content
-        contents = await file.read()
-        
-        # Parse based on file type
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:
-            df = pd.read_excel(io.BytesIO(contents))
-        
-        # Detect format type based on columns
-        columns = set(df.columns.str.lower().str.strip())
-        
-        # Rubber Tracks format
-        if 'comp_name' in columns or 'track_size' in columns:
-            column_mapping = {
-                'comp_name': 'brand',
-                'machine_model': 'title_suffix',
-                'track_size': 'size',
-                'Price': 'price',
-                'eng_description': 'description',
-                'title_h1': 'seo_title',
-                'sub_title_h2': 'title',
-                'page_title': 'seo_title',
-                'eng_metakeyword': 'seo_keywords',
-                'eng_meta_desc': 'seo_description',
-                'shown_main_listin': 'in_stock'
-            }
-            category = "Rubber Tracks"
-        
-        # Rollers, Sprockets, Idlers format (unified handling)
-        elif 'part number' in columns or 'part_number' in columns:
-            # Determine category based on file content or column names
-            if 'roller' in columns or any('roller' in str(col).lower() for col in df.columns):
-                if 'idler' in columns or any('idler' in str(col).lower() for col in df.columns):
-                    category = "Idlers"
-                else:
-                    category = "Rollers"
-            elif 'sprocket' in columns or any('sprocket' in str(col).lower() for col in df.columns):
-                category = "Sprockets"
-            else:
-                category = "Undercarriage Parts"
-            
-            # Column mapping for undercarriage parts
-            column_mapping = {
-                'Machine Model': 'machine_model',
-                'machine_model': 'machine_model',
-                'Roller': 'item_type',
-                'ITEM': 'item_type',
-                'item': 'item_type',
-                'Bottom / Front': 'position',
-                'Front / Rear Idler': 'position',
-                'Part Number': 'part_number',
-                'part_number': 'part_number',
-                'Alternate Part numbers': 'alternate_parts',
-                'alternate_part_numbers': 'alternate_parts',
-                'SKU': 'sku',
-                'sku': 'sku',
-                'Fits following machine models': 'fits_models',
-                'fits_following_machine_models': 'fits_models',
-                'Description': 'description',
-                'description': 'description'
-            }
-        else:
-            raise HTTPException(status_code=400, detail="Unrecognized file format. Please use the provided templates.")
-        
-        # Rename columns (case-insensitive matching)
-        df_cols_lower = {col: col.lower().strip() for col in df.columns}
-        reverse_mapping = {v.lower(): k for k, v in column_mapping.items() if k.lower() in df_cols_lower.values()}
-        
-        # Actual renaming
-        rename_dict = {}
-        for col in df.columns:
-            col_lower = col.lower().strip()
-            for template_col, target_col in column_mapping.items():
-                if template_col.lower() == col_lower:
-                    rename_dict[col] = target_col
-                    break
-        
-        df = df.rename(columns=rename_dict)
-        
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Check if this is rubber tracks format or undercarriage parts format
-                if category == "Rubber Tracks":
-                    # Rubber tracks format processing
-                    sku = f"RT-{row.get('size', 'UNKNOWN').replace('x', '-')}-{index}"
-                    price_str = str(row.get('price', '0')).replace('$', '').replace(',', '').strip()
-                    try:
-                        price = float(price_str)
-                    except:
-                        price = 0.0
-                    
-                    in_stock_val = str(row.get('in_stock', 'Yes')).strip().lower()
-                    in_stock = in_stock_val in ['yes', 'true', '1', 'y']
-                    
-                    keywords_str = str(row.get('seo_keywords', '')).strip()
-                    seo_keywords = [k.strip() for k in keywords_str.split(',') if k.strip()] if keywords_str else []
-                    
-                    brand = str(row.get('brand', 'Universal')).strip()
-                    machine_model = str(row.get('title_suffix', '')).strip() if pd.notna(row.get('title_suffix')) else ''
-                    size = str(row.get('size', '')).strip()
-                    
-                    if machine_model:
-                        title = f"{brand} {machine_model} Rubber Track {size}"
-                    else:
-                        title = str(row.get('title', f"{brand} Rubber Track {size}")).strip()
-                    
-                    part_number = sku
-                    
-                else:
-                    # Undercarriage parts format processing
-                    sku = str(row.get('sku', f"{category[:3].upper()}-{index}")).strip()
-                    part_number = str(row.get('part_number', sku)).strip()
-                    
-                    # Extract machine model and brand
-                    machine_model_full = str(row.get('machine_model', '')).strip()
-                    if machine_model_full:
-                        # Try to extract brand from machine model
-                        parts = machine_model_full.split()
-                        brand = parts[0] if parts else "Universal"
-                        machine_model = ' '.join(parts[1:]) if len(parts) > 1 else machine_model_full
-                    else:
-                        brand = "Universal"
-                        machine_model = ""
-                    
-                    # Get item type and position
-                    item_type = str(row.get('item_type', category)).strip()
-                    position = str(row.get('position', '')).strip()
-                    
-                    # Create title
-                    if position:
-                        title = f"{brand} {machine_model} {position} {item_type}".strip()
-                    else:
-                        title = f"{brand} {machine_model} {item_type}".strip()
-                    
-                    # Get price (default to reasonable price for undercarriage parts)
-                    price = 189.99 if category == "Rollers" else (429.99 if category == "Sprockets" else 349.99)
-                    
-                    # Other fields
-                    size = "N/A"
-                    description = str(row.get('description', f'Premium {item_type} for {brand} {machine_model}')).strip()
-                    
-                    # SEO fields
-                    seo_keywords = [f"{brand.lower()} {item_type.lower()}", part_number.lower(), category.lower()]
-                    in_stock = True
-                
-                # Check if brand exists, if not use "Universal"
-                existing_brand = await brands_collection.find_one({"name": brand})
-                if not existing_brand:
-                    brand = "Universal"
-                
-                # Create product object (common for both formats)
-                product_data = {
-                    "sku": sku,
-                    "title": title,
-                    "description": description if 'description' in locals() else str(row.get('description', f'Premium {category} for {brand}')).strip(),
-                    "price": price,
-                    "brand": brand,
-                    "category": category,
-                    "size": size if 'size' in locals() else "N/A",
-                    "part_number": part_number,
-                    "images": [],
-                    "in_stock": in_stock,
-                    "stock_quantity": 10 if in_stock else 0,
-                    "specifications": {
-                        "machine_model": machine_model if 'machine_model' in locals() else "",
-                        "warranty": "1 Year" if category == "Rubber Tracks" else "6 Months"
-                    },
-                    "seo_title": str(row.get('seo_title', title + ' | Rubber Track Wholesale')).strip() if 'seo_title' in row else title + ' | Rubber Track Wholesale',
-                    "seo_description": str(row.get('seo_description', f'Buy {title} at wholesale prices. Free shipping available.')).strip() if 'seo_description' in row else f'Buy {title} at wholesale prices. Free shipping available.',
-                    "seo_keywords": seo_keywords,
-                    "alt_tags": [f"{title}"],
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-                
-                # Add alternate part numbers if present
-                if 'alternate_parts' in row and pd.notna(row.get('alternate_parts')):
-                    product_data["specifications"]["alternate_parts"] = str(row['alternate_parts']).strip()
-                
-                # Add fits models if present
-                if 'fits_models' in row and pd.notna(row.get('fits_models')):
-                    product_data["specifications"]["fits_models"] = str(row['fits_models']).strip()
-                
-                # Generate schema markup
-                product_data["schema_markup"] = {
-                    "@context": "https://schema.org/",
-                    "@type": "Product",
-                    "name": title,
-                    "description": product_data["description"],
-                    "sku": sku,
-                    "brand": {
-                        "@type": "Brand",
-                        "name": brand
-                    },
-                    "offers": {
-                        "@type": "Offer",
-                        "url": f"https://rubbertrackwholesale.com/product/{sku}",
-                        "priceCurrency": "USD",
-                        "price": str(price),
-                        "availability": "https://schema.org/InStock" if in_stock else "https://schema.org/OutOfStock"
-                    }
-                }
-                
-                # Check if product with same SKU exists
-                existing = await products_collection.find_one({"sku": sku})
-                if existing:
-                    # Update existing product
-                    await products_collection.update_one(
-                        {"sku": sku},
-                        {"$set": product_data}
-                    )
-                else:
-                    # Insert new product
-                    await products_collection.insert_one(product_data)
-                
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Row {index + 2}: {str(e)}")
+    # Preview what the import would change without writing anything
+    if dry_run:
+        frames = import_pipeline.iter_file_frames(file.file, file.filename, chunk_size)
+        try:
+            brand_names = await import_pipeline.load_brand_names(brands_collection)
+            pricing_rules = await pricing.load_rules("products", include_import_only=True)
+            result = await import_pipeline.diff_frames(frames, products_collection, brand_names, pricing_rules)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Failed to process file: {str(e)}")
         
+        base_name = file.filename.rsplit('.', 1)[0]
         return {
             "success": True,
-            "message": f"Import completed. {success_count} products imported/updated, {error_count} errors",
-            "success_count": success_count,
-            "error_count": error_count,
-            "errors": errors[:10]  # Return first 10 errors only
+            "dry_run": True,
+            "message": (f"Dry run: {result['new_count']} new, {result['changed_count']} changed, "
+                        f"{result['unchanged_count']} unchanged, {result['invalid_count']} invalid"),
+            "category": result["category"],
+            "rows": result["rows"],
+            "new_count": result["new_count"],
+            "changed_count": result["changed_count"],
+            "unchanged_count": result["unchanged_count"],
+            "invalid_count": result["invalid_count"],
+            "field_counts": result["field_counts"],
+            "errors": result["errors"][:10],  # Return first 10 errors only
+            "diff": {
+                "filename": f"{base_name}_import_diff.csv",
+                "content": result["diff_csv"]
+            }
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to process file: {str(e)}")
+    
+    # Large files: save the upload and return the job id right away
+    if background:
+        job_id = await import_jobs.submit_background_job(file, current_user.username, batch_size, chunk_size)
+        return {"success": True, "job_id": job_id, "status": "queued"}
+    
+    # CSV is streamed from the spooled upload in chunks; Excel is parsed whole.
+    # Each chunk is transformed and upserted in unordered batches.
+    job_id = await import_jobs.create_job(file.filename, current_user.username)
+    frames = import_pipeline.iter_file_frames(file.file, file.filename, chunk_size)
+    job = await import_jobs.run_job(job_id, frames, batch_size)
+    
+    if job["status"] == "failed":
+        raise HTTPException(status_code=400, detail=f"Failed to process file: {job['message']}")
+    
+    return {
+        "success": True,
+        "job_id": job_id,
+        "message": job["message"],
+        "success_count": job["rows_written"],
+        "inserted_count": job["inserted_count"],
+        "updated_count": job["updated_count"],
+        "skipped_count": job["rows_skipped"],
+        "error_count": job["rows_failed"],
+        "errors": job["errors"],  # First 10 errors only
+        "error_report_url": f"/api/admin/import-jobs/{job_id}/errors.csv" if job["rows_failed"] else None
+    }
+
+
+# ============= IMPORT JOB ROUTES =============
+
+@router.get("/import-jobs")
+async def get_import_jobs(limit: int = Query(default=50, ge=1, le=500), current_user = Depends(get_current_user)):
+    """Get recent product import jobs"""
+    jobs = await import_jobs_collection.find().sort("created_at", -1).limit(limit).to_list(limit)
+    return [serialize_doc(job) for job in jobs]
+
+
+@router.get("/import-jobs/{job_id}")
+async def get_import_job(job_id: str, current_user = Depends(get_current_user)):
+    """Get status and progress of an import job"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    
+    job = await import_jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return serialize_doc(job)
+
+
+@router.get("/import-jobs/{job_id}/errors.csv")
+async def download_import_job_errors(job_id: str, current_user = Depends(get_current_user)):
+    """Download every row error of an import job as CSV"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    
+    job = await import_jobs_collection.find_one({"_id": ObjectId(job_id)}, {"filename": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    base_name = job["filename"].rsplit('.', 1)[0]
+    return StreamingResponse(
+        import_jobs.iter_error_report(job_id),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{base_name}_import_errors.csv"'}
+    )
+
+
+@router.post("/import-jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: str, current_user = Depends(get_current_user)):
+    """Request cancellation of a running import job (takes effect between chunks)"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    
+    job = await import_jobs.request_cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return serialize_doc(job)
 
 
 # Download Import Template
@@ -644,10 +560,20 @@ async def delete_category(category_id: str, current_user = Depends(get_current_u
 
 # Orders Management
 @router.get("/orders")
-async def get_all_orders(current_user = Depends(get_current_user)):
-    """Get all orders"""
-    orders = await orders_collection.find().sort("created_at", -1).to_list(1000)
-    return [serialize_doc(o) for o in orders]
+async def get_all_orders(
+    params: ListParams = Depends(),
+    status: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """List orders (paginated, searchable by order number and customer)"""
+    return await list_documents(
+        orders_collection, params,
+        filters={"status": status, "customer_id": customer_id},
+        search_fields=["order_number", "customer_name", "customer_email"],
+        sort_fields=["created_at", "order_number", "total", "status"],
+        serialize=serialize_doc
+    )
 
 
 class OrderStatusUpdate(BaseModel):
@@ -664,28 +590,47 @@ async def update_order_status(order_id: str, status_update: OrderStatusUpdate, c
     if status_update.status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
-    result = await orders_collection.update_one(
-        {"_id": ObjectId(order_id)},
+    # Moving an order on keeps its reserved stock; the reservation must not have expired
+    if status_update.status in inventory.CONFIRMING_STATUSES:
+        if not await inventory.confirm_reservation(ObjectId(order_id)):
+            raise HTTPException(status_code=409, detail="The order's stock reservation has expired or been released")
+    
+    query = {"_id": ObjectId(order_id)}
+    if status_update.status != "cancelled":
+        # The stock of cancelled orders has been returned
+        query["status"] = {"$ne": "cancelled"}
+    previous = await orders_collection.find_one_and_update(
+        query,
         {"$set": {"status": status_update.status, "updated_at": datetime.utcnow()}}
     )
     
-    if result.matched_count == 0:
+    if previous is None:
+        if await orders_collection.count_documents({"_id": ObjectId(order_id)}, limit=1):
+            raise HTTPException(status_code=409, detail="Cancelled orders cannot be reopened")
         raise HTTPException(status_code=404, detail="Order not found")
     
+    if status_update.status == "cancelled":
+        await inventory.release_reservation(ObjectId(order_id))
+    await stats.record_order_status({**previous, "status": status_update.status}, previous.get("status"))
+    
     return {"success": True, "message": "Order status updated successfully"}
 
 
 # Customers Management
 @router.get("/customers")
-async def get_all_customers(current_user = Depends(get_current_user)):
-    """Get all customers"""
-    customers = await customers_collection.find().sort("created_at", -1).to_list(1000)
-    return [serialize_doc(c) for c in customers]
+async def get_all_customers(params: ListParams = Depends(), current_user = Depends(get_current_user)):
+    """List customers (paginated, searchable by name, email, company and phone)"""
+    return await list_documents(
+        customers_collection, params,
+        search_fields=["name", "email", "company", "phone"],
+        sort_fields=["created_at", "name", "email", "order_count", "total_spent", "last_order_at"],
+        serialize=serialize_doc
+    )
 
 
 @router.get("/customers/{customer_id}")
 async def get_customer(customer_id: str, current_user = Depends(get_current_user)):
-    """Get customer details"""
+    """Get customer details with lifetime order count, total spent and last order date"""
     if not ObjectId.is_valid(customer_id):
         raise HTTPException(status_code=400, detail="Invalid customer ID")
     
@@ -693,21 +638,46 @@ async def get_customer(customer_id: str, current_user = Depends(get_current_user
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    # Get customer orders
-    orders = await orders_collection.find({"customer_id": customer_id}).to_list(100)
-    
-    result = serialize_doc(customer)
-    result["orders"] = [serialize_doc(o) for o in orders]
+    return serialize_doc(customer)
+
+
+@router.get("/customers/{customer_id}/orders")
+async def get_customer_orders(customer_id: str, params: ListParams = Depends(), current_user = Depends(get_current_user)):
+    """Customer order history, newest first (pass next_cursor back as cursor for the next page)"""
+    if not ObjectId.is_valid(customer_id):
+        raise HTTPException(status_code=400, detail="Invalid customer ID")
     
+    return await find_page(
+        orders_collection, {"customer_id": customer_id}, params,
+        sort_fields=["created_at"],
+        serialize=serialize_doc
+    )
+
+
+@router.post("/customers/rebuild-totals")
+async def rebuild_customer_totals(current_user = Depends(get_current_user)):
+    """Recompute every customer's order count, total spent and last order date from the orders"""
+    result = await stats.rebuild_customer_totals()
+    result["error_count"] = len(result["errors"])
+    result["errors"] = result["errors"][:import_pipeline.ERROR_PREVIEW]
     return result
 
 
 # Messages Management
 @router.get("/messages")
-async def get_all_messages(current_user = Depends(get_current_user)):
-    """Get all contact messages"""
-    messages = await contact_messages_collection.find().sort("created_at", -1).to_list(1000)
-    return [serialize_doc(m) for m in messages]
+async def get_all_messages(
+    params: ListParams = Depends(),
+    status: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """List contact messages (paginated, searchable by sender and content)"""
+    return await list_documents(
+        contact_messages_collection, params,
+        filters={"status": status},
+        search_fields=["name", "email", "machine_model", "message"],
+        sort_fields=["created_at", "name", "status"],
+        serialize=serialize_doc
+    )
 
 
 class MessageStatusUpdate(BaseModel):
@@ -724,36 +694,61 @@ async def update_message_status(message_id: str, status_update: MessageStatusUpd
     if status_update.status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}")
     
-    result = await contact_messages_collection.update_one(
+    previous = await contact_messages_collection.find_one_and_update(
         {"_id": ObjectId(message_id)},
-        {"$set": {"status": status_update.status}}
+        {"$set": {"status": status_update.status}},
+        projection={"status": 1}
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Message not found")
     
+    unread_delta = (status_update.status == "new") - (previous.get("status") == "new")
+    if unread_delta:
+        await stats.adjust_summary(unread_messages=unread_delta)
+    
     return {"success": True, "message": "Message status updated successfully"}
 
 
 # Dashboard Stats
 @router.get("/stats")
-async def get_dashboard_stats(current_user = Depends(get_current_user)):
-    """Get dashboard statistics"""
-    total_products = await products_collection.count_documents({})
-    total_orders = await orders_collection.count_documents({})
-    total_customers = await customers_collection.count_documents({})
-    unread_messages = await contact_messages_collection.count_documents({"status": "new"})
-    
-    # Recent orders
-    recent_orders = await orders_collection.find().sort("created_at", -1).limit(5).to_list(5)
-    
-    return {
-        "total_products": total_products,
-        "total_orders": total_orders,
-        "total_customers": total_customers,
-        "unread_messages": unread_messages,
-        "recent_orders": [serialize_doc(o) for o in recent_orders]
-    }
+async def get_dashboard_stats(days: int = 30, current_user = Depends(get_current_user)):
+    """Get dashboard statistics with daily orders/revenue for the last `days` days"""
+    if days not in stats.SERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be one of: {', '.join(map(str, stats.SERIES_DAYS))}")
+    
+    dashboard = await stats.get_dashboard(days)
+    dashboard["recent_orders"] = [serialize_doc(o) for o in dashboard.get("recent_orders", [])]
+    return dashboard
+
+
+# ==================== Order Analytics ====================
+
+@router.get("/analytics/orders")
+async def get_order_analytics(
+    group_by: str = "day",
+    start: Optional[str] = Query(default=None, description="First day (YYYY-MM-DD), default 30 days before end"),
+    end: Optional[str] = Query(default=None, description="Last day (YYYY-MM-DD), default today"),
+    source: str = Query(default="auto", description="auto: rollups where built, then live; live: orders only; rollup: rollups only"),
+    limit: int = Query(default=100, ge=1, le=10000),
+    current_user = Depends(get_current_user)
+):
+    """Order lines, quantity and revenue by day, brand, category or SKU (cancelled orders excluded)"""
+    end = end or datetime.utcnow().strftime("%Y-%m-%d")
+    try:
+        start = start or (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=29)).strftime("%Y-%m-%d")
+        return await order_analytics.order_report(group_by, start, end, source=source, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/analytics/orders/rollups")
+async def rebuild_order_rollups(days: Optional[int] = Query(default=None, ge=1), current_user = Depends(get_current_user)):
+    """Roll up finished days of orders now (the last `days` days, or since the last run)"""
+    result = await order_analytics.build_rollups(days)
+    result["error_count"] = len(result.get("errors", []))
+    result["errors"] = result.get("errors", [])[:import_pipeline.ERROR_PREVIEW]
+    return result
 
 
 # Pages Management (CMS)
@@ -791,6 +786,7 @@ async def create_page(page: Page, current_user = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail="Page with this slug already exists")
     
     result = await pages_collection.insert_one(page_dict)
+    await bump_collection_version("pages")
     created_page = await pages_collection.find_one({"_id": result.inserted_id})
     
     return serialize_doc(created_page)
@@ -814,6 +810,7 @@ async def update_page(page_id: str, page: Page, current_user = Depends(get_curre
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Page not found")
     
+    await bump_collection_version("pages")
     updated_page = await pages_collection.find_one({"_id": ObjectId(page_id)})
     return serialize_doc(updated_page)
 
@@ -830,6 +827,7 @@ async def delete_page(page_id: str, current_user = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Page not found")
     
+    await bump_collection_version("pages")
     return {"success": True, "message": "Page deleted successfully"}
 
 
@@ -872,21 +870,22 @@ async def update_redirect(redirect_id: str, redirect: Redirect, current_user = D
 
 @router.get("/part-numbers")
 async def get_part_numbers(
+    params: ListParams = Depends(),
     brand: Optional[str] = None,
     part_type: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all part numbers, optionally filtered by brand and/or part type"""
+    """List part numbers (paginated), optionally filtered by brand and/or part type"""
     from database import part_numbers_collection
     
-    query = {}
-    if brand:
-        query["brand"] = brand
-    if part_type:
-        query["part_type"] = part_type
-    
-    part_numbers = await part_numbers_collection.find(query).sort([("brand", 1), ("part_number", 1)]).to_list(length=1000)
-    return [serialize_doc(part) for part in part_numbers]
+    return await list_documents(
+        part_numbers_collection, params,
+        filters={"brand": brand or None, "part_type": part_type or None},
+        search_fields=["part_number", "product_name", "compatible_models"],
+        sort_fields=["brand", "part_number", "part_type", "product_name", "price", "created_at"],
+        default_sort="brand,part_number",
+        serialize=serialize_doc
+    )
 
 
 @router.get("/part-numbers/brands")
@@ -924,6 +923,7 @@ async def create_part_number(part: Dict, current_user: dict = Depends(get_curren
         "product_name": part["product_name"],
         "compatible_models": part.get("compatible_models", []),
         "price": part.get("price"),
+        "cost": part.get("cost"),
         "description": part.get("description"),
         "image_url": part.get("image_url"),
         "is_active": part.get("is_active", True),
@@ -999,13 +999,261 @@ async def delete_redirect(redirect_id: str, current_user = Depends(get_current_u
     return {"success": True, "message": "Redirect deleted successfully"}
 
 
+# ==================== Pricing Rules ====================
+
+def _validate_pricing_rule(rule: PricingRule):
+    if rule.collection not in pricing.PRICED_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"Collection must be one of: {', '.join(pricing.PRICED_COLLECTIONS)}")
+    if rule.rounding not in pricing.ROUNDING_MODES:
+        raise HTTPException(status_code=400, detail=f"Rounding must be one of: {', '.join(pricing.ROUNDING_MODES)}")
+    if rule.margin is None and rule.fixed_price is None:
+        raise HTTPException(status_code=400, detail="A rule needs a margin or a fixed price")
+
+
+@router.get("/pricing-rules")
+async def get_pricing_rules(collection: Optional[str] = None, current_user = Depends(get_current_user)):
+    """Get pricing rules, highest priority first"""
+    query = {"collection": collection} if collection else {}
+    rules = await pricing_rules_collection.find(query).sort([("collection", 1), ("priority", -1)]).to_list(length=None)
+    return [serialize_doc(rule) for rule in rules]
+
+
+@router.post("/pricing-rules")
+async def create_pricing_rule(rule: PricingRule, current_user = Depends(get_current_user)):
+    """Create a pricing rule"""
+    _validate_pricing_rule(rule)
+    rule_dict = rule.dict(exclude={'id'})
+    rule_dict['created_at'] = datetime.utcnow()
+    rule_dict['updated_at'] = datetime.utcnow()
+
+    result = await pricing_rules_collection.insert_one(rule_dict)
+    rule_dict['_id'] = str(result.inserted_id)
+    return serialize_doc(rule_dict)
+
+
+@router.put("/pricing-rules/{rule_id}")
+async def update_pricing_rule(rule_id: str, rule: PricingRule, current_user = Depends(get_current_user)):
+    """Update a pricing rule"""
+    if not ObjectId.is_valid(rule_id):
+        raise HTTPException(status_code=400, detail="Invalid rule ID")
+    _validate_pricing_rule(rule)
+    rule_dict = rule.dict(exclude={'id', 'created_at'})
+    rule_dict['updated_at'] = datetime.utcnow()
+
+    result = await pricing_rules_collection.update_one({"_id": ObjectId(rule_id)}, {"$set": rule_dict})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Pricing rule not found")
+
+    updated_rule = await pricing_rules_collection.find_one({"_id": ObjectId(rule_id)})
+    return serialize_doc(updated_rule)
+
+
+@router.delete("/pricing-rules/{rule_id}")
+async def delete_pricing_rule(rule_id: str, current_user = Depends(get_current_user)):
+    """Delete a pricing rule"""
+    if not ObjectId.is_valid(rule_id):
+        raise HTTPException(status_code=400, detail="Invalid rule ID")
+    result = await pricing_rules_collection.delete_one({"_id": ObjectId(rule_id)})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Pricing rule not found")
+    return {"message": "Pricing rule deleted successfully"}
+
+
+@router.post("/pricing/reprice")
+async def reprice_catalog(
+    collection: Optional[str] = None,
+    dry_run: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Recompute prices from the pricing rules (one collection or all) and save the changed ones"""
+    if collection and collection not in pricing.PRICED_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"Collection must be one of: {', '.join(pricing.PRICED_COLLECTIONS)}")
+    collections = [collection] if collection else list(pricing.PRICED_COLLECTIONS)
+    results = [await pricing.reprice(name, dry_run=dry_run) for name in collections]
+    for result in results:
+        result["error_count"] = len(result["errors"])
+        result["errors"] = result["errors"][:import_pipeline.ERROR_PREVIEW]
+    return {"dry_run": dry_run, "results": results}
+
+
+# ==================== Export ====================
+
+@router.get("/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = "csv",
+    template: Optional[str] = None,
+    brand: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """Download products (in import template layout), part numbers or compatibility as CSV or XLSX"""
+    from database import part_numbers_collection
+
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(export.EXPORT_FORMATS)}")
+    try:
+        name, query, columns, row, filename = export.export_spec(collection, template, brand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    source = {
+        "products": products_collection,
+        "part_numbers": part_numbers_collection,
+        "compatibility": compatibility_collection,
+    }[name]
+
+    if format == "xlsx":
+        path = await export.write_xlsx(source, query, columns, row)
+        return FileResponse(
+            path,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=f"{filename}.xlsx",
+            background=BackgroundTask(os.unlink, path)
+        )
+
+    return StreamingResponse(
+        export.iter_csv(source, query, columns, row),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+    )
+
+
+# ==================== Bulk Edit ====================
+
+# collection -> (id field, filterable fields, stock toggle field, active toggle field)
+BULK_EDIT_COLLECTIONS = {
+    "track_sizes": ("_id", {"size", "width", "pitch", "links", "price", "is_in_stock", "is_active"}, "is_in_stock", "is_active"),
+    "part_numbers": ("id", {"brand", "part_number", "part_type", "part_subtype", "price", "is_in_stock", "is_active"}, "is_in_stock", "is_active"),
+    "products": ("_id", {"brand", "category", "size", "part_number", "price", "in_stock"}, "in_stock", None),
+}
+
+BULK_EDIT_OPERATIONS = ["set_price", "adjust_price_percent", "set_in_stock", "set_active"]
+
+
+class BulkEditRequest(BaseModel):
+    collection: str  # track_sizes, part_numbers or products
+    filter: Dict[str, Any] = {}  # field -> value, or list of values; "ids" selects documents by id
+    operation: str  # one of BULK_EDIT_OPERATIONS
+    value: Any = None  # price, percent (e.g. -10 for 10% off) or true/false
+    preview: bool = False  # only count the matching documents
+    all: bool = False  # required to edit every document (empty filter)
+
+
+def _bulk_edit_query(collection: str, filters: Dict[str, Any]) -> dict:
+    """Build a MongoDB query from plain field filters (no operators accepted)"""
+    id_field, allowed, _, _ = BULK_EDIT_COLLECTIONS[collection]
+    query = {}
+    for field, value in filters.items():
+        if field == "ids":
+            ids = value if isinstance(value, list) else [value]
+            if id_field == "_id":
+                if not all(isinstance(i, str) and ObjectId.is_valid(i) for i in ids):
+                    raise HTTPException(status_code=400, detail="Invalid id in filter")
+                ids = [ObjectId(i) for i in ids]
+            query[id_field] = {"$in": ids}
+        elif field in allowed:
+            if isinstance(value, dict):
+                raise HTTPException(status_code=400, detail=f"Unsupported filter value for {field}")
+            query[field] = {"$in": value} if isinstance(value, list) else value
+        else:
+            raise HTTPException(status_code=400, detail=f"Cannot filter {collection} by {field}")
+    return query
+
+
+def _bulk_edit_update(collection: str, operation: str, value, query: dict):
+    """Return (query, update) for an operation; price changes skip documents without a price"""
+    _, _, stock_field, active_field = BULK_EDIT_COLLECTIONS[collection]
+    now = datetime.utcnow()
+
+    if operation in ("set_in_stock", "set_active"):
+        if operation == "set_active" and not active_field:
+            raise HTTPException(status_code=400, detail=f"{collection} cannot be activated or deactivated")
+        if not isinstance(value, bool):
+            raise HTTPException(status_code=400, detail=f"{operation} needs a true/false value")
+        field = stock_field if operation == "set_in_stock" else active_field
+        # Only documents that actually change are written
+        return {**query, field: {"$ne": value}}, {"$set": {field: value, "updated_at": now}}
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise HTTPException(status_code=400, detail=f"{operation} needs a numeric value")
+    product_stages = pricing.PRODUCT_PRICE_STAGES if collection == "products" else []
+
+    if operation == "set_price":
+        if value < 0:
+            raise HTTPException(status_code=400, detail="Price cannot be negative")
+        return {**query, "price": {"$ne": value}}, [{"$set": {"price": value, "updated_at": now}}, *product_stages]
+
+    if value <= -100:
+        raise HTTPException(status_code=400, detail="Percent must be greater than -100")
+    if "price" in query:
+        # The price filter is combined with the numeric-price condition below
+        query = {"$and": [query, {"price": {"$type": "number"}}]}
+    else:
+        query = {**query, "price": {"$type": "number"}}
+    # Pipeline update so each document is repriced from its own current price in one round trip
+    return query, [{"$set": {
+        "price": {"$round": [{"$multiply": ["$price", 1 + value / 100]}, 2]},
+        "updated_at": now
+    }}, *product_stages]
+
+
+@router.post("/bulk-edit")
+async def bulk_edit(request: BulkEditRequest, current_user = Depends(get_current_user)):
+    """Apply a price, stock or activation change to every matching document"""
+    from database import part_numbers_collection
+
+    collections = {
+        "track_sizes": track_sizes_collection,
+        "part_numbers": part_numbers_collection,
+        "products": products_collection,
+    }
+    if request.collection not in BULK_EDIT_COLLECTIONS:
+        raise HTTPException(status_code=400, detail=f"Collection must be one of: {', '.join(BULK_EDIT_COLLECTIONS)}")
+    if request.operation not in BULK_EDIT_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Operation must be one of: {', '.join(BULK_EDIT_OPERATIONS)}")
+
+    collection = collections[request.collection]
+    query = _bulk_edit_query(request.collection, request.filter)
+    update_query, update = _bulk_edit_update(request.collection, request.operation, request.value, query)
+    if not query and not request.preview and not request.all:
+        raise HTTPException(status_code=400, detail="An empty filter edits every document; set all to true to confirm")
+
+    if request.preview:
+        return {
+            "preview": True,
+            "matched_count": await collection.count_documents(query),
+            "affected_count": await collection.count_documents(update_query),
+        }
+
+    result = await collection.update_many(update_query, update)
+    if result.modified_count:
+        await bump_collection_version(request.collection)
+
+    return {
+        "success": True,
+        "matched_count": result.matched_count,
+        "modified_count": result.modified_count,
+        "message": f"Updated {result.modified_count} {request.collection.replace('_', ' ')}"
+    }
+
+
 # Reviews Management
 @router.get("/reviews")
-async def get_all_reviews(current_user = Depends(get_current_user)):
-    """Get all reviews"""
+async def get_all_reviews(
+    params: ListParams = Depends(),
+    is_approved: Optional[bool] = None,
+    product_id: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """List reviews (paginated, searchable by reviewer, title and comment)"""
     from database import reviews_collection
-    reviews = await reviews_collection.find().sort("created_at", -1).to_list(500)
-    return [serialize_doc(r) for r in reviews]
+    return await list_documents(
+        reviews_collection, params,
+        filters={"is_approved": is_approved, "product_id": product_id},
+        search_fields=["customer_name", "customer_email", "title", "comment"],
+        sort_fields=["created_at", "rating"],
+        serialize=serialize_doc
+    )
 
 
 @router.post("/reviews")
@@ -1166,11 +1414,21 @@ async def delete_blog_category(category_id: str, current_user = Depends(get_curr
 
 # Blogs Management
 @router.get("/blogs")
-async def get_all_blogs(current_user = Depends(get_current_user)):
-    """Get all blogs"""
+async def get_all_blogs(
+    params: ListParams = Depends(),
+    is_published: Optional[bool] = None,
+    category_id: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """List blogs (paginated, searchable by title, slug and author)"""
     from database import blogs_collection
-    blogs = await blogs_collection.find().sort("created_at", -1).to_list(200)
-    return [serialize_doc(b) for b in blogs]
+    return await list_documents(
+        blogs_collection, params,
+        filters={"is_published": is_published, "category_id": category_id},
+        search_fields=["title", "slug", "author"],
+        sort_fields=["created_at", "updated_at", "published_at", "title"],
+        serialize=serialize_doc
+    )
 
 
 @router.post("/blogs")
@@ -1189,6 +1447,7 @@ async def create_blog(blog: Blog, current_user = Depends(get_current_user)):
         blog_dict["published_at"] = datetime.utcnow()
     
     result = await blogs_collection.insert_one(blog_dict)
+    await bump_collection_version("blogs")
     created = await blogs_collection.find_one({"_id": result.inserted_id})
     return serialize_doc(created)
 
@@ -1217,6 +1476,7 @@ async def update_blog(blog_id: str, blog: Blog, current_user = Depends(get_curre
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Blog not found")
     
+    await bump_collection_version("blogs")
     updated = await blogs_collection.find_one({"_id": ObjectId(blog_id)})
     return serialize_doc(updated)
 
@@ -1232,6 +1492,7 @@ async def delete_blog(blog_id: str, current_user = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Blog not found")
     
+    await bump_collection_version("blogs")
     return {"success": True, "message": "Blog deleted successfully"}
 
 
@@ -1330,6 +1591,7 @@ async def create_machine_model(model: MachineModel):
     
     try:
         result = await machine_models_collection.insert_one(model_dict)
+        await bump_collection_version("machine_models")
         created_model = await machine_models_collection.find_one({"_id": result.inserted_id})
         return serialize_doc(created_model)
     except Exception as e:
@@ -1372,6 +1634,7 @@ async def update_machine_model(model_id: str, model: MachineModel):
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Machine model not found")
     
+    await bump_collection_version("machine_models")
     updated_model = await machine_models_collection.find_one({"_id": ObjectId(model_id)})
     return serialize_doc(updated_model)
 
@@ -1386,40 +1649,56 @@ async def delete_machine_model(model_id: str, current_user: AdminUser = Depends(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Machine model not found")
     
+    await bump_collection_version("machine_models")
     return {"success": True, "message": "Machine model deleted successfully"}
 
 
+class MachineModelBulkImport(BaseModel):
+    models: Dict[str, List[str]]  # brand -> model names (machineModels.js structure)
+    equipment_type: str = "Track Loader"
+
+
 @router.post("/machine-models/bulk-import", dependencies=[Depends(get_current_user)])
-async def bulk_import_machine_models(models: List[Dict[str, str]]):
-    """Bulk import machine models from machineModels.js structure"""
-    imported_count = 0
-    skipped_count = 0
-    
-    for brand, model_list in models:
+async def bulk_import_machine_models(
+    payload: MachineModelBulkImport,
+    batch_size: int = Query(default=import_pipeline.DEFAULT_BATCH_SIZE, ge=1, le=10000)
+):
+    """Bulk import machine models, adding the ones not already present for the equipment type"""
+    writer = import_pipeline.BulkWriter(machine_models_collection, batch_size, key_column="model")
+    now = datetime.utcnow()
+    row_number = 0
+    for brand, model_list in payload.models.items():
+        brand = brand.strip()
         for model_name in model_list:
-            existing = await machine_models_collection.find_one({"brand": brand, "model_name": model_name})
-            if not existing:
-                model_dict = {
-                    "brand": brand,
-                    "model_name": model_name,
+            model_name = model_name.strip()
+            row_number += 1
+            if not brand or not model_name:
+                continue
+            # Upsert on the unique (brand, model_name, equipment_type) key; existing models are left as they are
+            await writer.add(UpdateOne(
+                {"brand": brand, "model_name": model_name, "equipment_type": payload.equipment_type},
+                {"$setOnInsert": {
                     "full_name": f"{brand} {model_name}",
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-                await machine_models_collection.insert_one(model_dict)
-                imported_count += 1
-            else:
-                skipped_count += 1
-    
+                    "created_at": now,
+                    "updated_at": now
+                }},
+                upsert=True
+            ), row_number, f"{brand} {model_name}")
+    await writer.flush()
+
+    if writer.inserted:
+        await bump_collection_version("machine_models")
+
     return {
         "success": True,
-        "imported": imported_count,
-        "skipped": skipped_count,
-        "message": f"Imported {imported_count} models, skipped {skipped_count} existing"
+        "inserted": writer.inserted,
+        "matched": writer.updated,
+        "error_count": len(writer.errors),
+        "errors": writer.errors[:import_pipeline.ERROR_PREVIEW],
+        "message": f"Imported {writer.inserted} models, {writer.updated} already present"
     }
 
 
-
 # ============= TRACK SIZE ROUTES =============
 
 @router.get("/track-sizes")
@@ -1483,59 +1762,102 @@ async def delete_track_size(track_size_id: str, current_user: dict = Depends(get
     return {"message": "Track size deleted successfully"}
 
 
-@router.post("/track-sizes/bulk-import")
-async def bulk_import_track_sizes(current_user: dict = Depends(get_current_user)):
-    """Bulk import track sizes from predefined list"""
-    import json
-    
-    # Read track sizes from file
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _read_json_upload(file: UploadFile, expected_type: type):
+    """Parse an uploaded JSON file, requiring a top-level value of `expected_type`"""
     try:
-        with open('/tmp/track_sizes.json', 'r') as f:
-            track_sizes_list = json.load(f)
-    except:
-        raise HTTPException(status_code=404, detail="Track sizes data file not found")
-    
-    imported_count = 0
-    skipped_count = 0
-    
-    for size_str in track_sizes_list:
-        # Check if already exists
-        existing = await track_sizes_collection.find_one({"size": size_str})
-        if not existing:
-            # Parse dimensions
-            size_parts = size_str.split('x')
-            width, pitch, links = None, None, None
-            if len(size_parts) == 3:
-                try:
-                    width = float(size_parts[0])
-                    pitch = float(size_parts[1])
-                    links = int(size_parts[2])
-                except ValueError:
-                    pass
-            
-            track_size_dict = {
-                "size": size_str,
-                "width": width,
-                "pitch": pitch,
-                "links": links,
-                "is_active": True,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            await track_sizes_collection.insert_one(track_size_dict)
-            imported_count += 1
-        else:
-            skipped_count += 1
-    
+        data = json.loads(await file.read())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON file: {e}")
+    if not isinstance(data, expected_type):
+        raise HTTPException(status_code=400, detail=f"Expected a JSON {expected_type.__name__}")
+    return data
+
+
+async def _bulk_write_ops(collection, ops: list, keys: list) -> dict:
+    """Apply ops in one unordered bulk_write (a failed op does not stop the others)
+
+    Returns the inserted (or upserted) and modified counts as reported by the
+    server, and each failed op as {key, code, message}.
+    """
+    result = {"inserted": 0, "modified": 0, "errors": []}
+    if not ops:
+        return result
+    try:
+        details = (await collection.bulk_write(ops, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+    result["inserted"] = details.get("nInserted", 0) + details.get("nUpserted", 0)
+    result["modified"] = details.get("nModified", 0)
+    result["errors"] = [
+        {"key": keys[error["index"]], "code": error.get("code"), "message": error.get("errmsg", "Write failed")}
+        for error in details.get("writeErrors", [])
+    ]
+    return result
+
+
+@router.post("/track-sizes/bulk-import")
+async def bulk_import_track_sizes(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """Bulk import track sizes from an uploaded JSON list of size strings"""
+    timings = {}
+    start = time.perf_counter()
+    track_sizes_list = await _read_json_upload(file, list)
+    sizes = list(dict.fromkeys(str(size).strip() for size in track_sizes_list if str(size).strip()))
+    timings["parse_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    existing = set(await track_sizes_collection.distinct("size", {"size": {"$in": sizes}}))
+    timings["load_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    ops, keys = [], []
+    for size_str in sizes:
+        if size_str in existing:
+            continue
+        keys.append(size_str)
+        # Parse dimensions
+        size_parts = size_str.split('x')
+        width, pitch, links = None, None, None
+        if len(size_parts) == 3:
+            try:
+                width = float(size_parts[0])
+                pitch = float(size_parts[1])
+                links = int(size_parts[2])
+            except ValueError:
+                pass
+        ops.append(InsertOne({
+            "size": size_str,
+            "width": width,
+            "pitch": pitch,
+            "links": links,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now
+        }))
+    timings["diff_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    written = await _bulk_write_ops(track_sizes_collection, ops, keys)
+    timings["write_ms"] = _elapsed_ms(start)
+
+    imported_count = written["inserted"]
+    failed_count = len(written["errors"])
+    skipped_count = len(sizes) - len(ops)
     return {
         "success": True,
         "imported": imported_count,
         "skipped": skipped_count,
+        "failed": failed_count,
+        "errors": written["errors"][:import_pipeline.ERROR_PREVIEW],
+        "timings": timings,
         "message": f"Imported {imported_count} track sizes, skipped {skipped_count} existing"
     }
 
 
-
 # ============= COMPATIBILITY ROUTES =============
 
 @router.get("/compatibility")
@@ -1553,6 +1875,7 @@ async def create_compatibility(compatibility: Compatibility, current_user: dict
     compatibility_dict['updated_at'] = datetime.utcnow()
     
     result = await compatibility_collection.insert_one(compatibility_dict)
+    await bump_collection_version("compatibility")
     compatibility_dict['_id'] = str(result.inserted_id)
     return serialize_doc(compatibility_dict)
 
@@ -1567,6 +1890,7 @@ async def update_compatibility(compatibility_id: str, compatibility: Compatibili
         {"_id": ObjectId(compatibility_id)},
         {"$set": compatibility_dict}
     )
+    await bump_collection_version("compatibility")
     
     updated_compatibility = await compatibility_collection.find_one({"_id": ObjectId(compatibility_id)})
     return serialize_doc(updated_compatibility)
@@ -1576,60 +1900,79 @@ async def update_compatibility(compatibility_id: str, compatibility: Compatibili
 async def delete_compatibility(compatibility_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a compatibility entry"""
     await compatibility_collection.delete_one({"_id": ObjectId(compatibility_id)})
+    await bump_collection_version("compatibility")
     return {"message": "Compatibility entry deleted successfully"}
 
 
 @router.post("/compatibility/bulk-import")
-async def bulk_import_compatibility(current_user: dict = Depends(get_current_user)):
-    """Bulk import compatibility data from JSON file"""
-    import json
-    
-    # Read compatibility data from file
-    try:
-        with open('/tmp/compatibility_data.json', 'r') as f:
-            compatibility_list = json.load(f)
-    except:
-        raise HTTPException(status_code=404, detail="Compatibility data file not found")
-    
-    imported_count = 0
-    skipped_count = 0
-    updated_count = 0
-    
+async def bulk_import_compatibility(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+    """Bulk import compatibility data from an uploaded JSON list of {make, model, track_sizes}"""
+    timings = {}
+    start = time.perf_counter()
+    compatibility_list = await _read_json_upload(file, list)
+    entries = {}
+    invalid_count = 0
     for entry in compatibility_list:
-        make = entry['make']
-        model = entry['model']
-        track_sizes = entry['track_sizes']
-        
-        # Check if already exists
-        existing = await compatibility_collection.find_one({"make": make, "model": model})
-        if existing:
-            # Update track sizes if different
-            if set(existing.get('track_sizes', [])) != set(track_sizes):
-                await compatibility_collection.update_one(
-                    {"_id": existing['_id']},
-                    {"$set": {"track_sizes": track_sizes, "updated_at": datetime.utcnow()}}
-                )
-                updated_count += 1
-            else:
-                skipped_count += 1
-        else:
-            # Insert new entry
-            compatibility_dict = {
+        if not isinstance(entry, dict) or not entry.get('make') or not entry.get('model') \
+                or not isinstance(entry.get('track_sizes'), list):
+            invalid_count += 1
+            continue
+        # A later entry for the same machine replaces an earlier one
+        entries[(entry['make'], entry['model'])] = entry['track_sizes']
+    timings["parse_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    makes = list({make for make, _ in entries})
+    existing = {}
+    async for doc in compatibility_collection.find({"make": {"$in": makes}}, {"make": 1, "model": 1, "track_sizes": 1}):
+        existing[(doc["make"], doc["model"])] = doc
+    timings["load_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    insert_keys, update_keys = [], []
+    for (make, model), track_sizes in entries.items():
+        current = existing.get((make, model))
+        if current is None:
+            insert_keys.append(f"{make} {model}")
+            inserts.append(InsertOne({
                 "make": make,
                 "model": model,
                 "track_sizes": track_sizes,
                 "is_active": True,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            await compatibility_collection.insert_one(compatibility_dict)
-            imported_count += 1
-    
+                "created_at": now,
+                "updated_at": now
+            }))
+        elif set(current.get('track_sizes', [])) != set(track_sizes):
+            # Update track sizes if different
+            update_keys.append(f"{make} {model}")
+            updates.append(UpdateOne(
+                {"_id": current['_id']},
+                {"$set": {"track_sizes": track_sizes, "updated_at": now}}
+            ))
+    timings["diff_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    written = await _bulk_write_ops(compatibility_collection, inserts + updates, insert_keys + update_keys)
+    timings["write_ms"] = _elapsed_ms(start)
+
+    imported_count = written["inserted"]
+    updated_count = written["modified"]
+    failed_count = len(written["errors"])
+    skipped_count = len(entries) - len(inserts) - len(updates)
+    if imported_count or updated_count:
+        await bump_collection_version("compatibility")
+
     return {
         "success": True,
         "imported": imported_count,
         "updated": updated_count,
         "skipped": skipped_count,
+        "invalid": invalid_count,
+        "failed": failed_count,
+        "errors": written["errors"][:import_pipeline.ERROR_PREVIEW],
+        "timings": timings,
         "message": f"Imported {imported_count} new entries, updated {updated_count}, skipped {skipped_count} existing"
     }
 
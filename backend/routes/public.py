@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
-from models import Product, Brand, Category, ContactMessage, Review, FAQ, Blog, BlogCategory, Section, MachineModel, TrackSize, Compatibility
-from database import products_collection, brands_collection, categories_collection, contact_messages_collection, sections_collection, machine_models_collection, track_sizes_collection, compatibility_collection
+from models import Product, Brand, Category, ContactMessage, Review, FAQ, Blog, BlogCategory, Section, MachineModel, TrackSize, Compatibility, OrderRequest
+from database import products_collection, brands_collection, categories_collection, contact_messages_collection, sections_collection, machine_models_collection, track_sizes_collection, compatibility_collection, customers_collection
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ReturnDocument
 import re
+import secrets
+import stats
+import inventory
 
 router = APIRouter()
 
@@ -162,6 +166,8 @@ async def submit_contact(message: ContactMessage):
     """Submit contact form"""
     message_dict = message.dict(by_alias=True, exclude={"id"})
     result = await contact_messages_collection.insert_one(message_dict)
+    if message_dict.get("status", "new") == "new":
+        await stats.adjust_summary(unread_messages=1)
     
     return {
         "success": True,
@@ -170,6 +176,82 @@ async def submit_contact(message: ContactMessage):
     }
 
 
+# Orders Endpoint
+@router.post("/orders")
+async def place_order(request: OrderRequest):
+    """Place an order; stock for every item is reserved until the order is confirmed or the reservation expires"""
+    if not all(ObjectId.is_valid(line.product_id) for line in request.items):
+        raise HTTPException(status_code=400, detail="Invalid product ID")
+    
+    product_ids = list({ObjectId(line.product_id) for line in request.items})
+    products = {
+        str(p["_id"]): p
+        for p in await products_collection.find({"_id": {"$in": product_ids}}, {"title": 1, "sku": 1, "price": 1}).to_list(None)
+    }
+    missing = [line.product_id for line in request.items if line.product_id not in products]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Product not found: {', '.join(missing)}")
+    
+    items = []
+    for line in request.items:
+        product = products[line.product_id]
+        items.append({
+            "product_id": line.product_id,
+            "product_title": product["title"],
+            "sku": product["sku"],
+            "quantity": line.quantity,
+            "price": product["price"],
+            "total": round(product["price"] * line.quantity, 2)
+        })
+    subtotal = round(sum(item["total"] for item in items), 2)
+    
+    now = datetime.utcnow()
+    # The document before the upsert is None when this order creates the customer
+    new_customer_id = ObjectId()
+    customer = await customers_collection.find_one_and_update(
+        {"email": request.customer_email},
+        {"$setOnInsert": {
+            "_id": new_customer_id, "name": request.customer_name, "email": request.customer_email,
+            "phone": request.phone, "company": request.company, "address": request.shipping_address,
+            "created_at": now, "updated_at": now
+        }},
+        upsert=True, projection={"_id": 1}, return_document=ReturnDocument.BEFORE
+    )
+    if customer is None:
+        await stats.adjust_summary(total_customers=1)
+    
+    order = {
+        "_id": ObjectId(),
+        "order_number": f"RTW-{now:%Y%m%d}-{secrets.token_hex(4).upper()}",
+        "customer_id": str(customer["_id"] if customer else new_customer_id),
+        "customer_name": request.customer_name,
+        "customer_email": request.customer_email,
+        "items": items,
+        "subtotal": subtotal,
+        "shipping_cost": 0.0,
+        "tax": 0.0,
+        "total": subtotal,
+        "status": "pending",
+        "shipping_address": request.shipping_address,
+        "notes": request.notes,
+        "created_at": now,
+        "updated_at": now
+    }
+    try:
+        reservation = await inventory.place_order(order)
+    except inventory.InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await stats.record_order(order)
+    
+    return {
+        "success": True,
+        "id": str(order["_id"]),
+        "order_number": order["order_number"],
+        "total": order["total"],
+        "reserved_until": reservation["expires_at"]
+    }
+
+
 # Machine Model Endpoints
 @router.get("/models/{brand}/{model}")
 async def get_model_products(brand: str, model: str):
@@ -352,109 +434,54 @@ async def get_blog_categories():
     return [serialize_doc(c) for c in categories]
 
 
-# XML Sitemap (Dynamic)
+# XML Sitemap (pregenerated by the background job, generated on the fly until the first build)
 @router.get("/sitemap.xml")
 async def generate_sitemap():
-    """Generate dynamic XML sitemap"""
-    from database import products_collection, blogs_collection, pages_collection, brands_collection
-    from fastapi.responses import Response
-    
-    # Base URL - get from environment or use default
-    base_url = "https://rubbertracks-1.preview.emergentagent.com"
-    
-    xml_content = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml_content += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    
-    # Homepage
-    xml_content += f'''  <url>
-    <loc>{base_url}/</loc>
-    <changefreq>daily</changefreq>
-    <priority>1.0</priority>
-  </url>\n'''
-    
-    # Static pages
-    static_pages = [
-        ("/about", "monthly", "0.8"),
-        ("/contact", "monthly", "0.8"),
-        ("/products", "daily", "0.9"),
-        ("/brands", "weekly", "0.7"),
-    ]
-    
-    for url, freq, priority in static_pages:
-        xml_content += f'''  <url>
-    <loc>{base_url}{url}</loc>
-    <changefreq>{freq}</changefreq>
-    <priority>{priority}</priority>
-  </url>\n'''
-    
-    # Products
-    products = await products_collection.find({"in_stock": True}).to_list(1000)
-    for product in products:
-        product_id = str(product["_id"])
-        xml_content += f'''  <url>
-    <loc>{base_url}/product/{product_id}</loc>
-    <changefreq>weekly</changefreq>
-    <priority>0.8</priority>
-  </url>\n'''
-    
-    # Brands
-    brands = await brands_collection.find().to_list(100)
-    for brand in brands:
-        brand_name = brand["name"].lower().replace(" ", "-")
-        xml_content += f'''  <url>
-    <loc>{base_url}/brands/{brand_name}</loc>
-    <changefreq>monthly</changefreq>
-    <priority>0.7</priority>
-  </url>\n'''
-    
-    # Blogs
-    blogs = await blogs_collection.find({"is_published": True}).to_list(200)
-    for blog in blogs:
-        xml_content += f'''  <url>
-    <loc>{base_url}/blog/{blog["slug"]}</loc>
-    <changefreq>monthly</changefreq>
-    <priority>0.6</priority>
-  </url>\n'''
-    
-    # CMS Pages
-    cms_pages = await pages_collection.find({"is_published": True}).to_list(100)
-    for page in cms_pages:
-        if page["slug"] not in ["home"]:  # Skip home as it's already added
-            xml_content += f'''  <url>
-    <loc>{base_url}/{page["slug"]}</loc>
-    <changefreq>monthly</changefreq>
-    <priority>0.7</priority>
-  </url>\n'''
-    
-    xml_content += '</urlset>'
-    
-    return Response(content=xml_content, media_type="application/xml")
+    """Sitemap index pointing at the gzip-compressed sitemap shards"""
+    from fastapi.responses import Response, FileResponse
+    import sitemap
+    
+    path = sitemap.sitemap_file(sitemap.INDEX_FILENAME)
+    if path:
+        return FileResponse(path, media_type="application/xml")
+    
+    shards = await sitemap.list_shards()
+    return Response(content=sitemap.render_sitemap_index(shards), media_type="application/xml")
 
 
-# Robots.txt
-@router.get("/robots.txt")
-async def get_robots():
-    """Generate robots.txt"""
-    from fastapi.responses import Response
+@router.get("/sitemaps/{filename}")
+async def get_sitemap_shard(filename: str):
+    """Serve a single gzip-compressed sitemap shard (e.g. products-0.xml.gz)"""
+    from fastapi.responses import StreamingResponse, FileResponse
+    import sitemap
     
-    base_url = "https://rubbertracks-1.preview.emergentagent.com"
+    parsed = sitemap.parse_shard_filename(filename)
+    if not parsed:
+        raise HTTPException(status_code=404, detail="Sitemap not found")
     
-    robots_content = f"""User-agent: *
-Allow: /
-
-# Disallow admin and private areas
-Disallow: /admin/
-Disallow: /api/admin/
+    path = sitemap.sitemap_file(filename)
+    if path:
+        return FileResponse(path, media_type="application/gzip")
+    
+    section, shard = parsed
+    if shard >= await sitemap.count_shards(section):
+        raise HTTPException(status_code=404, detail="Sitemap not found")
+    
+    return StreamingResponse(sitemap.iter_shard_gzip(section, shard), media_type="application/gzip")
 
-# Disallow search parameters to prevent duplicate content
-Disallow: /*?*sort=
-Disallow: /*?*filter=
 
-# Sitemap
-Sitemap: {base_url}/api/sitemap.xml
-"""
+# Robots.txt
+@router.get("/robots.txt")
+async def get_robots():
+    """Serve robots.txt"""
+    from fastapi.responses import Response, FileResponse
+    import sitemap
+    
+    path = sitemap.sitemap_file(sitemap.ROBOTS_FILENAME)
+    if path:
+        return FileResponse(path, media_type="text/plain")
     
-    return Response(content=robots_content, media_type="text/plain")
+    return Response(content=sitemap.render_robots(), media_type="text/plain")
 
     
     return serialize_doc(page)
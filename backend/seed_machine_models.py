@@ -1,21 +1,10 @@
 """
 Seed machine models from machineModels.js into MongoDB
-"""
-import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
-from pathlib import Path
-import uuid
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-db_name = os.environ['DB_NAME']
-
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+Loaded by the catalog ETL (`python etl.py run machine-models`); running this
+script replaces all machine models as before.
+"""
+import etl
 
 # Complete machine models from unitedskidtracks.com
 TRACK_LOADER_MODELS = {
@@ -65,81 +54,5 @@ MINI_EXCAVATOR_MODELS = {
 }
 
 
-async def seed_machine_models():
-    """Seed all machine models into database"""
-    
-    # Drop the unique index if it exists
-    try:
-        await db.machine_models.drop_index("brand_1_model_name_1")
-        print("🗑️  Dropped unique index on brand_model_name")
-    except:
-        pass
-    
-    # Clear existing machine models
-    await db.machine_models.delete_many({})
-    print("🗑️  Cleared existing machine models")
-    
-    total_added = 0
-    
-    # Seed Track Loader models
-    print("\n📦 Seeding Track Loader Models...")
-    for brand, models in TRACK_LOADER_MODELS.items():
-        for model in models:
-            doc = {
-                "brand": brand,
-                "model_name": model,
-                "full_name": f"{brand} {model}",
-                "equipment_type": "Track Loader",
-                "created_at": "2024-01-01T00:00:00Z",
-                "updated_at": "2024-01-01T00:00:00Z"
-            }
-            await db.machine_models.insert_one(doc)
-            total_added += 1
-        print(f"  ✅ {brand}: {len(models)} models")
-    
-    # Seed Mini Excavator models
-    print("\n📦 Seeding Mini Excavator Models...")
-    for brand, models in MINI_EXCAVATOR_MODELS.items():
-        for model in models:
-            doc = {
-                "brand": brand,
-                "model_name": model,
-                "full_name": f"{brand} {model}",
-                "equipment_type": "Mini Excavator",
-                "created_at": "2024-01-01T00:00:00Z",
-                "updated_at": "2024-01-01T00:00:00Z"
-            }
-            await db.machine_models.insert_one(doc)
-            total_added += 1
-        print(f"  ✅ {brand}: {len(models)} models")
-    
-    # Summary
-    print(f"\n✅ Total machine models seeded: {total_added}")
-    
-    # Count by equipment type
-    track_loader_count = await db.machine_models.count_documents({"equipment_type": "Track Loader"})
-    mini_ex_count = await db.machine_models.count_documents({"equipment_type": "Mini Excavator"})
-    
-    print(f"   📊 Track Loaders: {track_loader_count}")
-    print(f"   📊 Mini Excavators: {mini_ex_count}")
-    
-    # Get brand counts
-    brands = await db.machine_models.distinct("brand")
-    print(f"   📊 Total Brands: {len(brands)}")
-
-
-async def main():
-    """Main function"""
-    print("\n🚀 Seeding Machine Models from unitedskidtracks.com...\n")
-    
-    try:
-        await seed_machine_models()
-        print("\n✅ Machine models seeding complete!\n")
-    except Exception as e:
-        print(f"\n❌ Error during seeding: {str(e)}")
-    finally:
-        client.close()
-
-
 if __name__ == "__main__":
-    asyncio.run(main())
+    etl.main(["run", "machine-models", "--replace"])
@@ -7,6 +7,14 @@ from pathlib import Path
 from database import init_db, admin_users_collection
 from routes import public, admin
 from auth import get_password_hash
+from background import start_periodic_job, stop_background_jobs
+import sitemap
+import import_jobs
+import pricing
+import stats
+import order_analytics
+import inventory
+import excel_parser
 
 
 ROOT_DIR = Path(__file__).parent
@@ -52,4 +60,24 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     await init_db()
-    logger.info("Database initialized")
\ No newline at end of file
+    logger.info("Database initialized")
+    
+    await pricing.seed_default_rules()
+    
+    # Imports whose worker stopped (restart or crash) will never finish
+    start_periodic_job("import_jobs", import_jobs.JOB_STALE_SECONDS, import_jobs.fail_interrupted_jobs)
+    
+    # Pregenerate sitemap/robots.txt to disk and keep them fresh
+    start_periodic_job("sitemap", sitemap.SITEMAP_REFRESH_SECONDS, sitemap.refresh_sitemaps)
+    # Recount the cached dashboard summary (the incremental counters can drift)
+    start_periodic_job("dashboard_stats", stats.STATS_REFRESH_SECONDS, stats.refresh_summary)
+    # Roll up finished days of orders for the analytics reports
+    start_periodic_job("order_rollups", order_analytics.ROLLUP_INTERVAL_SECONDS, order_analytics.build_rollups)
+    # Return the stock of orders that were not confirmed in time
+    start_periodic_job("stock_reservations", inventory.RESERVATION_SWEEP_SECONDS, inventory.expire_reservations)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_background_jobs()
+    excel_parser.shutdown_executor()
\ No newline at end of file
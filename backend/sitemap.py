@@ -0,0 +1,410 @@
+"""
+XML sitemap generation
+
+Builds a sitemap index that points at gzip-compressed urlset shards of at most
+50,000 URLs each. Every shard is streamed straight from a MongoDB cursor so the
+sitemap scales with the catalog instead of being capped at a fixed page size.
+
+A background job pregenerates the index, the shards and robots.txt into
+SITEMAP_DIR so crawler hits are served from disk. It only rebuilds when one of
+the source collections' version counters changed since the last build.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from database import (
+    products_collection, brands_collection, blogs_collection, pages_collection,
+    machine_models_collection, get_collection_versions
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+
+# Base URL - public site the sitemap and robots.txt URLs point at
+BASE_URL = os.environ.get("SITE_BASE_URL", "https://rubbertracks-1.preview.emergentagent.com").rstrip("/")
+
+# Where pregenerated sitemap files are written and served from
+SITEMAP_DIR = Path(os.environ.get("SITEMAP_DIR", ROOT_DIR / "generated" / "sitemaps"))
+
+# How often the background job checks whether the sitemap needs rebuilding
+SITEMAP_REFRESH_SECONDS = int(os.environ.get("SITEMAP_REFRESH_SECONDS", "300"))
+
+INDEX_FILENAME = "sitemap.xml"
+ROBOTS_FILENAME = "robots.txt"
+MANIFEST_FILENAME = "manifest.json"
+
+# Sitemap protocol limit is 50,000 URLs per urlset file
+SHARD_SIZE = 50000
+
+# Compressed output is flushed to the client in chunks of roughly this size
+CHUNK_SIZE = 64 * 1024
+
+SHARD_FILENAME = re.compile(r'^([a-z][a-z0-9-]*)-(\d+)\.xml\.gz$')
+
+# Static pages always listed at the top of the "pages" section
+STATIC_PAGES = [
+    ("/", "daily", "1.0"),
+    ("/about", "monthly", "0.8"),
+    ("/contact", "monthly", "0.8"),
+    ("/products", "daily", "0.9"),
+    ("/brands", "weekly", "0.7"),
+]
+
+
+def url_slug(text: str) -> str:
+    """Lowercase, hyphenate and percent-encode a name for use as a path segment"""
+    return quote(str(text).strip().lower().replace(" ", "-"), safe="-._~")
+
+
+def _brand_path(doc):
+    return f"/brands/{url_slug(doc['name'])}"
+
+
+def _machine_model_path(doc):
+    # Matches the canonical URL returned by GET /api/models/{brand}/{model}
+    return f"/models/{url_slug(doc['brand'])}/{url_slug(doc['model_name'])}"
+
+
+# Sitemap sections - each one is enumerated from a single collection cursor
+SECTIONS = {
+    "pages": {
+        "collection": pages_collection,
+        "query": {"is_published": True, "slug": {"$ne": "home"}},  # Home is a static page
+        "projection": {"slug": 1, "updated_at": 1},
+        "path": lambda doc: f"/{doc['slug']}",
+        "changefreq": "monthly",
+        "priority": "0.7",
+        "static": STATIC_PAGES,
+    },
+    "products": {
+        "collection": products_collection,
+        "query": {"in_stock": True},
+        "projection": {"_id": 1, "updated_at": 1},
+        "path": lambda doc: f"/product/{doc['_id']}",
+        "changefreq": "weekly",
+        "priority": "0.8",
+    },
+    "brands": {
+        "collection": brands_collection,
+        "query": {},
+        "projection": {"name": 1, "updated_at": 1},
+        "path": _brand_path,
+        "changefreq": "monthly",
+        "priority": "0.7",
+    },
+    "blogs": {
+        "collection": blogs_collection,
+        "query": {"is_published": True},
+        "projection": {"slug": 1, "updated_at": 1},
+        "path": lambda doc: f"/blog/{doc['slug']}",
+        "changefreq": "monthly",
+        "priority": "0.6",
+    },
+    "machine-models": {
+        "collection": machine_models_collection,
+        "query": {},
+        "projection": {"brand": 1, "model_name": 1, "updated_at": 1},
+        "path": _machine_model_path,
+        "changefreq": "weekly",
+        "priority": "0.8",
+    },
+}
+
+
+def format_lastmod(value) -> str:
+    """Format an updated_at value as a W3C datetime, or '' if unknown"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    if isinstance(value, str) and len(value) >= 10:
+        # Some seed scripts store ISO strings; the date part is always valid
+        return value[:10]
+    return ""
+
+
+def url_entry(loc: str, lastmod: str = "", changefreq: str = "", priority: str = "") -> str:
+    """Render a single <url> element"""
+    xml = f"  <url>\n    <loc>{escape(loc)}</loc>\n"
+    if lastmod:
+        xml += f"    <lastmod>{lastmod}</lastmod>\n"
+    if changefreq:
+        xml += f"    <changefreq>{changefreq}</changefreq>\n"
+    if priority:
+        xml += f"    <priority>{priority}</priority>\n"
+    return xml + "  </url>\n"
+
+
+def shard_filename(section: str, shard: int) -> str:
+    return f"{section}-{shard}.xml.gz"
+
+
+def parse_shard_filename(filename: str):
+    """Return (section, shard) for a shard file name, or None if it is not one"""
+    match = SHARD_FILENAME.match(filename)
+    if not match or match.group(1) not in SECTIONS:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+async def section_lastmod(section: str) -> str:
+    """Most recent updated_at across a section"""
+    config = SECTIONS[section]
+    cursor = config["collection"].find(config["query"], {"updated_at": 1}).sort("updated_at", -1).limit(1)
+    async for doc in cursor:
+        return format_lastmod(doc.get("updated_at"))
+    return ""
+
+
+async def count_shards(section: str) -> int:
+    """Number of shards needed for a section (empty sections have none)"""
+    config = SECTIONS[section]
+    total = len(config.get("static", [])) + await config["collection"].count_documents(config["query"])
+    return -(-total // SHARD_SIZE)
+
+
+async def shard_start_id(section: str, shard: int):
+    """The _id the previous shard of a section ends at (None if the shard starts at the first document)
+
+    Only needed to serve a single shard on its own; builds carry the last _id
+    from one shard to the next instead.
+    """
+    config = SECTIONS[section]
+    offset = shard * SHARD_SIZE - len(config.get("static", []))
+    if offset <= 0:
+        return None
+    cursor = config["collection"].find(config["query"], {"_id": 1}).sort("_id", 1).skip(offset - 1).limit(1)
+    async for doc in cursor:
+        return doc["_id"]
+    return None
+
+
+async def iter_section_urls(section: str, shard: int, base_url: str = BASE_URL, after_id=None):
+    """Yield (rendered <url> entry, lastmod, _id) for one shard of a section, streamed from a cursor
+
+    Documents are read in _id order starting after `after_id`, the last _id of
+    the previous shard (looked up when not given), so no shard skips over the
+    documents before it.
+    """
+    config = SECTIONS[section]
+    static = config.get("static", [])
+    start = shard * SHARD_SIZE
+    remaining = SHARD_SIZE
+
+    # Static entries come first, so they only ever land in shard 0
+    for path, freq, priority in static[start:start + SHARD_SIZE]:
+        yield url_entry(f"{base_url}{path}", changefreq=freq, priority=priority), "", None
+        remaining -= 1
+
+    if remaining <= 0:
+        return
+
+    if after_id is None:
+        after_id = await shard_start_id(section, shard)
+    query = config["query"] if after_id is None else {"$and": [config["query"], {"_id": {"$gt": after_id}}]}
+    cursor = (
+        config["collection"]
+        .find(query, config["projection"])
+        .sort("_id", 1)
+        .limit(remaining)
+        .batch_size(1000)
+    )
+    async for doc in cursor:
+        lastmod = format_lastmod(doc.get("updated_at"))
+        entry = url_entry(
+            f"{base_url}{config['path'](doc)}",
+            lastmod=lastmod,
+            changefreq=config["changefreq"],
+            priority=config["priority"],
+        )
+        yield entry, lastmod, doc["_id"]
+
+
+async def iter_shard_gzip(section: str, shard: int, base_url: str = BASE_URL, stats: dict = None, after_id=None):
+    """Yield a gzip-compressed urlset shard in chunks
+
+    If `stats` is given it is filled with the shard's URL count, newest lastmod
+    and the last document _id (where the next shard continues).
+    """
+    if stats is not None:
+        stats.update(urls=0, lastmod="", last_id=after_id)
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    buffer = []
+    buffered = 0
+
+    def flush():
+        data = compressor.compress("".join(buffer).encode("utf-8"))
+        buffer.clear()
+        return data
+
+    buffer.append('<?xml version="1.0" encoding="UTF-8"?>\n')
+    buffer.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+
+    async for entry, lastmod, doc_id in iter_section_urls(section, shard, base_url, after_id):
+        if stats is not None:
+            stats["urls"] += 1
+            stats["lastmod"] = max(stats["lastmod"], lastmod)
+            if doc_id is not None:
+                stats["last_id"] = doc_id
+        buffer.append(entry)
+        buffered += len(entry)
+        if buffered >= CHUNK_SIZE:
+            buffered = 0
+            data = flush()
+            if data:
+                yield data
+
+    buffer.append('</urlset>\n')
+    yield flush() + compressor.flush()
+
+
+async def list_shards():
+    """List (section, shard, lastmod) for every shard in the sitemap"""
+    shards = []
+    for section in SECTIONS:
+        lastmod = await section_lastmod(section)
+        for shard in range(await count_shards(section)):
+            shards.append((section, shard, lastmod))
+    return shards
+
+
+def render_sitemap_index(shards, base_url: str = BASE_URL) -> str:
+    """Render the <sitemapindex> document for the given shards"""
+    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    xml += '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for section, shard, lastmod in shards:
+        xml += "  <sitemap>\n"
+        xml += f"    <loc>{escape(base_url)}/api/sitemaps/{shard_filename(section, shard)}</loc>\n"
+        if lastmod:
+            xml += f"    <lastmod>{lastmod}</lastmod>\n"
+        xml += "  </sitemap>\n"
+    return xml + "</sitemapindex>\n"
+
+
+def render_robots(base_url: str = BASE_URL) -> str:
+    """Render robots.txt pointing crawlers at the sitemap index"""
+    return f"""User-agent: *
+Allow: /
+
+# Disallow admin and private areas
+Disallow: /admin/
+Disallow: /api/admin/
+
+# Disallow search parameters to prevent duplicate content
+Disallow: /*?*sort=
+Disallow: /*?*filter=
+
+# Sitemap
+Sitemap: {base_url}/api/sitemap.xml
+"""
+
+
+# ============= PREGENERATION =============
+
+def sitemap_file(filename: str):
+    """Path of a pregenerated sitemap file, or None if it has not been built yet"""
+    path = SITEMAP_DIR / filename
+    return path if path.is_file() else None
+
+
+def _write_file_atomic(path: Path, data: bytes):
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _sync_and_replace(f, tmp_path: Path, path: Path):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp_path, path)
+
+
+async def _write_atomic(path: Path, data: bytes):
+    """Write to a temp file next to `path`, then rename it into place (off the event loop)"""
+    await asyncio.to_thread(_write_file_atomic, path, data)
+
+
+async def _write_shard_atomic(path: Path, section: str, shard: int, base_url: str, after_id=None) -> dict:
+    """Stream one shard to disk and atomically swap it into place"""
+    stats = {}
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for chunk in iter_shard_gzip(section, shard, base_url, stats, after_id):
+            await asyncio.to_thread(f.write, chunk)
+        await asyncio.to_thread(_sync_and_replace, f, tmp_path, path)
+    finally:
+        f.close()
+    return stats
+
+
+def _read_manifest() -> dict:
+    try:
+        with open(SITEMAP_DIR / MANIFEST_FILENAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+async def build_sitemaps(base_url: str = BASE_URL, versions: dict = None) -> dict:
+    """Regenerate every shard, the index and robots.txt into SITEMAP_DIR"""
+    SITEMAP_DIR.mkdir(parents=True, exist_ok=True)
+    started = datetime.utcnow()
+
+    shards = []
+    for section in SECTIONS:
+        # Each shard continues after the last _id of the one before
+        last_id = None
+        for shard in range(await count_shards(section)):
+            filename = shard_filename(section, shard)
+            stats = await _write_shard_atomic(SITEMAP_DIR / filename, section, shard, base_url, last_id)
+            shards.append((section, shard, stats["lastmod"]))
+            last_id = stats["last_id"]
+
+    # Swap the index in only after every shard it references exists
+    await _write_atomic(SITEMAP_DIR / INDEX_FILENAME, render_sitemap_index(shards, base_url).encode("utf-8"))
+    await _write_atomic(SITEMAP_DIR / ROBOTS_FILENAME, render_robots(base_url).encode("utf-8"))
+
+    # Remove shards left over from a larger previous build
+    current = {shard_filename(section, shard) for section, shard, _ in shards}
+    for path in SITEMAP_DIR.glob("*.xml.gz"):
+        if path.name not in current:
+            path.unlink(missing_ok=True)
+
+    manifest = {
+        "base_url": base_url,
+        "versions": versions or {},
+        "shards": sorted(current),
+        "built_at": started.isoformat(),
+    }
+    await _write_atomic(SITEMAP_DIR / MANIFEST_FILENAME, json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+async def refresh_sitemaps(force: bool = False) -> bool:
+    """Rebuild the sitemap if a source collection changed since the last build"""
+    collections = sorted({config["collection"].name for config in SECTIONS.values()})
+    versions = await get_collection_versions(collections)
+    manifest = _read_manifest()
+
+    up_to_date = (
+        manifest.get("versions") == versions
+        and manifest.get("base_url") == BASE_URL
+        and sitemap_file(INDEX_FILENAME) is not None
+    )
+    if up_to_date and not force:
+        return False
+
+    manifest = await build_sitemaps(BASE_URL, versions)
+    logger.info(f"Sitemap regenerated: {len(manifest['shards'])} shards")
+    return True
@@ -0,0 +1,275 @@
+"""
+Dashboard statistics
+
+The admin dashboard is served from one cached summary document
+(stats_summary, _id "dashboard") and the per-day order counters in
+daily_stats, so a dashboard load costs a constant number of queries however
+large the collections grow.
+
+The counters are kept up to date incrementally:
+- record_order adds a new order to its day's order/revenue counters, the
+  summary totals and the recent orders list
+- record_order_status moves an order's revenue out of (or back into) the
+  counters when it is cancelled (or un-cancelled)
+- adjust_summary is used for counters such as unread messages
+- adjust_product_counts moves the product total and per-brand counts when
+  products are created, deleted, re-branded or imported
+
+refresh_summary recounts everything from the source collections concurrently.
+It runs at startup and then periodically, which also corrects any drift in
+the incremental counters.
+
+The same order writes maintain each customer's lifetime aggregates
+(order_count, total_spent, last_order_at) on the customer document, so the
+customer page needs no scan of the order history. rebuild_customer_totals
+recomputes them from the orders.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+import import_pipeline
+from database import (
+    products_collection, orders_collection, customers_collection, contact_messages_collection,
+    stats_summary_collection, daily_stats_collection
+)
+
+SUMMARY_ID = "dashboard"
+
+# Time series the dashboard can request (days)
+SERIES_DAYS = [30, 90]
+
+RECENT_ORDERS = 5
+
+# How often the summary is recounted from the source collections
+STATS_REFRESH_SECONDS = int(os.environ.get("STATS_REFRESH_SECONDS", "900"))
+
+# Orders in these statuses do not count towards revenue
+EXCLUDED_REVENUE_STATUSES = ["cancelled"]
+
+
+def day_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+def _order_revenue(order: dict) -> float:
+    if order.get("status") in EXCLUDED_REVENUE_STATUSES:
+        return 0.0
+    return float(order.get("total") or 0)
+
+
+async def _count_products() -> dict:
+    by_brand, total = await asyncio.gather(
+        products_collection.aggregate([
+            {"$group": {"_id": "$brand", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]).to_list(length=None),
+        products_collection.count_documents({}),
+    )
+    return {
+        "total_products": total,
+        "products_by_brand": [{"brand": doc["_id"], "count": doc["count"]} for doc in by_brand],
+    }
+
+
+async def _revenue_total() -> float:
+    result = await orders_collection.aggregate([
+        {"$match": {"status": {"$nin": EXCLUDED_REVENUE_STATUSES}}},
+        {"$group": {"_id": None, "revenue": {"$sum": "$total"}}},
+    ]).to_list(length=1)
+    return round(result[0]["revenue"], 2) if result else 0.0
+
+
+async def rebuild_daily_stats(days: int = max(SERIES_DAYS)) -> int:
+    """Recount the per-day order counters of the last `days` days from the orders"""
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    rows = await orders_collection.aggregate([
+        {"$match": {"created_at": {"$gte": start}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            "orders": {"$sum": 1},
+            "revenue": {"$sum": {"$cond": [{"$in": ["$status", EXCLUDED_REVENUE_STATUSES]}, 0, "$total"]}},
+        }},
+    ]).to_list(length=None)
+
+    counted = {row["_id"] for row in rows}
+    for row in rows:
+        await daily_stats_collection.update_one(
+            {"_id": row["_id"]},
+            {"$set": {"orders": row["orders"], "revenue": round(row["revenue"], 2)}},
+            upsert=True
+        )
+    # Days whose orders have all been deleted
+    await daily_stats_collection.delete_many({"_id": {"$gte": day_key(start), "$nin": list(counted)}})
+    return len(rows)
+
+
+async def refresh_summary() -> dict:
+    """Recount the cached summary (and the recent daily counters) from the source collections"""
+    products, total_orders, total_customers, unread_messages, total_revenue, recent_orders, _ = await asyncio.gather(
+        _count_products(),
+        orders_collection.count_documents({}),
+        customers_collection.count_documents({}),
+        contact_messages_collection.count_documents({"status": "new"}),
+        _revenue_total(),
+        orders_collection.find().sort("created_at", -1).limit(RECENT_ORDERS).to_list(RECENT_ORDERS),
+        rebuild_daily_stats(),
+    )
+    summary = {
+        **products,
+        "total_orders": total_orders,
+        "total_customers": total_customers,
+        "unread_messages": unread_messages,
+        "total_revenue": total_revenue,
+        "recent_orders": recent_orders,
+        "refreshed_at": datetime.utcnow(),
+    }
+    await stats_summary_collection.replace_one({"_id": SUMMARY_ID}, summary, upsert=True)
+    return {"_id": SUMMARY_ID, **summary}
+
+
+async def adjust_summary(**deltas):
+    """Increment summary counters, e.g. adjust_summary(unread_messages=-1)"""
+    await stats_summary_collection.update_one({"_id": SUMMARY_ID}, {"$inc": deltas})
+
+
+async def adjust_product_counts(brand_deltas: dict):
+    """Move the product total and per-brand counts, e.g. adjust_product_counts({"Bobcat": 1})"""
+    for brand, delta in brand_deltas.items():
+        if not delta:
+            continue
+        result = await stats_summary_collection.update_one(
+            {"_id": SUMMARY_ID, "products_by_brand.brand": brand},
+            {"$inc": {"total_products": delta, "products_by_brand.$.count": delta}}
+        )
+        if not result.matched_count:
+            # First product of the brand (no-op before the summary exists)
+            await stats_summary_collection.update_one(
+                {"_id": SUMMARY_ID, "products_by_brand.brand": {"$ne": brand}},
+                {"$inc": {"total_products": delta}, "$push": {"products_by_brand": {"brand": brand, "count": delta}}}
+            )
+
+
+def _customer_query(order: dict) -> dict:
+    customer_id = order.get("customer_id")
+    return {"_id": ObjectId(customer_id)} if customer_id and ObjectId.is_valid(customer_id) else None
+
+
+async def record_order(order: dict):
+    """Count a newly placed order (call after inserting it)"""
+    revenue = _order_revenue(order)
+    customer = _customer_query(order)
+    if customer:
+        await customers_collection.update_one(customer, {
+            "$inc": {"order_count": 1, "total_spent": revenue},
+            "$max": {"last_order_at": order.get("created_at") or datetime.utcnow()},
+        })
+    await daily_stats_collection.update_one(
+        {"_id": day_key(order.get("created_at") or datetime.utcnow())},
+        {"$inc": {"orders": 1, "revenue": revenue}},
+        upsert=True
+    )
+    await stats_summary_collection.update_one(
+        {"_id": SUMMARY_ID},
+        {
+            "$inc": {"total_orders": 1, "total_revenue": revenue},
+            "$push": {"recent_orders": {"$each": [order], "$position": 0, "$slice": RECENT_ORDERS}},
+        }
+    )
+
+
+async def record_order_status(order: dict, old_status: str):
+    """Move an order's revenue in or out of the counters after a status change"""
+    delta = _order_revenue(order) - _order_revenue({**order, "status": old_status})
+    if delta:
+        await daily_stats_collection.update_one(
+            {"_id": day_key(order.get("created_at") or datetime.utcnow())},
+            {"$inc": {"revenue": delta}},
+            upsert=True
+        )
+        await adjust_summary(total_revenue=delta)
+        customer = _customer_query(order)
+        if customer:
+            await customers_collection.update_one(customer, {"$inc": {"total_spent": delta}})
+    await stats_summary_collection.update_one(
+        {"_id": SUMMARY_ID, "recent_orders._id": order["_id"]},
+        {"$set": {"recent_orders.$.status": order.get("status")}}
+    )
+
+
+async def rebuild_customer_totals() -> dict:
+    """Recompute every customer's order_count, total_spent and last_order_at from the orders"""
+    rows = orders_collection.aggregate([
+        {"$group": {
+            "_id": "$customer_id",
+            "order_count": {"$sum": 1},
+            "total_spent": {"$sum": {"$cond": [{"$in": ["$status", EXCLUDED_REVENUE_STATUSES]}, 0, "$total"]}},
+            "last_order_at": {"$max": "$created_at"},
+        }},
+    ], allowDiskUse=True)
+
+    writer = import_pipeline.BulkWriter(customers_collection, import_pipeline.DEFAULT_BATCH_SIZE, key_column="customer_id")
+    with_orders = set()
+    row = 0
+    async for doc in rows:
+        if not doc["_id"] or not ObjectId.is_valid(doc["_id"]):
+            continue
+        with_orders.add(ObjectId(doc["_id"]))
+        totals = {"order_count": doc["order_count"], "total_spent": round(doc["total_spent"], 2),
+                  "last_order_at": doc["last_order_at"]}
+        await writer.add(UpdateOne({"_id": ObjectId(doc["_id"])}, {"$set": totals}), row, doc["_id"])
+        row += 1
+    await writer.flush()
+
+    # Customers whose orders have all been deleted
+    stale = [
+        doc["_id"] async for doc in customers_collection.find({"order_count": {"$gt": 0}}, {"_id": 1})
+        if doc["_id"] not in with_orders
+    ]
+    if stale:
+        await customers_collection.update_many(
+            {"_id": {"$in": stale}}, {"$set": {"order_count": 0, "total_spent": 0.0, "last_order_at": None}}
+        )
+    return {"customers": len(with_orders), "updated": writer.updated, "reset": len(stale), "errors": writer.errors}
+
+
+async def order_series(days: int) -> list:
+    """Orders and revenue per day for the last `days` days (oldest first, zero-filled)"""
+    today = datetime.utcnow()
+    keys = [day_key(today - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+    counters = {
+        doc["_id"]: doc
+        async for doc in daily_stats_collection.find({"_id": {"$gte": keys[0]}})
+    }
+    return [
+        {
+            "date": key,
+            "orders": counters.get(key, {}).get("orders", 0),
+            "revenue": round(counters.get(key, {}).get("revenue", 0), 2),
+        }
+        for key in keys
+    ]
+
+
+async def get_dashboard(days: int = SERIES_DAYS[0]) -> dict:
+    """The cached summary plus a `days`-day order/revenue series"""
+    summary, series = await asyncio.gather(
+        stats_summary_collection.find_one({"_id": SUMMARY_ID}),
+        order_series(days),
+    )
+    if summary is None:
+        # First load: the daily counters are rebuilt along with the summary
+        summary = await refresh_summary()
+        series = await order_series(days)
+
+    summary.pop("_id", None)
+    # Incremental counts leave brands at zero and out of order until the next refresh
+    summary["products_by_brand"] = sorted(
+        (entry for entry in summary.get("products_by_brand", []) if entry["count"] > 0),
+        key=lambda entry: (-entry["count"], entry["brand"] or "")
+    )
+    summary["total_revenue"] = round(summary.get("total_revenue", 0), 2)
+    summary["series"] = series
+    summary["series_days"] = days
+    return summary
@@ -0,0 +1,44 @@
+import React from 'react';
+import { ChevronLeft, ChevronRight } from 'lucide-react';
+import { Button } from './ui/button';
+
+export const ADMIN_PAGE_SIZE = 50;
+
+// Previous/next controls for the paginated admin list endpoints ({ items, total, page, page_size })
+const AdminListPager = ({ page, pageSize = ADMIN_PAGE_SIZE, total, onPageChange }) => {
+  const pageCount = Math.max(1, Math.ceil(total / pageSize));
+  if (total <= pageSize) {
+    return <p className="text-slate-500 text-sm mt-4">{total} total</p>;
+  }
+
+  return (
+    <div className="flex items-center justify-between mt-4">
+      <p className="text-slate-500 text-sm">
+        {(page - 1) * pageSize + 1}–{Math.min(page * pageSize, total)} of {total}
+      </p>
+      <div className="flex items-center gap-2">
+        <Button
+          size="sm"
+          variant="outline"
+          className="bg-slate-800 border-slate-700 text-white"
+          disabled={page <= 1}
+          onClick={() => onPageChange(page - 1)}
+        >
+          <ChevronLeft className="h-4 w-4" />
+        </Button>
+        <span className="text-slate-400 text-sm">Page {page} of {pageCount}</span>
+        <Button
+          size="sm"
+          variant="outline"
+          className="bg-slate-800 border-slate-700 text-white"
+          disabled={page >= pageCount}
+          onClick={() => onPageChange(page + 1)}
+        >
+          <ChevronRight className="h-4 w-4" />
+        </Button>
+      </div>
+    </div>
+  );
+};
+
+export default AdminListPager;
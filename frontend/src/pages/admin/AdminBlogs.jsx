@@ -7,6 +7,7 @@ import { Card, CardContent } from '../../components/ui/card';
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '../../components/ui/dialog';
 import { Label } from '../../components/ui/label';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const API = process.env.REACT_APP_BACKEND_URL || '';
@@ -15,18 +16,22 @@ const AdminBlogs = () => {
   const [blogs, setBlogs] = useState([]);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editingBlog, setEditingBlog] = useState(null);
   const [formData, setFormData] = useState({ title: '', slug: '', content: '', excerpt: '', featured_image: '', category_id: '', tags: '', meta_title: '', meta_description: '', meta_keywords: '', is_published: false });
 
-  useEffect(() => { fetchBlogs(); fetchCategories(); }, []);
+  useEffect(() => { fetchCategories(); }, []);
+  useEffect(() => { fetchBlogs(); }, [page]);
 
   const fetchBlogs = async () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('admin_token');
-      const response = await axios.get(`${API}/api/admin/blogs`, { headers: { Authorization: `Bearer ${token}` } });
-      setBlogs(response.data);
+      const response = await axios.get(`${API}/api/admin/blogs`, { params: { page, page_size: ADMIN_PAGE_SIZE }, headers: { Authorization: `Bearer ${token}` } });
+      setBlogs(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       toast({ title: "Error", description: "Failed to fetch blogs", variant: "destructive" });
     } finally {
@@ -220,6 +225,7 @@ const AdminBlogs = () => {
               </table>
             </div>
           )}
+          {total > 0 && <AdminListPager page={page} total={total} onPageChange={setPage} />}
         </CardContent>
       </Card>
     </div>
@@ -1,7 +1,16 @@
 import React, { useEffect, useState } from 'react';
 import { Eye } from 'lucide-react';
 import { Card, CardContent } from '../../components/ui/card';
+import { Button } from '../../components/ui/button';
+import {
+  Dialog,
+  DialogContent,
+  DialogDescription,
+  DialogHeader,
+  DialogTitle,
+} from '../../components/ui/dialog';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const API = process.env.REACT_APP_BACKEND_URL || '';
@@ -9,19 +18,26 @@ const API = process.env.REACT_APP_BACKEND_URL || '';
 const AdminCustomers = () => {
   const [customers, setCustomers] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
+  const [selectedCustomer, setSelectedCustomer] = useState(null);
+  const [customerOrders, setCustomerOrders] = useState([]);
+  const [ordersCursor, setOrdersCursor] = useState(null);
 
   useEffect(() => {
     fetchCustomers();
-  }, []);
+  }, [page]);
 
   const fetchCustomers = async () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('admin_token');
       const response = await axios.get(`${API}/api/admin/customers`, {
+        params: { page, page_size: ADMIN_PAGE_SIZE },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setCustomers(response.data);
+      setCustomers(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       toast({
         title: "Error",
@@ -33,6 +49,45 @@ const AdminCustomers = () => {
     }
   };
 
+  // Order history is paged by cursor: each "Load more" continues after the last order shown
+  const fetchCustomerOrders = async (customerId, cursor = null) => {
+    try {
+      const token = localStorage.getItem('admin_token');
+      const response = await axios.get(`${API}/api/admin/customers/${customerId}/orders`, {
+        params: { page_size: 20, cursor: cursor || undefined },
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setCustomerOrders((orders) => (cursor ? [...orders, ...response.data.items] : response.data.items));
+      setOrdersCursor(response.data.next_cursor);
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to fetch customer orders",
+        variant: "destructive"
+      });
+    }
+  };
+
+  const openCustomer = async (customer) => {
+    setSelectedCustomer(customer);
+    setCustomerOrders([]);
+    setOrdersCursor(null);
+    try {
+      const token = localStorage.getItem('admin_token');
+      const response = await axios.get(`${API}/api/admin/customers/${customer.id}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setSelectedCustomer(response.data);
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to fetch customer",
+        variant: "destructive"
+      });
+    }
+    fetchCustomerOrders(customer.id);
+  };
+
   return (
     <div>
       <div className="mb-8">
@@ -57,6 +112,8 @@ const AdminCustomers = () => {
                     <th className="text-left p-4 text-slate-300">Name</th>
                     <th className="text-left p-4 text-slate-300">Email</th>
                     <th className="text-left p-4 text-slate-300">Phone</th>
+                    <th className="text-left p-4 text-slate-300">Orders</th>
+                    <th className="text-left p-4 text-slate-300">Total Spent</th>
                     <th className="text-left p-4 text-slate-300">Joined</th>
                     <th className="text-right p-4 text-slate-300">Actions</th>
                   </tr>
@@ -67,12 +124,14 @@ const AdminCustomers = () => {
                       <td className="p-4 text-white font-medium">{customer.name}</td>
                       <td className="p-4 text-slate-400">{customer.email}</td>
                       <td className="p-4 text-slate-400">{customer.phone || '—'}</td>
+                      <td className="p-4 text-slate-400">{customer.order_count || 0}</td>
+                      <td className="p-4 text-slate-400">${(customer.total_spent || 0).toFixed(2)}</td>
                       <td className="p-4 text-slate-400 text-sm">
                         {new Date(customer.created_at).toLocaleDateString()}
                       </td>
                       <td className="p-4">
                         <div className="flex gap-2 justify-end">
-                          <button className="text-blue-500 hover:text-blue-400">
+                          <button className="text-blue-500 hover:text-blue-400" onClick={() => openCustomer(customer)}>
                             <Eye className="h-4 w-4" />
                           </button>
                         </div>
@@ -83,8 +142,73 @@ const AdminCustomers = () => {
               </table>
             </div>
           )}
+          {!loading && total > 0 && (
+            <AdminListPager page={page} total={total} onPageChange={setPage} />
+          )}
         </CardContent>
       </Card>
+
+      <Dialog open={!!selectedCustomer} onOpenChange={(open) => !open && setSelectedCustomer(null)}>
+        <DialogContent className="bg-slate-900 border-slate-800 text-white max-w-3xl max-h-[90vh] overflow-y-auto">
+          <DialogHeader>
+            <DialogTitle>{selectedCustomer?.name}</DialogTitle>
+            <DialogDescription className="text-slate-400">
+              {selectedCustomer?.email}{selectedCustomer?.company ? ` · ${selectedCustomer.company}` : ''}
+            </DialogDescription>
+          </DialogHeader>
+
+          <div className="grid grid-cols-3 gap-4 my-4">
+            <div>
+              <p className="text-slate-400 text-sm">Orders</p>
+              <p className="text-2xl font-bold">{selectedCustomer?.order_count || 0}</p>
+            </div>
+            <div>
+              <p className="text-slate-400 text-sm">Total Spent</p>
+              <p className="text-2xl font-bold">${(selectedCustomer?.total_spent || 0).toFixed(2)}</p>
+            </div>
+            <div>
+              <p className="text-slate-400 text-sm">Last Order</p>
+              <p className="text-2xl font-bold">
+                {selectedCustomer?.last_order_at ? new Date(selectedCustomer.last_order_at).toLocaleDateString() : '—'}
+              </p>
+            </div>
+          </div>
+
+          {customerOrders.length === 0 ? (
+            <p className="text-slate-400 text-center py-4">No orders yet</p>
+          ) : (
+            <table className="w-full">
+              <thead>
+                <tr className="border-b border-slate-800">
+                  <th className="text-left p-2 text-slate-300">Order #</th>
+                  <th className="text-left p-2 text-slate-300">Date</th>
+                  <th className="text-left p-2 text-slate-300">Status</th>
+                  <th className="text-right p-2 text-slate-300">Total</th>
+                </tr>
+              </thead>
+              <tbody>
+                {customerOrders.map((order) => (
+                  <tr key={order.id} className="border-b border-slate-800">
+                    <td className="p-2 text-white">{order.order_number}</td>
+                    <td className="p-2 text-slate-400 text-sm">{new Date(order.created_at).toLocaleDateString()}</td>
+                    <td className="p-2 text-slate-400 capitalize">{order.status}</td>
+                    <td className="p-2 text-white text-right">${order.total.toFixed(2)}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          )}
+          {ordersCursor && (
+            <Button
+              variant="outline"
+              className="mt-4 bg-slate-800 border-slate-700 text-white"
+              onClick={() => fetchCustomerOrders(selectedCustomer.id, ordersCursor)}
+            >
+              Load more
+            </Button>
+          )}
+        </DialogContent>
+      </Dialog>
     </div>
   );
 };
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Card, CardContent, CardHeader, CardTitle } from '../../components/ui/card';
+import { Button } from '../../components/ui/button';
 import { Package, ShoppingCart, Users, Mail } from 'lucide-react';
 import axios from 'axios';
 import { toast } from '../../hooks/use-toast';
@@ -12,6 +13,7 @@ const AdminDashboard = () => {
   const navigate = useNavigate();
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [days, setDays] = useState(30);
 
   useEffect(() => {
     const token = localStorage.getItem('admin_token');
@@ -20,12 +22,13 @@ const AdminDashboard = () => {
       return;
     }
     fetchStats();
-  }, [navigate]);
+  }, [navigate, days]);
 
   const fetchStats = async () => {
     try {
       const token = localStorage.getItem('admin_token');
       const response = await axios.get(`${API}/admin/stats`, {
+        params: { days },
         headers: { Authorization: `Bearer ${token}` }
       });
       setStats(response.data);
@@ -45,6 +48,8 @@ const AdminDashboard = () => {
     }
   };
 
+  const maxRevenue = Math.max(...(stats?.series || []).map((day) => day.revenue), 1);
+
   if (loading) {
     return (
       <div className="flex items-center justify-center min-h-screen">
@@ -108,6 +113,54 @@ const AdminDashboard = () => {
         </Card>
       </div>
 
+      {/* Orders and revenue per day */}
+      {stats?.series && (
+        <Card className="bg-slate-800 border-slate-700 mb-8">
+          <CardHeader className="flex flex-row items-center justify-between">
+            <CardTitle className="text-white">Last {days} Days</CardTitle>
+            <div className="flex gap-2">
+              {[30, 90].map((option) => (
+                <Button
+                  key={option}
+                  size="sm"
+                  variant={days === option ? 'default' : 'outline'}
+                  className={days === option ? '' : 'bg-slate-800 border-slate-700 text-white'}
+                  onClick={() => setDays(option)}
+                >
+                  {option}d
+                </Button>
+              ))}
+            </div>
+          </CardHeader>
+          <CardContent>
+            <div className="flex gap-8 mb-4">
+              <div>
+                <p className="text-slate-400 text-sm">Orders</p>
+                <p className="text-2xl font-bold text-white">
+                  {stats.series.reduce((sum, day) => sum + day.orders, 0)}
+                </p>
+              </div>
+              <div>
+                <p className="text-slate-400 text-sm">Revenue</p>
+                <p className="text-2xl font-bold text-white">
+                  ${stats.series.reduce((sum, day) => sum + day.revenue, 0).toFixed(2)}
+                </p>
+              </div>
+            </div>
+            <div className="flex items-end gap-px h-32">
+              {stats.series.map((day) => (
+                <div
+                  key={day.date}
+                  className="flex-1 bg-orange-500 rounded-t"
+                  style={{ height: `${(day.revenue / maxRevenue) * 100}%` }}
+                  title={`${day.date}: ${day.orders} orders, $${day.revenue.toFixed(2)}`}
+                />
+              ))}
+            </div>
+          </CardContent>
+        </Card>
+      )}
+
       {/* Recent Orders */}
       {stats?.recent_orders && stats.recent_orders.length > 0 && (
         <Card className="bg-slate-800 border-slate-700">
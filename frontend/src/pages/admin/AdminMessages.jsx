@@ -3,6 +3,7 @@ import { Eye, Trash2 } from 'lucide-react';
 import { Button } from '../../components/ui/button';
 import { Card, CardContent } from '../../components/ui/card';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const API = process.env.REACT_APP_BACKEND_URL || '';
@@ -10,19 +11,23 @@ const API = process.env.REACT_APP_BACKEND_URL || '';
 const AdminMessages = () => {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
   useEffect(() => {
     fetchMessages();
-  }, []);
+  }, [page]);
 
   const fetchMessages = async () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('admin_token');
       const response = await axios.get(`${API}/api/admin/messages`, {
+        params: { page, page_size: ADMIN_PAGE_SIZE },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setMessages(response.data);
+      setMessages(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       toast({
         title: "Error",
@@ -90,6 +95,9 @@ const AdminMessages = () => {
               ))}
             </div>
           )}
+          {!loading && total > 0 && (
+            <AdminListPager page={page} total={total} onPageChange={setPage} />
+          )}
         </CardContent>
       </Card>
     </div>
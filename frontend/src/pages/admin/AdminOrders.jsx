@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { Eye } from 'lucide-react';
 import { Card, CardContent } from '../../components/ui/card';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const API = process.env.REACT_APP_BACKEND_URL || '';
@@ -9,19 +10,23 @@ const API = process.env.REACT_APP_BACKEND_URL || '';
 const AdminOrders = () => {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
   useEffect(() => {
     fetchOrders();
-  }, []);
+  }, [page]);
 
   const fetchOrders = async () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('admin_token');
       const response = await axios.get(`${API}/api/admin/orders`, {
+        params: { page, page_size: ADMIN_PAGE_SIZE },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setOrders(response.data);
+      setOrders(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       toast({
         title: "Error",
@@ -87,6 +92,9 @@ const AdminOrders = () => {
               </table>
             </div>
           )}
+          {!loading && total > 0 && (
+            <AdminListPager page={page} total={total} onPageChange={setPage} />
+          )}
         </CardContent>
       </Card>
     </div>
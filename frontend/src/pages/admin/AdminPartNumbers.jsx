@@ -5,6 +5,7 @@ import { Input } from '../../components/ui/input';
 import { Card, CardContent, CardHeader, CardTitle } from '../../components/ui/card';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../../components/ui/select';
 import { Search, Plus, Edit2, Trash2, Save, X, Upload, Download } from 'lucide-react';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 
 const API = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 
@@ -12,7 +13,8 @@ const AdminPartNumbers = () => {
   const [brands, setBrands] = useState([]);
   const [selectedBrand, setSelectedBrand] = useState('');
   const [partNumbers, setPartNumbers] = useState([]);
-  const [filteredParts, setFilteredParts] = useState([]);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
   const [selectedPartType, setSelectedPartType] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
   const [loading, setLoading] = useState(true);
@@ -34,15 +36,12 @@ const AdminPartNumbers = () => {
     fetchBrands();
   }, []);
 
+  // Filtering, search and paging run on the server; typing waits for a pause before fetching
   useEffect(() => {
-    if (selectedBrand) {
-      fetchPartNumbers();
-    }
-  }, [selectedBrand]);
-
-  useEffect(() => {
-    filterParts();
-  }, [partNumbers, selectedPartType, searchTerm]);
+    if (!selectedBrand) return;
+    const timer = setTimeout(fetchPartNumbers, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [selectedBrand, selectedPartType, searchTerm, page]);
 
   const fetchBrands = async () => {
     try {
@@ -63,10 +62,18 @@ const AdminPartNumbers = () => {
     try {
       setLoading(true);
       const token = localStorage.getItem('admin_token');
-      const response = await axios.get(`${API}/api/admin/part-numbers?brand=${selectedBrand}`, {
+      const response = await axios.get(`${API}/api/admin/part-numbers`, {
+        params: {
+          brand: selectedBrand,
+          part_type: selectedPartType !== 'all' ? selectedPartType : undefined,
+          q: searchTerm || undefined,
+          page,
+          page_size: ADMIN_PAGE_SIZE
+        },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setPartNumbers(response.data);
+      setPartNumbers(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       console.error('Failed to fetch part numbers:', error);
     } finally {
@@ -74,25 +81,6 @@ const AdminPartNumbers = () => {
     }
   };
 
-  const filterParts = () => {
-    let filtered = [...partNumbers];
-
-    if (selectedPartType !== 'all') {
-      filtered = filtered.filter(part => part.part_type === selectedPartType);
-    }
-
-    if (searchTerm) {
-      const searchLower = searchTerm.toLowerCase();
-      filtered = filtered.filter(part =>
-        part.part_number.toLowerCase().includes(searchLower) ||
-        part.product_name.toLowerCase().includes(searchLower) ||
-        part.compatible_models.some(model => model.toLowerCase().includes(searchLower))
-      );
-    }
-
-    setFilteredParts(filtered);
-  };
-
   const handleSavePrice = async (partId, newPrice) => {
     try {
       const token = localStorage.getItem('admin_token');
@@ -144,6 +132,7 @@ const AdminPartNumbers = () => {
       });
       
       setPartNumbers(partNumbers.filter(part => part.id !== partId));
+      setTotal(total - 1);
       alert('Part number deleted successfully!');
     } catch (error) {
       console.error('Failed to delete part:', error);
@@ -268,11 +257,11 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
     );
   };
 
-  // Group parts by type
+  // Group the parts on the current page by type
   const groupedParts = {
-    roller: filteredParts.filter(p => p.part_type === 'roller'),
-    sprocket: filteredParts.filter(p => p.part_type === 'sprocket'),
-    idler: filteredParts.filter(p => p.part_type === 'idler')
+    roller: partNumbers.filter(p => p.part_type === 'roller'),
+    sprocket: partNumbers.filter(p => p.part_type === 'sprocket'),
+    idler: partNumbers.filter(p => p.part_type === 'idler')
   };
 
   return (
@@ -435,7 +424,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
             {/* Brand Selection */}
             <div>
               <label className="block text-sm font-medium mb-2">Select Brand</label>
-              <Select value={selectedBrand} onValueChange={setSelectedBrand}>
+              <Select value={selectedBrand} onValueChange={(value) => { setSelectedBrand(value); setPage(1); }}>
                 <SelectTrigger>
                   <SelectValue placeholder="Select a brand" />
                 </SelectTrigger>
@@ -450,7 +439,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
             {/* Part Type Filter */}
             <div>
               <label className="block text-sm font-medium mb-2">Part Type</label>
-              <Select value={selectedPartType} onValueChange={setSelectedPartType}>
+              <Select value={selectedPartType} onValueChange={(value) => { setSelectedPartType(value); setPage(1); }}>
                 <SelectTrigger>
                   <SelectValue />
                 </SelectTrigger>
@@ -471,7 +460,10 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
                 <Input
                   placeholder="Search by part number or model..."
                   value={searchTerm}
-                  onChange={(e) => setSearchTerm(e.target.value)}
+                  onChange={(e) => {
+                    setSearchTerm(e.target.value);
+                    setPage(1);
+                  }}
                   className="pl-10"
                 />
               </div>
@@ -484,7 +476,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
       <div className="grid grid-cols-1 md:grid-cols-4 gap-4 mb-6">
         <Card>
           <CardContent className="p-4">
-            <div className="text-2xl font-bold">{filteredParts.length}</div>
+            <div className="text-2xl font-bold">{total}</div>
             <div className="text-sm text-gray-600">Total Parts</div>
           </CardContent>
         </Card>
@@ -511,7 +503,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
       {/* Parts Table */}
       {loading ? (
         <div className="text-center py-12">Loading...</div>
-      ) : filteredParts.length === 0 ? (
+      ) : partNumbers.length === 0 ? (
         <Card>
           <CardContent className="p-8 text-center">
             <p className="text-gray-500">No part numbers found for {selectedBrand}</p>
@@ -521,7 +513,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
         <Card>
           <CardHeader>
             <CardTitle>
-              {selectedBrand} Parts ({filteredParts.length})
+              {selectedBrand} Parts ({total})
             </CardTitle>
           </CardHeader>
           <CardContent>
@@ -539,7 +531,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
                   </tr>
                 </thead>
                 <tbody>
-                  {filteredParts.map(part => (
+                  {partNumbers.map(part => (
                     <tr key={part.id} className="border-b hover:bg-gray-50">
                       <td className="p-3 font-mono text-sm">{part.part_number}</td>
                       <td className="p-3">
@@ -631,6 +623,7 @@ Kubota,69191-21300,idler,front,Fits: Kubota K008-3 U10-3 Tension Idler,K008-3;U1
                 </tbody>
               </table>
             </div>
+            <AdminListPager page={page} total={total} onPageChange={setPage} />
           </CardContent>
         </Card>
       )}
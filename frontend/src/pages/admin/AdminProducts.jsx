@@ -15,6 +15,7 @@ import {
 import { Textarea } from '../../components/ui/textarea';
 import { Label } from '../../components/ui/label';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -27,6 +28,8 @@ const AdminProducts = () => {
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editingProduct, setEditingProduct] = useState(null);
   const [formData, setFormData] = useState({
@@ -62,17 +65,24 @@ const AdminProducts = () => {
       navigate('/admin/login');
       return;
     }
-    fetchProducts();
     fetchBrandsAndCategories();
   }, [navigate]);
 
+  // Search and paging run on the server; typing waits for a pause before fetching
+  useEffect(() => {
+    const timer = setTimeout(fetchProducts, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [page, searchTerm]);
+
   const fetchProducts = async () => {
     try {
       const token = localStorage.getItem('admin_token');
       const response = await axios.get(`${API}/admin/products`, {
+        params: { page, page_size: ADMIN_PAGE_SIZE, q: searchTerm || undefined },
         headers: { Authorization: `Bearer ${token}` }
       });
-      setProducts(response.data);
+      setProducts(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       if (error.response?.status === 401) {
         navigate('/admin/login');
@@ -260,12 +270,6 @@ const AdminProducts = () => {
     }
   };
 
-  const filteredProducts = products.filter(product =>
-    product.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    product.sku.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    product.part_number.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   if (loading) {
     return <div className="text-slate-400">Loading...</div>;
   }
@@ -601,7 +605,10 @@ const AdminProducts = () => {
             type="text"
             placeholder="Search by title, SKU, or part number..."
             value={searchTerm}
-            onChange={(e) => setSearchTerm(e.target.value)}
+            onChange={(e) => {
+              setSearchTerm(e.target.value);
+              setPage(1);
+            }}
             className="pl-10 bg-slate-900 border-slate-800 text-slate-200"
           />
         </div>
@@ -623,7 +630,7 @@ const AdminProducts = () => {
                 </tr>
               </thead>
               <tbody>
-                {filteredProducts.map((product) => (
+                {products.map((product) => (
                   <tr key={product.id} className="border-b border-slate-800 hover:bg-slate-800/50">
                     <td className="p-4">
                       <div className="flex items-center gap-3">
@@ -673,6 +680,7 @@ const AdminProducts = () => {
           </div>
         </CardContent>
       </Card>
+      <AdminListPager page={page} total={total} onPageChange={setPage} />
     </div>
   );
 };
@@ -3,6 +3,7 @@ import { CheckCircle, XCircle, Trash2, Star } from 'lucide-react';
 import { Button } from '../../components/ui/button';
 import { Card, CardContent } from '../../components/ui/card';
 import { toast } from '../../hooks/use-toast';
+import AdminListPager, { ADMIN_PAGE_SIZE } from '../../components/AdminListPager';
 import axios from 'axios';
 
 const API = process.env.REACT_APP_BACKEND_URL || '';
@@ -11,15 +12,20 @@ const AdminReviews = () => {
   const [reviews, setReviews] = useState([]);
   const [loading, setLoading] = useState(false);
   const [filter, setFilter] = useState('all');
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
-  useEffect(() => { fetchReviews(); }, []);
+  useEffect(() => { fetchReviews(); }, [filter, page]);
 
   const fetchReviews = async () => {
     setLoading(true);
     try {
       const token = localStorage.getItem('admin_token');
-      const response = await axios.get(`${API}/api/admin/reviews`, { headers: { Authorization: `Bearer ${token}` } });
-      setReviews(response.data);
+      const params = { page, page_size: ADMIN_PAGE_SIZE };
+      if (filter !== 'all') params.is_approved = filter === 'approved';
+      const response = await axios.get(`${API}/api/admin/reviews`, { params, headers: { Authorization: `Bearer ${token}` } });
+      setReviews(response.data.items);
+      setTotal(response.data.total);
     } catch (error) {
       toast({ title: "Error", description: "Failed to fetch reviews", variant: "destructive" });
     } finally {
@@ -50,11 +56,12 @@ const AdminReviews = () => {
     }
   };
 
-  const filteredReviews = reviews.filter(r => {
-    if (filter === 'pending') return !r.is_approved;
-    if (filter === 'approved') return r.is_approved;
-    return true;
-  });
+  const changeFilter = (value) => {
+    setFilter(value);
+    setPage(1);
+  };
+
+  const filterLabel = (value, label) => filter === value ? `${label} (${total})` : label;
 
   return (
     <div>
@@ -63,15 +70,15 @@ const AdminReviews = () => {
         <p className="text-slate-400 mt-2">Approve, reject, or delete customer reviews</p>
       </div>
       <div className="flex gap-3 mb-6">
-        <Button onClick={() => setFilter('all')} className={filter === 'all' ? 'bg-orange-500' : 'bg-slate-700'}>All ({reviews.length})</Button>
-        <Button onClick={() => setFilter('pending')} className={filter === 'pending' ? 'bg-orange-500' : 'bg-slate-700'}>Pending ({reviews.filter(r => !r.is_approved).length})</Button>
-        <Button onClick={() => setFilter('approved')} className={filter === 'approved' ? 'bg-orange-500' : 'bg-slate-700'}>Approved ({reviews.filter(r => r.is_approved).length})</Button>
+        <Button onClick={() => changeFilter('all')} className={filter === 'all' ? 'bg-orange-500' : 'bg-slate-700'}>{filterLabel('all', 'All')}</Button>
+        <Button onClick={() => changeFilter('pending')} className={filter === 'pending' ? 'bg-orange-500' : 'bg-slate-700'}>{filterLabel('pending', 'Pending')}</Button>
+        <Button onClick={() => changeFilter('approved')} className={filter === 'approved' ? 'bg-orange-500' : 'bg-slate-700'}>{filterLabel('approved', 'Approved')}</Button>
       </div>
       <Card className="bg-slate-900 border-slate-800">
         <CardContent className="p-6">
-          {loading ? <p className="text-slate-400 text-center py-8">Loading...</p> : filteredReviews.length === 0 ? <p className="text-slate-400 text-center py-8">No reviews found</p> : (
+          {loading ? <p className="text-slate-400 text-center py-8">Loading...</p> : reviews.length === 0 ? <p className="text-slate-400 text-center py-8">No reviews found</p> : (
             <div className="space-y-4">
-              {filteredReviews.map((review) => (
+              {reviews.map((review) => (
                 <div key={review.id} className="border border-slate-800 rounded-lg p-4 bg-slate-800/50">
                   <div className="flex justify-between items-start mb-2">
                     <div>
@@ -98,6 +105,7 @@ const AdminReviews = () => {
               ))}
             </div>
           )}
+          {!loading && total > 0 && <AdminListPager page={page} total={total} onPageChange={setPage} />}
         </CardContent>
       </Card>
     </div>
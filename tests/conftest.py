@@ -0,0 +1,44 @@
+"""
+Test setup: the backend modules are imported from backend/ and, when
+mongomock-motor is installed, every collection in `database` is swapped for an
+in-memory one before any other backend module imports it.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # pragma: no cover
+    AsyncMongoMockClient = None
+
+import database  # noqa: E402
+
+if AsyncMongoMockClient is not None:
+    database.client = AsyncMongoMockClient()
+    database.db = database.client[os.environ["DB_NAME"]]
+    for name in list(vars(database)):
+        if name.endswith("_collection"):
+            setattr(database, name, database.db[getattr(database, name).name])
+
+
+@pytest.fixture
+def db():
+    """The in-memory database, emptied before each test"""
+    if AsyncMongoMockClient is None:
+        pytest.skip("mongomock-motor is not installed")
+
+    async def drop_all():
+        for name in await database.db.list_collection_names():
+            await database.db.drop_collection(name)
+
+    asyncio.run(drop_all())
+    return database.db
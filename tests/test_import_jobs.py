@@ -0,0 +1,28 @@
+"""
+Only import jobs whose worker stopped sending heartbeats are failed as interrupted.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import import_jobs
+
+
+def test_only_stale_jobs_are_failed(db):
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=import_jobs.JOB_STALE_SECONDS + 60)
+    jobs = {
+        "live": {"status": "running", "worker_id": "other-worker", "heartbeat_at": now, "created_at": stale},
+        "stale": {"status": "running", "worker_id": "other-worker", "heartbeat_at": stale, "created_at": stale},
+        "queued": {"status": "queued", "worker_id": import_jobs.WORKER_ID, "heartbeat_at": now, "created_at": now},
+        "legacy": {"status": "running", "created_at": stale},
+        "done": {"status": "completed", "heartbeat_at": stale, "created_at": stale},
+    }
+
+    async def run():
+        await db.import_jobs.insert_many([{"_id": name, **job} for name, job in jobs.items()])
+        failed = await import_jobs.fail_interrupted_jobs()
+        return failed, {job["_id"]: job["status"] async for job in db.import_jobs.find()}
+
+    failed, statuses = asyncio.run(run())
+    assert failed == 2
+    assert statuses == {"live": "running", "stale": "failed", "queued": "queued", "legacy": "failed", "done": "completed"}
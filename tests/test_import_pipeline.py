@@ -0,0 +1,72 @@
+"""
+Re-importing products keeps the stock that orders and the admin manage, and
+imports keep the dashboard's product counts in step.
+"""
+import asyncio
+import io
+
+import import_pipeline
+import stats
+
+BRANDS = {"Bobcat"}
+
+HEADER = "comp_name,machine_model,track_size,Price,shown_main_listin,SKU\n"
+
+
+async def import_csv(db, text: str) -> dict:
+    async def frames():
+        async for frame in import_pipeline.iter_csv_chunks(io.BytesIO(text.encode())):
+            yield frame
+    return await import_pipeline.import_frames(frames(), db.products, BRANDS)
+
+
+def test_reimport_keeps_stock(db):
+    async def run():
+        await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1299.99,Yes,RT-T190\n")
+        created = await db.products.find_one({"sku": "RT-T190"})
+        # Sold out through orders since the first import
+        await db.products.update_one({"sku": "RT-T190"}, {"$set": {
+            "stock_quantity": 0, "in_stock": False, "schema_markup.offers.availability": "https://schema.org/OutOfStock"
+        }})
+        unchanged = await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1299.99,Yes,RT-T190\n")
+        repriced = await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1199.99,Yes,RT-T190\n")
+        return created, unchanged, repriced, await db.products.find_one({"sku": "RT-T190"})
+
+    created, unchanged, repriced, product = asyncio.run(run())
+    assert (created["stock_quantity"], created["in_stock"]) == (10, True)
+    assert created["schema_markup"]["offers"]["availability"] == "https://schema.org/InStock"
+    assert unchanged["skipped_count"] == 1
+    assert repriced["success_count"] == 1
+    assert product["price"] == 1199.99
+    assert product["schema_markup"]["offers"]["price"] == "1199.99"
+    assert (product["stock_quantity"], product["in_stock"]) == (0, False)
+    assert product["schema_markup"]["offers"]["availability"] == "https://schema.org/OutOfStock"
+    assert product["schema_markup"]["name"] == created["schema_markup"]["name"]
+
+
+def test_reimport_rewrites_edited_products(db):
+    async def run():
+        await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1299.99,Yes,RT-T190\n")
+        # An admin price change drops the stored content hash
+        await db.products.update_one({"sku": "RT-T190"}, {"$set": {"price": 999.99}, "$unset": {"source_hash": ""}})
+        result = await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1299.99,Yes,RT-T190\n")
+        return result, await db.products.find_one({"sku": "RT-T190"})
+
+    result, product = asyncio.run(run())
+    assert (result["skipped_count"], result["success_count"]) == (0, 1)
+    assert product["price"] == 1299.99
+    assert product["source_hash"]
+
+
+def test_import_moves_brand_counts(db):
+    async def run():
+        await db.products.insert_one({"sku": "RT-T190", "brand": "Kubota"})
+        await stats.refresh_summary()
+        # The existing SKU moves from Kubota to Bobcat and a new SKU adds a brand
+        await import_csv(db, HEADER + "Bobcat,T190,450x86x56,1299.99,Yes,RT-T190\n"
+                                      "Unknown,SVL75,450x86x56,1299.99,Yes,RT-SVL75\n")
+        return await stats.get_dashboard()
+
+    dashboard = asyncio.run(run())
+    assert dashboard["total_products"] == 2
+    assert dashboard["products_by_brand"] == [{"brand": "Bobcat", "count": 1}, {"brand": "Universal", "count": 1}]
@@ -0,0 +1,89 @@
+"""
+Stock reservations: concurrent orders, rollback of partially reserved
+orders and returning stock at most once.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import inventory
+from database import get_collection_versions
+
+
+def new_order(*lines) -> dict:
+    """A pending order for (product_id, quantity) lines"""
+    return {
+        "_id": ObjectId(),
+        "items": [{"product_id": str(product_id), "quantity": quantity, "total": 10.0 * quantity}
+                  for product_id, quantity in lines],
+        "total": 10.0 * sum(quantity for _, quantity in lines),
+        "status": "pending",
+        "created_at": datetime.utcnow(),
+    }
+
+
+async def add_product(db, stock: int) -> ObjectId:
+    result = await db.products.insert_one({"sku": str(ObjectId()), "stock_quantity": stock, "in_stock": stock > 0})
+    return result.inserted_id
+
+
+async def stock(db, product_id) -> dict:
+    return await db.products.find_one({"_id": product_id}, {"_id": 0, "stock_quantity": 1, "in_stock": 1})
+
+
+def test_concurrent_orders_for_the_last_unit(db):
+    async def run():
+        product_id = await add_product(db, 1)
+        results = await asyncio.gather(
+            *(inventory.place_order(new_order((product_id, 1))) for _ in range(2)), return_exceptions=True
+        )
+        return results, await stock(db, product_id), await db.orders.count_documents({})
+
+    results, after, orders = asyncio.run(run())
+    assert sum(isinstance(result, inventory.InsufficientStockError) for result in results) == 1
+    assert sum(isinstance(result, dict) for result in results) == 1
+    assert after == {"stock_quantity": 0, "in_stock": False}
+    assert orders == 1
+
+
+def test_failed_line_returns_the_stock_of_earlier_lines(db):
+    async def run():
+        plenty, scarce = await add_product(db, 5), await add_product(db, 1)
+        with pytest.raises(inventory.InsufficientStockError) as error:
+            await inventory.place_order(new_order((plenty, 2), (scarce, 3)))
+        return (error.value, await stock(db, plenty), await stock(db, scarce),
+                await db.orders.count_documents({}), await db.stock_reservations.count_documents({}))
+
+    error, plenty, scarce, orders, reservations = asyncio.run(run())
+    assert (error.requested, error.available) == (3, 1)
+    assert plenty == {"stock_quantity": 5, "in_stock": True}
+    assert scarce == {"stock_quantity": 1, "in_stock": True}
+    assert (orders, reservations) == (0, 0)
+
+
+def test_cancelling_after_expiry_returns_stock_once(db):
+    async def run():
+        product_id = await add_product(db, 2)
+        order = new_order((product_id, 2))
+        await inventory.place_order(order)
+        sold_out = await stock(db, product_id)
+        version = (await get_collection_versions(["products"]))["products"]
+
+        await db.stock_reservations.update_one(
+            {"order_id": order["_id"]}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        expired = await inventory.expire_reservations()
+        released = await inventory.release_reservation(order["_id"])
+        return (sold_out, version, expired, released, await stock(db, product_id),
+                await db.orders.find_one({"_id": order["_id"]}),
+                (await get_collection_versions(["products"]))["products"])
+
+    sold_out, version, expired, released, after, order, final_version = asyncio.run(run())
+    assert sold_out == {"stock_quantity": 0, "in_stock": False}
+    assert version >= 1
+    assert (expired, released) == (1, False)
+    assert after == {"stock_quantity": 2, "in_stock": True}
+    assert order["status"] == "cancelled"
+    assert final_version > version
@@ -0,0 +1,55 @@
+"""
+Cursor paging through admin lists, including sort fields that are null or
+missing on some documents.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from list_query import ListParams, list_documents
+
+
+def params(sort: str, cursor: str = None, page_size: int = 2) -> ListParams:
+    return ListParams(page=1, page_size=page_size, cursor=cursor, sort=sort, q=None)
+
+
+async def page_through(collection, sort: str) -> tuple:
+    """Names in the order cursor paging returns them, and the totals reported"""
+    names, totals, cursor = [], set(), None
+    while True:
+        page = await list_documents(collection, params(sort, cursor), sort_fields=["last_order_at", "order_count", "name"])
+        names += [doc["name"] for doc in page["items"]]
+        totals.add(page["total"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return names, totals
+
+
+@pytest.fixture
+def customers(db):
+    start = datetime(2026, 1, 1)
+    documents = [
+        {"name": "a", "order_count": 3, "last_order_at": start + timedelta(days=2)},
+        {"name": "b", "order_count": 0, "last_order_at": None},
+        {"name": "c"},
+        {"name": "d", "order_count": 1, "last_order_at": start},
+        {"name": "e", "order_count": 3, "last_order_at": start + timedelta(days=5)},
+        {"name": "f", "order_count": None, "last_order_at": None},
+        {"name": "g"},
+    ]
+    asyncio.run(db.customers.insert_many(documents))
+    return db.customers
+
+
+@pytest.mark.parametrize("sort", ["last_order_at", "-last_order_at", "order_count", "-order_count,name"])
+def test_cursor_pages_through_null_sort_values(customers, sort):
+    async def run():
+        everything = await list_documents(customers, params(sort, page_size=100),
+                                          sort_fields=["last_order_at", "order_count", "name"])
+        return [doc["name"] for doc in everything["items"]], await page_through(customers, sort)
+
+    expected, (names, totals) = asyncio.run(run())
+    assert sorted(expected) == list("abcdefg")
+    assert names == expected
+    assert totals == {7}
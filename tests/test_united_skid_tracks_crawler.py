@@ -0,0 +1,226 @@
+"""
+Crawler tests against the fixture pages in fixtures/united_skid_tracks,
+served by a local HTTP server that also provides slow, rate-limited and
+missing pages.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import pytest
+from pymongo.errors import BulkWriteError
+
+import import_united_skid_tracks as crawler_module
+from import_united_skid_tracks import Crawler, ResponseCache, import_track_loaders_data
+
+FIXTURES = Path(__file__).parent / "fixtures" / "united_skid_tracks"
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Fixture pages with ETags, plus /slow/*, /flaky/ and /missing/"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=str(FIXTURES), **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body: bytes, status: int = 200, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        with state["lock"]:
+            state["requests"].append((self.path, dict(self.headers)))
+
+        if self.path.startswith("/slow/"):
+            with state["lock"]:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            time.sleep(0.1)
+            with state["lock"]:
+                state["in_flight"] -= 1
+            return self.send_body(b"<html>slow</html>")
+
+        if self.path == "/flaky/":
+            with state["lock"]:
+                state["flaky_calls"] += 1
+                first = state["flaky_calls"] == 1
+            if first:
+                return self.send_body(b"slow down", 429, {"Retry-After": "1"})
+            return self.send_body(b"<html>recovered</html>")
+
+        page = FIXTURES / self.path.lstrip("/") / "index.html"
+        if not page.is_file():
+            return self.send_body(b"not found", 404)
+        body = page.read_bytes()
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_body(body, headers={"ETag": etag})
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    httpd.state = {"lock": threading.Lock(), "requests": [], "in_flight": 0, "max_in_flight": 0, "flaky_calls": 0}
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fast_crawler(**kwargs):
+    return Crawler(rate=1000, backoff=0.01, **kwargs)
+
+
+def test_concurrency_cap(server):
+    httpd, base_url = server
+
+    async def crawl():
+        crawler = fast_crawler(concurrency=2)
+        try:
+            await asyncio.gather(*(crawler.fetch(f"{base_url}/slow/{n}") for n in range(6)))
+        finally:
+            await crawler.close()
+
+    asyncio.run(crawl())
+    assert httpd.state["max_in_flight"] == 2
+
+
+def test_retry_after_is_honoured(server):
+    httpd, base_url = server
+
+    async def crawl():
+        crawler = fast_crawler()
+        try:
+            started = time.monotonic()
+            text, changed = await crawler.fetch(f"{base_url}/flaky/")
+            return crawler, text, time.monotonic() - started
+        finally:
+            await crawler.close()
+
+    crawler, text, elapsed = asyncio.run(crawl())
+    assert text == "<html>recovered</html>"
+    assert crawler.requests == 2
+    assert crawler.failures == 0
+    assert elapsed >= 1
+
+
+def test_not_modified_pages_come_from_the_cache(server, tmp_path):
+    httpd, base_url = server
+    url = f"{base_url}/track-loaders/caterpillar/259d/tracks/"
+
+    async def crawl():
+        crawler = fast_crawler(cache=ResponseCache(tmp_path))
+        try:
+            first = await crawler.fetch(url)
+            await crawler.commit_cache()
+            second = await crawler.fetch(url)
+            return crawler, first, second
+        finally:
+            await crawler.close()
+
+    crawler, first, second = asyncio.run(crawl())
+    assert first[1] is True
+    assert second == (first[0], False)
+    assert crawler.not_modified == 1
+    conditional = httpd.state["requests"][-1][1]
+    assert conditional.get("If-None-Match")
+
+
+def test_missing_page_counts_as_failure(server):
+    httpd, base_url = server
+
+    async def crawl():
+        crawler = fast_crawler()
+        try:
+            with pytest.raises(httpx.HTTPStatusError):
+                await crawler.fetch(f"{base_url}/missing/")
+            return crawler
+        finally:
+            await crawler.close()
+
+    crawler = asyncio.run(crawl())
+    assert crawler.requests == 1
+    assert crawler.failures == 1
+
+
+def test_import_parses_fixture_pages(server, db, tmp_path):
+    httpd, base_url = server
+
+    async def run():
+        await import_track_loaders_data(base_url=base_url, rate=1000, cache_dir=tmp_path)
+        sizes = await db.track_sizes.find({}, {"_id": 0, "size": 1, "width": 1, "pitch": 1, "links": 1}).to_list(None)
+        compatibility = await db.compatibility.find({}, {"_id": 0}).to_list(None)
+        return sizes, compatibility
+
+    sizes, compatibility = asyncio.run(run())
+    assert sorted(size["size"] for size in sizes) == ["320x86x50", "320x86x52", "400x86x52", "450x86x56"]
+    assert {"size": "450x86x56", "width": 450, "pitch": 86, "links": 56} in sizes
+    machines = {(doc["make"], doc["model"]): sorted(doc["track_sizes"]) for doc in compatibility}
+    assert machines == {
+        ("CAT", "259D"): ["320x86x52", "400x86x52"],
+        ("Bobcat", "T190"): ["320x86x50"],
+        ("Kubota", "SVL75"): ["450x86x56"],
+    }
+
+
+class FailingCompatibility:
+    """Compatibility collection whose upserts for one make fail"""
+
+    def __init__(self, collection, make):
+        self.collection = collection
+        self.make = make
+
+    async def bulk_write(self, ops, ordered=False):
+        failing = [index for index, op in enumerate(ops) if op._filter.get("make") == self.make]
+        rest = [op for index, op in enumerate(ops) if index not in failing]
+        result = await self.collection.bulk_write(rest, ordered=False)
+        if not failing:
+            return result
+        details = result.bulk_api_result
+        details["writeErrors"] = [{"index": index, "code": 2, "errmsg": "write failed"} for index in failing]
+        raise BulkWriteError(details)
+
+
+def test_pages_are_cached_only_after_their_writes_succeed(server, db, tmp_path, monkeypatch):
+    httpd, base_url = server
+    cat_url = f"{base_url}/track-loaders/caterpillar/259d/tracks/"
+    kubota_url = f"{base_url}/track-loaders/kubota/svl75/tracks/"
+    cache = ResponseCache(tmp_path)
+
+    monkeypatch.setattr(crawler_module, "compatibility_collection", FailingCompatibility(db.compatibility, "CAT"))
+    asyncio.run(import_track_loaders_data(base_url=base_url, rate=1000, cache_dir=tmp_path))
+    assert cache.load(cat_url) is None
+    assert cache.load(kubota_url) is not None
+
+    # A crawl that fails while flushing commits nothing
+    class Crash(Exception):
+        pass
+
+    async def crash(*args, **kwargs):
+        raise Crash()
+
+    monkeypatch.setattr(crawler_module.BulkWriter, "flush", crash)
+    with pytest.raises(Crash):
+        asyncio.run(import_track_loaders_data(base_url=base_url, rate=1000, cache_dir=tmp_path))
+    assert cache.load(cat_url) is None
+
+    monkeypatch.undo()
+    asyncio.run(import_track_loaders_data(base_url=base_url, rate=1000, cache_dir=tmp_path))
+    assert cache.load(cat_url) is not None